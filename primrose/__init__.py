@@ -3,7 +3,6 @@ import logging
 import os
 import sys
 import importlib
-import pkg_resources
 
 logging.basicConfig(
     format="%(asctime)s %(levelname)s %(filename)s %(funcName)s: %(message)s",
@@ -50,13 +49,35 @@ def validate(config):
 @click.command()
 @click.option("--config", required=True, help="Path to Config file")
 @click.option("--dry_run", default=False, help="Config file")
-def run(config, dry_run=False):
+@click.option("--resume", default=None, help="run_id of a checkpointed run to resume")
+def run(config, dry_run=False, resume=None):
     """Run a primrose job"""
     from primrose.configuration.configuration import Configuration
     from primrose.dag_runner import DagRunner
 
     configuration = Configuration(config_location=config)
-    DagRunner(configuration).run(dry_run=dry_run)
+    DagRunner(configuration).run(dry_run=dry_run, resume=resume)
+
+
+@click.command()
+@click.option("--config", required=True, help="Path to Config file, with a metadata.serve section")
+@click.option("--host", default="127.0.0.1", help="Host to listen on")
+@click.option("--port", default=8080, help="Port to listen on")
+@click.option("--socket", default=None, help="Path of a Unix socket to listen on, instead of host and port")
+def serve(config, host="127.0.0.1", port=8080, socket=None):
+    """Serve a primrose job: load it once, then run it on the data of each request"""
+    from primrose.configuration.configuration import Configuration
+    from primrose.dag_server import DagServer, make_server
+
+    configuration = Configuration(config_location=config)
+    server = make_server(DagServer(configuration), host=host, port=int(port), socket_path=socket)
+    logging.info("Listening on %s", socket or "%s:%s" % (host, port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 
 @click.command()
@@ -226,11 +247,14 @@ def create_project(name):
 @cli.command()
 def version():
     """Print the installed primrose version"""
+    import pkg_resources
+
     print(pkg_resources.get_distribution("primrose").version)
 
 
 cli.add_command(validate)
 cli.add_command(run)
+cli.add_command(serve)
 cli.add_command(plot)
 cli.add_command(generate_run_script, name="generate-run-script")
 cli.add_command(
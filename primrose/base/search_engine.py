@@ -8,11 +8,49 @@ from abc import abstractmethod
 from primrose.base.model import AbstractModel
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 from primrose.data_object import DataObjectResponseType
+from primrose.configuration.util import ConfigurationError
+from primrose.process_pool import map_blocks
+import numpy as np
 import pandas as pd
+import scipy.sparse
 import logging
 
 
+def _top_k_block(matrix, start, stop, k):
+    """the k highest cosine similarities of documents start to stop with all documents
+
+    Args:
+        matrix (sparse matrix): term document matrix, with rows of unit norm
+        start (int): first document of the block
+        stop (int): end of the block, exclusive
+        k (int): number of similarities kept per document
+
+    Returns:
+        (tuple): tuple containing:
+
+            rows (ndarray): document of each similarity
+
+            columns (ndarray): other document of each similarity
+
+            similarities (ndarray): cosine similarities
+
+    """
+    block = (matrix[start:stop] @ matrix.T).tocsr()
+    rows, columns, similarities = [], [], []
+    for i in range(block.shape[0]):
+        lo, hi = block.indptr[i], block.indptr[i + 1]
+        data, indices = block.data[lo:hi], block.indices[lo:hi]
+        if hi - lo > k:
+            best = np.argpartition(-data, k - 1)[:k]
+            data, indices = data[best], indices[best]
+        rows.append(np.full(len(data), start + i))
+        columns.append(indices)
+        similarities.append(data)
+    return np.concatenate(rows), np.concatenate(columns), np.concatenate(similarities)
+
+
 class AbstractSearchEngine(AbstractModel):
     """an abstract search engine"""
 
@@ -42,10 +80,27 @@ class AbstractSearchEngine(AbstractModel):
             id_key: key used in the corpus object for ids
             doc_key: key used in the corpus object for docs
 
+            optionally, top_k: number of most similar documents kept per document, at least 1. If set, predict adds a
+            sparse matrix of those similarities instead of the dense matrix of all of them (see top_k_similarity_matrix)
+
+            optionally, similarity_block_size: number of documents whose similarities are computed at a time,
+            default 1000. similarity_workers: number of worker processes computing blocks, default 1
+
         Returns:
             set of keys necessary to run AbstractSearchEngine
 
+        Raises:
+            ConfigurationError if top_k is not a positive integer
+
         """
+        if "top_k" in node_config:
+            try:
+                top_k = int(node_config["top_k"])
+            except (TypeError, ValueError):
+                top_k = 0
+            if top_k < 1:
+                raise ConfigurationError("top_k must be a positive integer, got %r" % (node_config["top_k"],))
+
         return set(["id_key", "doc_key"]).union(
             AbstractModel.necessary_config(node_config)
         )
@@ -127,7 +182,16 @@ class AbstractSearchEngine(AbstractModel):
         """
         data_object = self.train_model(data_object)
 
-        data_object.add(self, self.cosine_similarity_matrix())
+        if "top_k" in self.node_config:
+            matrix = self.top_k_similarity_matrix(
+                int(self.node_config["top_k"]),
+                int(self.node_config.get("similarity_block_size", 1000)),
+                int(self.node_config.get("similarity_workers", 1)),
+            )
+        else:
+            matrix = self.cosine_similarity_matrix()
+
+        data_object.add(self, matrix)
 
         return data_object
 
@@ -153,3 +217,41 @@ class AbstractSearchEngine(AbstractModel):
 
         """
         return cosine_similarity(self.term_document_matrix)
+
+    def top_k_similarity_matrix(self, k, block_size=1000, workers=1):
+        """compute, for each document in the corpus, the k documents most similar to it, itself included
+
+        Note:
+            the similarities are computed block_size documents at a time, on the sparse term document matrix, so
+            that memory grows with the number of documents times k, rather than with the square of the number of
+            documents. With more than one worker, blocks are computed on a pool of processes, which are each sent
+            the term document matrix once
+
+        Args:
+            k (int): number of similarities kept per document
+            block_size (int): number of documents per block
+            workers (int): number of worker processes. 1 computes the blocks in this process
+
+        Returns:
+            matrix (scipy.sparse.csr_matrix): square matrix where index of matrix is index of corpus IDs, holding the
+                k highest (nonzero) cosine similarities of each row
+
+        """
+        matrix = normalize(self.term_document_matrix).tocsr()
+        n = matrix.shape[0]
+        blocks = [(start, min(start + block_size, n), k) for start in range(0, n, block_size)]
+        logging.info(
+            "Computing the top %s similarities of %s documents in %s blocks with %s worker%s",
+            k,
+            n,
+            len(blocks),
+            workers,
+            "s" if workers > 1 else "",
+        )
+
+        results = map_blocks(_top_k_block, matrix, blocks, workers)
+
+        if not results:
+            return scipy.sparse.csr_matrix((n, n))
+        rows, columns, similarities = (np.concatenate(parts) for parts in zip(*results))
+        return scipy.sparse.csr_matrix((similarities, (rows, columns)), shape=(n, n))
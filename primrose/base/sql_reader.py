@@ -5,17 +5,26 @@ Author(s):
 
 """
 import os
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 from primrose.base.reader import AbstractReader
 from abc import abstractmethod
 import pandas as pd
 import logging
 import hashlib
-from jinja2 import Environment, FileSystemLoader
+from primrose.template_cache import sql_environment
+from primrose.chunked_data_frame import ChunkedDataFrame
+from primrose.readers.query_cache import QueryCache
+from primrose.deferred import submit
 
 
 class AbstractSqlReader(AbstractReader):
     """A reader that explicitly reads from relational DB using SQL and is able to run pd.read_sql."""
 
+    # does get_connection open a new connection on every call? If so, readers without a connection pool close
+    # the connections they get once done. Otherwise, e.g. for readers that keep and reuse a connection, they don't
+    opens_connections = False
+
     @staticmethod
     def necessary_config(node_config):
         """Return a list of necessary configuration keys within the implementation
@@ -26,6 +35,17 @@ class AbstractSqlReader(AbstractReader):
         Note:
             After adding this list, validation automatically occurs before instantiation in the pipeline factory.
 
+            optionally, chunksize: stream the results of each query as a ChunkedDataFrame of chunks of this many rows
+
+            optionally, parallel_queries: run up to this many of the (independent) queries at a time
+
+            optionally, deferred: if true, start the queries in the background and add futures of their results,
+            so that the DAG moves on while they run. The DAG is not terminated on empty results
+
+            optionally, fetch_size: fetch results from a streaming cursor, this many rows at a time
+
+            optionally, dtypes: map of column name to the dtype to cast the column to
+
         Returns:
             set of keys necessary to run implementation
 
@@ -36,7 +56,7 @@ class AbstractSqlReader(AbstractReader):
     def _substitute_query(query_json):
         """Substitue our paramters in a query string. Renders the file as a jinja template to allow for advanced
         query nesting and logic. Uses a jinja environment which searches for templates (sql queries) using relative
-        path and absolute path.
+        path and absolute path, and which is shared by all readers, so that each file is only compiled once.
 
         Note:
             given JSON:
@@ -67,13 +87,7 @@ class AbstractSqlReader(AbstractReader):
         if "parameters" in query_json:
             sql_input = query_json["parameters"]
 
-        jinja_env = Environment(
-            loader=FileSystemLoader([".", "/"]),
-            variable_start_string="{",
-            variable_end_string="}",
-        )
-
-        query = jinja_env.get_template(query_json["query"])
+        query = sql_environment().get_template(query_json["query"])
         return query.render(**sql_input)
 
     def _generate_queries(self):
@@ -129,8 +143,75 @@ class AbstractSqlReader(AbstractReader):
         """return a database connection, one that is compatible with pd.read_sql"""
         pass  # pragma: no cover
 
+    def connection_pool_config(self):
+        """settings of the `connection_pool` key of metadata, with defaults
+
+        Returns:
+            settings (dict): keyword arguments of ConnectionPool, or None if pooling is disabled
+
+        """
+        config = {}
+        if self.configuration.config_metadata and "connection_pool" in self.configuration.config_metadata:
+            config = self.configuration.config_metadata["connection_pool"]
+
+        if str(config.get("enabled", True)).lower() != "true":
+            return None
+
+        return {
+            "max_size": int(config.get("max_size", 4)),
+            "health_check_interval": float(config.get("health_check_interval", 30)),
+            "timeout": float(config.get("timeout", 300)),
+        }
+
+    def connection_pool(self):
+        """the process-wide pool to borrow connections from, shared by all readers of the same database.
+        Readers without a pool (the default) open a new connection with `get_connection` for each run
+
+        Returns:
+            pool (ConnectionPool), or None
+
+        """
+        return None
+
+    def _close_own_connection(self, conn):
+        """close a connection from get_connection, if the reader opened it
+
+        Args:
+            conn (DB connection): database connection
+
+        """
+        if self.opens_connections:
+            conn.close()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """borrow a connection from the pool for the duration of a with block, and return it afterwards.
+        Without a pool, get a connection with get_connection, and close it afterwards if the reader opened it
+
+        Yields:
+            conn (DB connection): database connection
+
+        """
+        pool = self.connection_pool()
+        if pool is None:
+            conn = self.get_connection()
+            try:
+                yield conn
+            finally:
+                self._close_own_connection(conn)
+        else:
+            conn = pool.acquire()
+            try:
+                yield conn
+            finally:
+                pool.release(conn)
+
     def run(self, data_object):
-        """run SQL queries into pandas dataframes
+        """run SQL queries into pandas dataframes. If `chunksize` is set in the node's configuration, the results of each
+        query are streamed, as a ChunkedDataFrame of chunks of this many rows, and the DAG is not terminated on empty results.
+        Otherwise, the queries run on a connection borrowed from the reader's connection pool, if it has one.
+        If `parallel_queries` is set in the node's configuration, up to this many queries run at a time, each on
+        its own connection. If `deferred` is set, the queries run in the background, each on its own connection
 
         Args:
             data_object (DataObject): instance of DataObject
@@ -143,25 +224,203 @@ class AbstractSqlReader(AbstractReader):
                 terminate (bool): terminate the DAG?
 
         """
-        conn = self.get_connection()
         debug = self.node_config.setdefault("debug", False)
-        for i, query in enumerate(self._generate_queries()):
 
-            if debug:
-                with open("debug_query_" + str(i) + ".sql", "w") as qfile:
-                    qfile.write(os.path.join(query))
-            df = self.query_db(query, conn)
+        if "chunksize" in self.node_config:
+            # streaming: the queries are run, and their results fetched chunk by chunk, by the consuming nodes.
+            # That outlives this node, so each iteration of the chunks opens, and closes, a connection of its own
+            for i, query in enumerate(self._generate_queries()):
+                self._debug_query(debug, i, query)
+                key = self._get_key(i)
+                logging.info("Adding chunked df with key %s", key)
+                data_object.add(self, self.query_db_chunked(query, None, int(self.node_config["chunksize"])), key)
+            return data_object, False
+
+        if self.node_config.get("deferred", False):
+            return self._run_deferred(data_object, debug)
+
+        parallel_queries = int(self.node_config.get("parallel_queries", 1))
+        if parallel_queries > 1:
+            return self._run_parallel(data_object, debug, parallel_queries)
+
+        with contextlib.ExitStack() as stack:
+            # only connect once a query is not found in the query cache
+            conns = []
+
+            def query_db(query):
+                if not conns:
+                    conns.append(stack.enter_context(self.connection()))
+                return self.query_db(query, conns[0])
+
+            for i, query in enumerate(self._generate_queries()):
+                self._debug_query(debug, i, query)
+                key = self._get_key(i)
+
+                df = self._cached_query_db(i, query, query_db)
+                logging.info("Adding df with key %s", key)
+                data_object.add(self, df, key)
+                if df.empty:
+                    return data_object, True
+
+        terminate = False
+        return data_object, terminate
+
+    def _query_on_own_connection(self, i, query):
+        """run the ith query on a connection of its own, borrowed from the pool if there is one
+
+        Args:
+            i (int): the index of the query
+            query (str): SQL query string
+
+        Returns:
+            dataframe (DataFrame): dataframe
+
+        """
+
+        def query_db(query):
+            with self.connection() as conn:
+                return self.query_db(query, conn)
+
+        return self._cached_query_db(i, query, query_db)
+
+    def connection_identity(self):
+        """identity of the database that queries run against, so that the query cache does not mix up the results
+        of the same query on different databases. Override this in readers that can connect to several databases
+
+        Returns:
+            identity (str)
+
+        """
+        return self.__class__.__name__
+
+    def query_cache_key(self, query):
+        """key of the results of a query in the query cache
+
+        Args:
+            query (str): rendered SQL query string
+
+        Returns:
+            key (str): sha256 hex digest of the connection identity and the query
+
+        """
+        sha = hashlib.sha256()
+        sha.update(self.connection_identity().encode("utf-8"))
+        sha.update(b"\n")
+        sha.update(query.encode("utf-8"))
+        return sha.hexdigest()
+
+    def _cached_query_db(self, i, query, query_db):
+        """the result of the ith query from the query cache, if configured in metadata and not disabled for this
+        query, otherwise from query_db, caching its result
+
+        Args:
+            i (int): the index of the query
+            query (str): SQL query string
+            query_db (func): function of query that runs it against the database
+
+        Returns:
+            dataframe (DataFrame): dataframe
+
+        """
+        cache = QueryCache.from_metadata(self.configuration.config_metadata)
+        cache_config = self.node_config["query_json"][i].get("cache", True)
+        if cache is None or cache_config is False:
+            return query_db(query)
+
+        ttl = cache_config.get("ttl") if isinstance(cache_config, dict) else None
+        key = self.query_cache_key(query)
+        df = cache.get(key, ttl=float(ttl) if ttl is not None else None)
+        if df is not None:
+            logging.info("Read result of query %s from the query cache", i)
+            return df
+
+        df = query_db(query)
+        cache.put(key, df)
+        return df
+
+    def _run_parallel(self, data_object, debug, parallel_queries):
+        """run up to parallel_queries queries at a time, each on its own connection. Results are added in the order of
+        query_json, as they are when run one at a time: results after the first empty one are dropped, and the DAG
+        is terminated
+
+        Note:
+            the queries must be independent of each other, as they run in no particular order
+
+        Args:
+            data_object (DataObject): instance of DataObject
+            debug (bool): write queries to files?
+            parallel_queries (int): maximum number of queries to run at a time
+
+        Returns:
+            (tuple): tuple containing:
+
+                data_object (DataObject): instance of DataObject
+
+                terminate (bool): terminate the DAG?
+
+        """
+        queries = list(self._generate_queries())
+        for i, query in enumerate(queries):
+            self._debug_query(debug, i, query)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(parallel_queries, len(queries)))) as executor:
+            futures = [executor.submit(self._query_on_own_connection, i, query) for i, query in enumerate(queries)]
+
+            for i, future in enumerate(futures):
+                df = future.result()
+                key = self._get_key(i)
+                logging.info("Adding df with key %s", key)
+                data_object.add(self, df, key)
+                if df.empty:
+                    for other in futures[i + 1 :]:
+                        other.cancel()
+                    return data_object, True
+
+        terminate = False
+        return data_object, terminate
+
+    def _run_deferred(self, data_object, debug):
+        """start each query on the background pool, on its own connection, and add the future of its result, which
+        the nodes that get it wait for. As the results are not known yet, the DAG is not terminated on empty results
+
+        Args:
+            data_object (DataObject): instance of DataObject
+            debug (bool): write queries to files?
+
+        Returns:
+            (tuple): tuple containing:
+
+                data_object (DataObject): instance of DataObject
+
+                terminate (bool): terminate the DAG?
+
+        """
+        for i, query in enumerate(self._generate_queries()):
+            self._debug_query(debug, i, query)
             key = self._get_key(i)
-            logging.info("Adding df with key %s", key)
-            data_object.add(self, df, key)
-            if df.empty:
-                return data_object, True
+            logging.info("Adding deferred df with key %s", key)
+            data_object.add(self, submit(self._query_on_own_connection, i, query), key)
 
         terminate = False
         return data_object, terminate
 
+    @staticmethod
+    def _debug_query(debug, i, query):
+        """if debug, write the ith query to a file
+
+        Args:
+            debug (bool): debug?
+            i (int): the index of the query
+            query (str): SQL query string
+
+        """
+        if debug:
+            with open("debug_query_" + str(i) + ".sql", "w") as qfile:
+                qfile.write(os.path.join(query))
+
     def query_db(self, query, conn):
-        """Query the db using Bigquery logic if specified.
+        """Query the db using Bigquery logic if specified. If `fetch_size` is set in the node's configuration, the
+        results are fetched from a streaming cursor, this many rows at a time, rather than all at once
 
         Args:
             query (str): SQL query string
@@ -171,4 +430,110 @@ class AbstractSqlReader(AbstractReader):
             dataframe (DataFrame): dataframe
 
         """
-        return pd.read_sql(query, con=conn)
+        if "fetch_size" in self.node_config:
+            batches = list(self.fetch_batches(query, conn, int(self.node_config["fetch_size"])))
+            df = pd.concat(batches, ignore_index=True)
+            # batches can differ in dtype, e.g. in their categories, and are then concatenated as objects
+            return self._apply_dtypes(df) if "dtypes" in self.node_config else df
+
+        df = pd.read_sql(query, con=conn)
+        if "dtypes" in self.node_config:
+            df = self._apply_dtypes(df)
+        return df
+
+    def query_db_chunked(self, query, conn, chunksize):
+        """Stream the results of a query as a ChunkedDataFrame
+
+        Note:
+            The query runs each time the chunks are iterated, on the connection conn. If conn is None, each
+            iteration gets a connection of its own, which is closed, if the reader opened it, when the iteration
+            ends, fails, or is abandoned and garbage collected
+
+        Args:
+            query (str): SQL query string
+            conn (DB connection): database connection, or None
+            chunksize (int): number of rows per chunk
+
+        Returns:
+            ChunkedDataFrame
+
+        """
+        if conn is not None:
+            return ChunkedDataFrame(lambda: self.fetch_batches(query, conn, chunksize))
+
+        def chunks():
+            own_conn = self.get_connection()
+            try:
+                yield from self.fetch_batches(query, own_conn, chunksize)
+            finally:
+                self._close_own_connection(own_conn)
+
+        return ChunkedDataFrame(chunks)
+
+    def cursor(self, conn):
+        """return a cursor that fetches results from the database as they are read, rather than all at once when the
+        query runs. Override this for drivers that need a special kind of cursor to do so
+
+        Args:
+            conn (DB connection): database connection
+
+        Returns:
+            cursor (DB-API cursor)
+
+        """
+        return conn.cursor()
+
+    def _apply_dtypes(self, df):
+        """cast the columns of df listed in the `dtypes` map of the node's configuration
+
+        Args:
+            df (DataFrame): dataframe
+
+        Returns:
+            dataframe (DataFrame): dataframe
+
+        """
+        dtypes = {column: dtype for column, dtype in self.node_config["dtypes"].items() if column in df.columns}
+        return df.astype(dtypes) if dtypes else df
+
+    def fetch_batches(self, query, conn, fetch_size):
+        """run a query on a streaming cursor and yield its results as dataframes of up to fetch_size rows, so that
+        only one batch of rows is ever held as Python objects. Columns are cast to the `dtypes` of the node's
+        configuration, if any
+
+        Args:
+            query (str): SQL query string
+            conn (DB connection): database connection
+            fetch_size (int): number of rows per batch
+
+        Yields:
+            dataframe (DataFrame): dataframe. An empty result yields a single empty dataframe
+
+        """
+        cursor = self.cursor(conn)
+        try:
+            cursor.execute(query)
+            columns = None
+            n = 0
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if columns is None:
+                    # server-side cursors only describe the results once rows have been fetched
+                    columns = [description[0] for description in cursor.description]
+                if not rows and n > 0:
+                    break
+
+                df = pd.DataFrame.from_records(rows, columns=columns)
+                if "dtypes" in self.node_config:
+                    df = self._apply_dtypes(df)
+                n += 1
+                yield df
+
+                if len(rows) < fetch_size:
+                    break
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                # e.g. results left unread when a consumer stopped early
+                logging.debug("Could not close cursor", exc_info=True)
@@ -11,7 +11,19 @@ from abc import ABC, abstractmethod
 
 
 class AbstractTransformer(ABC):
-    """Serializable object that can be string together within a pipeline"""
+    """Serializable object that can be string together within a pipeline
+
+    Note:
+        `chunk_safe` declares whether `transform` can be applied to a stream of data (a ChunkedDataFrame) chunk by
+        chunk: that is, whether transforming the chunks one at a time and concatenating the results gives the same
+        result as transforming all the data at once. That holds when `transform` works row by row, with any state it
+        needs learned by `fit` beforehand. It does not hold if `transform` uses statistics of the data it is given
+        (means, the set of categories present, etc) or combines rows. Pipelines refuse to stream data through a
+        transformer that is not chunk safe. The default is False: override it in transformers that are.
+
+    """
+
+    chunk_safe = False
 
     @abstractmethod
     def fit(self, data):
@@ -0,0 +1,209 @@
+"""Checkpoint the progress of a DAG run so that a failed run can be resumed"""
+import os
+import json
+import uuid
+import datetime
+import shutil
+import logging
+import threading
+import dill
+from primrose.util import write_atomically
+from primrose.chunked_data_frame import ChunkedDataFrame
+
+
+class Checkpoint:
+    """Checkpoint of a DAG run: which nodes have completed, which were pruned, and the data each completed node
+    added to the DataObject, one file per key, in `dirname/run_id`.
+
+    Note:
+        Data is written once, when its node completes, and its files are deleted when the DataObject releases it.
+        Thus a resumed run restores only the data that the remaining nodes (or the end of the run) need.
+
+        A node that added futures or thunks is saved once their values are known, possibly from another thread.
+        Until then, it has not completed as far as a resumed run is concerned
+
+    """
+
+    STATE_FILENAME = "state.json"
+
+    def __init__(self, dirname, run_id, config_hash):
+        """instantiate the checkpoint
+
+        Args:
+            dirname (str): directory containing checkpoints of all runs
+            run_id (str): identifier of this run
+            config_hash (str): hash of the configuration of the run
+
+        """
+        self.dirname = dirname
+        self.run_id = run_id
+        self.config_hash = config_hash
+        self.path = os.path.join(dirname, run_id)
+        self.state = {"config_hash": config_hash, "completed": [], "pruned": [], "terminated": False, "entries": {}}
+        # nodes whose data was discarded, in case their deferred data is only saved afterwards
+        self.discarded = set()
+        self.removed = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def run_id_for(configuration):
+        """a new run identifier: current time, configuration hash and a random suffix, so that runs of the
+        same configuration started in the same second do not share a checkpoint
+
+        Args:
+            configuration (Configuration): Configuration instance
+
+        Returns:
+            run_id (str)
+
+        """
+        return "%s_%s_%s" % (
+            datetime.datetime.now().strftime("%Y%m%d_%H%M%S"),
+            configuration.config_hash[:8],
+            uuid.uuid4().hex[:8],
+        )
+
+    @staticmethod
+    def load(dirname, run_id, config_hash):
+        """load the checkpoint of an earlier run
+
+        Args:
+            dirname (str): directory containing checkpoints of all runs
+            run_id (str): identifier of the run to resume
+            config_hash (str): hash of the configuration of this run
+
+        Returns:
+            checkpoint (Checkpoint)
+
+        Raises:
+            Exception if there is no checkpoint of run_id
+
+        """
+        checkpoint = Checkpoint(dirname, run_id, config_hash)
+        filename = os.path.join(checkpoint.path, Checkpoint.STATE_FILENAME)
+        if not os.path.exists(filename):
+            raise Exception("No checkpoint of run %s in %s" % (run_id, dirname))
+
+        with open(filename, "r") as f:
+            checkpoint.state = json.load(f)
+
+        if checkpoint.state["config_hash"] != config_hash:
+            logging.warning("Configuration has changed since run %s was checkpointed", run_id)
+        checkpoint.state["config_hash"] = config_hash
+
+        return checkpoint
+
+    @property
+    def completed(self):
+        """nodes that have run, or were skipped as pruned"""
+        return self.state["completed"]
+
+    @property
+    def pruned(self):
+        """nodes pruned by conditional paths"""
+        return set(self.state["pruned"])
+
+    @property
+    def terminated(self):
+        """did a node signal to terminate the DAG?"""
+        return self.state["terminated"]
+
+    def _write(self, filename, write_fn, mode):
+        """write a file atomically
+
+        Args:
+            filename (str): path of file
+            write_fn (func): function that writes to the open file
+            mode (str): file mode
+
+        """
+
+        def write(path):
+            with open(path, mode) as f:
+                write_fn(f)
+
+        write_atomically(filename, write)
+
+    def _write_state(self):
+        """write the state of the run, making this node's progress durable"""
+        os.makedirs(self.path, exist_ok=True)
+        self._write(
+            os.path.join(self.path, Checkpoint.STATE_FILENAME), lambda f: json.dump(self.state, f, indent=2), "w"
+        )
+
+    def save(self, node, entries, to_prune=None, terminate=False):
+        """checkpoint a node that has completed, or that was skipped
+
+        Args:
+            node (str): name of node
+            entries (dict): data the node added to the DataObject, keyed by data key
+            to_prune (set): nodes the node pruned, if any
+            terminate (bool): did the node signal to terminate the DAG?
+
+        """
+        with self._lock:
+            if self.removed:
+                return
+            if to_prune:
+                self.state["pruned"] = sorted(self.pruned.union(to_prune))
+            if terminate:
+                self.state["terminated"] = True
+
+            if entries and any(isinstance(value, ChunkedDataFrame) for value in entries.values()):
+                # streamed data is only read by its consumers, and may hold a database connection: rather than
+                # checkpointing it, leave the node to run again, lazily, on resume
+                self._write_state()
+                return
+
+            if entries and node not in self.discarded:
+                node_path = os.path.join(self.path, node)
+                os.makedirs(node_path, exist_ok=True)
+
+                filenames = {}
+                for i, (key, value) in enumerate(entries.items()):
+                    filename = os.path.join(node, "%s.dill" % i)
+                    self._write(os.path.join(self.path, filename), lambda f: dill.dump(value, f), "wb")
+                    filenames[key] = filename
+                self.state["entries"][node] = filenames
+
+            self.state["completed"].append(node)
+
+            self._write_state()
+
+    def discard(self, node):
+        """delete the checkpointed data of a node, once it has been released from the DataObject
+
+        Args:
+            node (str): name of node
+
+        """
+        with self._lock:
+            self.discarded.add(node)
+            if self.state["entries"].pop(node, None) is not None:
+                self._write_state()
+                shutil.rmtree(os.path.join(self.path, node), ignore_errors=True)
+
+    def remove(self):
+        """delete the checkpoint of the run, once the run has completed: it will not be resumed"""
+        logging.info("Run %s completed, removing its checkpoint", self.run_id)
+        with self._lock:
+            self.removed = True
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def restore(self, data_object):
+        """restore the checkpointed data into data_object
+
+        Args:
+            data_object (DataObject): instance of DataObject
+
+        Returns:
+            data_object (DataObject): instance of DataObject
+
+        """
+        for node, filenames in self.state["entries"].items():
+            entries = {}
+            for key, filename in filenames.items():
+                with open(os.path.join(self.path, filename), "rb") as f:
+                    entries[key] = dill.load(f)
+            data_object.restore(node, entries)
+        return data_object
@@ -0,0 +1,104 @@
+"""A dataframe that is streamed as a sequence of smaller dataframes, or chunks"""
+import logging
+
+
+class ChunkedDataFrame:
+    """A dataframe that is streamed as a sequence of chunks, so that it never has to fit in memory as a whole.
+
+    Note:
+        A ChunkedDataFrame is lazy: it holds a function that returns an iterator of chunks (pandas DataFrames,
+        or Series), such as `pd.read_csv(..., chunksize=n)`. Nothing is read until the chunks are iterated,
+        typically by a writer, and each iteration reads the source again.
+
+        `map` returns a new ChunkedDataFrame that applies a function to each chunk of this one. This is how
+        pipelines transform a stream: the function must then only depend on the rows of its chunk.
+
+    """
+
+    def __init__(self, chunks_fn):
+        """instantiate the ChunkedDataFrame
+
+        Args:
+            chunks_fn (func): function with no arguments returning an iterator of chunks
+
+        """
+        self.chunks_fn = chunks_fn
+
+    @staticmethod
+    def concat(frames):
+        """stream of the chunks of several ChunkedDataFrames (or pandas DataFrames, as a single chunk), one after the other
+
+        Args:
+            frames (list): list of ChunkedDataFrames and/or DataFrames
+
+        Returns:
+            ChunkedDataFrame
+
+        """
+
+        def chunks():
+            for frame in frames:
+                if isinstance(frame, ChunkedDataFrame):
+                    yield from frame
+                else:
+                    yield frame
+
+        return ChunkedDataFrame(chunks)
+
+    def __iter__(self):
+        """iterate over the chunks
+
+        Yields:
+            chunk (DataFrame)
+
+        """
+        return iter(self.chunks_fn())
+
+    def map(self, fn):
+        """a ChunkedDataFrame of fn applied to each chunk of this one
+
+        Args:
+            fn (func): function of a chunk returning a chunk
+
+        Returns:
+            ChunkedDataFrame
+
+        """
+        return ChunkedDataFrame(lambda: (fn(chunk) for chunk in self))
+
+    def to_frame(self):
+        """read all chunks into a single pandas DataFrame. Only do this for data that fits in memory
+
+        Returns:
+            dataframe (DataFrame)
+
+        """
+        import pandas as pd
+
+        return pd.concat(list(self), ignore_index=True)
+
+    def to_csv(self, filename, **kwargs):
+        """write the chunks to a CSV file, one after the other, holding one chunk in memory at a time.
+        Takes the arguments of `pandas.DataFrame.to_csv`, so writers can treat a ChunkedDataFrame like a DataFrame.
+
+        Args:
+            filename (str): name of file
+            kwargs: keyword arguments of pandas.DataFrame.to_csv. The header is only written with the first chunk
+
+        Returns:
+            number of chunks written (int)
+
+        """
+        header = kwargs.pop("header", True)
+        mode = kwargs.pop("mode", "w")
+
+        n = 0
+        for n, chunk in enumerate(self, 1):
+            chunk.to_csv(filename, header=header if n == 1 else False, mode=mode if n == 1 else "a", **kwargs)
+
+        if n == 0:
+            # nothing to stream, but writers downstream expect the file
+            open(filename, mode).close()
+
+        logging.info("Wrote %s chunks to %s", n, filename)
+        return n
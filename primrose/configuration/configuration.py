@@ -11,7 +11,7 @@ import datetime
 import jstyleson
 import yaml
 import json
-from jinja2 import Environment, FileSystemLoader
+from primrose.template_cache import config_template
 from jinja2.exceptions import TemplateNotFound
 import hashlib
 import os
@@ -23,9 +23,12 @@ from primrose.configuration.util import (
     OperationType,
     ConfigurationError,
     ConfigurationSectionType,
+    ExecutorPoolType,
 )
 from primrose.configuration.configuration_dag import ConfigurationDag
 from primrose.dag.traverser_factory import TraverserFactory
+from primrose.instrumentation import CollectorFactory
+from primrose.data_object import DataObjectCacheFormat, DataObjectStorage
 
 
 SUPPORTED_EXTS = frozenset([".json", ".yaml", ".yml"])
@@ -145,13 +148,8 @@ class Configuration:
 
         """
 
-        def env_override(value, key):
-            return os.getenv(key, value)
-
-        jinja_env = Environment(loader=FileSystemLoader([".", "/"]))
-        jinja_env.filters["env_override"] = env_override
         try:
-            config_str_template = jinja_env.from_string(config_str)
+            config_str_template = config_template(config_str)
             config_str = config_str_template.render()
         except (TemplateNotFound) as error:
             filenames = str(error)
@@ -180,6 +178,25 @@ class Configuration:
                 d[k] = v
         return d
 
+    @staticmethod
+    def _hash(config):
+        """Get canonical string and sha256 hash of some configuration
+
+        Args:
+            config (dict): some (JSON serializable) configuration
+
+        Returns:
+            (tuple): tuple containing:
+
+                configuration_string (str):  configuration_string
+
+                configuration_hashname (str): sha256 hex digest of configuration_string
+
+        """
+        configuration_string = json.dumps(config, sort_keys=True, default=str)
+        configuration_hashname = hashlib.sha256(configuration_string.encode("utf-8")).hexdigest()
+        return configuration_string, configuration_hashname
+
     def _get_configuration_hash(self):
         """Get configuration file string and hash
 
@@ -191,9 +208,19 @@ class Configuration:
                 configuration_file_hashname (str): terminate the DAG?
 
         """
-        configuration_string = json.dumps(self.complete_config, sort_keys=True)
-        configuration_file_hashname = hashlib.sha256(configuration_string.encode("utf-8")).hexdigest()
-        return configuration_string, configuration_file_hashname
+        return Configuration._hash(self.complete_config)
+
+    def config_hash_for_instance(self, instance_name):
+        """get the hash of the configuration of a given node / instance_name
+
+        Args:
+            instance_name (str): name of node
+
+        Returns:
+            hash (str): sha256 hex digest of the node's configuration block
+
+        """
+        return Configuration._hash(self.config_for_instance(instance_name))[1]
 
     def check_metadata(self):
         """checks some dependencies among metadata keys
@@ -211,6 +238,80 @@ class Configuration:
                 except KeyError:
                     raise Exception(classname + " is not a valid and/or registered Traverser")
 
+            if "executor" in self.config_metadata:
+
+                cfg = self.config_metadata["executor"]
+
+                if not isinstance(cfg, dict):
+                    raise ConfigurationError("metadata.executor must be a dictionary")
+
+                if "pool" in cfg and cfg["pool"] not in ExecutorPoolType.values():
+                    raise ConfigurationError(
+                        "Unsupported metadata.executor.pool: %s. Supported pools are %s"
+                        % (cfg["pool"], str(ExecutorPoolType.values()))
+                    )
+
+            if "node_cache" in self.config_metadata:
+
+                cfg = self.config_metadata["node_cache"]
+
+                if not isinstance(cfg, dict) or not "dir" in cfg:
+                    raise ConfigurationError("metadata.node_cache: you must set 'dir'")
+
+            if "instrumentation" in self.config_metadata:
+
+                cfg = self.config_metadata["instrumentation"]
+
+                if not isinstance(cfg, dict):
+                    raise ConfigurationError("metadata.instrumentation must be a dictionary")
+
+                for name in cfg.get("collectors", []):
+                    if name not in CollectorFactory().name_dict:
+                        raise ConfigurationError("metadata.instrumentation: collector %s is not registered" % name)
+
+            if "checkpoint" in self.config_metadata:
+
+                cfg = self.config_metadata["checkpoint"]
+
+                if not isinstance(cfg, dict) or not "dir" in cfg:
+                    raise ConfigurationError("metadata.checkpoint: you must set 'dir'")
+
+            if "serve" in self.config_metadata:
+
+                cfg = self.config_metadata["serve"]
+
+                if not isinstance(cfg, dict) or not "input_node" in cfg or not "output_node" in cfg:
+                    raise ConfigurationError("metadata.serve: you must set 'input_node' and 'output_node'")
+
+            if "run_history" in self.config_metadata:
+
+                cfg = self.config_metadata["run_history"]
+
+                if not isinstance(cfg, dict) or not "filename" in cfg:
+                    raise ConfigurationError("metadata.run_history: you must set 'filename'")
+
+                if "smoothing" in cfg and (
+                    not isinstance(cfg["smoothing"], (int, float)) or not 0 < cfg["smoothing"] <= 1
+                ):
+                    raise ConfigurationError("metadata.run_history.smoothing must be a number in (0, 1]")
+
+            if "query_cache" in self.config_metadata:
+
+                cfg = self.config_metadata["query_cache"]
+
+                if not isinstance(cfg, dict) or not "dir" in cfg:
+                    raise ConfigurationError("metadata.query_cache: you must set 'dir'")
+
+            if "connection_pool" in self.config_metadata:
+
+                cfg = self.config_metadata["connection_pool"]
+
+                if not isinstance(cfg, dict):
+                    raise ConfigurationError("metadata.connection_pool must be a dictionary")
+
+                if "max_size" in cfg and (not isinstance(cfg["max_size"], int) or cfg["max_size"] < 1):
+                    raise ConfigurationError("metadata.connection_pool.max_size must be a positive integer")
+
             if "data_object" in self.config_metadata:
 
                 cfg = self.config_metadata["data_object"]
@@ -230,6 +331,26 @@ class Configuration:
                             "Invalid metadata.data_object.read_filename: " + str(cfg["read_filename"])
                         )
 
+                if "pin" in cfg and not isinstance(cfg["pin"], list):
+                    raise ConfigurationError("metadata.data_object.pin must be a list of node names")
+
+                if "memory_budget_mb" in cfg and (
+                    not isinstance(cfg["memory_budget_mb"], (int, float)) or cfg["memory_budget_mb"] <= 0
+                ):
+                    raise ConfigurationError("metadata.data_object.memory_budget_mb must be a positive number")
+
+                if "cache_format" in cfg and cfg["cache_format"] not in DataObjectCacheFormat.values():
+                    raise ConfigurationError(
+                        "Unsupported metadata.data_object.cache_format: %s. Supported formats are %s"
+                        % (cfg["cache_format"], str(DataObjectCacheFormat.values()))
+                    )
+
+                if "storage" in cfg and cfg["storage"] not in DataObjectStorage.values():
+                    raise ConfigurationError(
+                        "Unsupported metadata.data_object.storage: %s. Supported storage types are %s"
+                        % (cfg["storage"], str(DataObjectStorage.values()))
+                    )
+
                 if "write_to_cache" in cfg and (cfg["write_to_cache"] or str(cfg["write_to_cache"]).lower() == "true"):
 
                     if not "write_filename" in cfg:
@@ -8,7 +8,6 @@ Author(s):
 import logging
 import networkx as nx
 from primrose.configuration.util import OperationType, ConfigurationError
-import matplotlib.pyplot as plt
 from networkx.algorithms.shortest_paths.generic import has_path
 from primrose.node_factory import NodeFactory
 from primrose.base.conditional_path_node import AbstractConditionalPath
@@ -134,6 +133,59 @@ class ConfigurationDag:
             return nx.all_simple_paths(self.G2, source=source, target=target)
         return None
 
+    def topological_order(self):
+        """a topological order of the nodes of the DAG: every node comes after all of its upstream nodes
+
+        Note:
+            computed once, when first needed
+
+        Returns:
+            list of node names
+
+        """
+        if self._topological_order is None:
+            self._topological_order = list(nx.topological_sort(self.G2))
+        return self._topological_order
+
+    def first_upstream_path(self, sequence):
+        """find the first pair of nodes in sequence where the later node is upstream of the earlier node,
+        i.e. where there is a path from a node to some node before it in sequence
+
+        Note:
+            This is linear in the size of the DAG. Visiting nodes in reverse topological order, we compute, for
+            each node, the earliest position in sequence of any node reachable from it (through nodes in sequence
+            or not). The first node of sequence whose earliest reachable position is before its own position is
+            the first violation, and that earliest position is its target. This is the same pair that checking
+            `paths` for every pair, source by source and target by target, would find first.
+
+        Args:
+            sequence (list): list of node names
+
+        Returns:
+            (source, target) tuple of node names, or None if there is no such path
+
+        """
+        position = {}
+        for i, node in enumerate(sequence):
+            assert node in self.node_map
+            position.setdefault(node, i)
+
+        # earliest position in sequence reachable from each node, excluding the node itself
+        no_position = len(sequence)
+        earliest = {}
+        for node in reversed(self.topological_order()):
+            reach = no_position
+            for successor in self.G2.successors(node):
+                reach = min(reach, position.get(successor, no_position), earliest[successor])
+            earliest[node] = reach
+
+        for i, node in enumerate(sequence):
+            # a node listed twice counts as upstream of its earlier self
+            target = min(earliest[node], position[node] if position[node] < i else no_position)
+            if target < i:
+                return node, sequence[target]
+        return None
+
     def check_for_cycles(self):
         """check for cycles
 
@@ -281,6 +333,7 @@ class ConfigurationDag:
         self.G = G
         self.G2 = G2
         self.node_map = node_map
+        self._topological_order = None
 
     def check_dag(self):
         """check that it is a DAG
@@ -341,6 +394,9 @@ class ConfigurationDag:
             else:
                 color_map.append(colors[4])
 
+        # imported here as matplotlib is slow to import and only needed for plotting
+        import matplotlib.pyplot as plt
+
         fig = plt.figure(figsize=(image_width, image_height))
         ax = plt.subplot(111)
         ax.set_title(filename, fontsize=10)
@@ -72,3 +72,28 @@ class OperationType(Enum):
 
         """
         return dict(zip(OperationType.values(), OperationType.names()))
+
+
+class ExecutorPoolType(Enum):
+    """how DagRunner executes the nodes, set with metadata.executor.pool
+
+    Note:
+        sequential = one node at a time, in traversal order
+        thread = nodes whose upstream nodes have finished run concurrently on a thread pool
+        process = nodes whose upstream nodes have finished run concurrently on a process pool
+
+    """
+
+    SEQUENTIAL = "sequential"
+    THREAD = "thread"
+    PROCESS = "process"
+
+    @staticmethod
+    def values():
+        """list of the enum's values
+
+        Returns:
+            list of values
+
+        """
+        return list(map(lambda t: t.value, ExecutorPoolType))
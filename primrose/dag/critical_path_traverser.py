@@ -0,0 +1,133 @@
+"""Module to traverse DAG critical path first, using the runtimes of the nodes in past runs"""
+import heapq
+import logging
+import networkx as nx
+from primrose.dag.dag_traverser import DagTraverser
+from primrose.dag.depth_first_traverser import DepthFirstTraverser
+from primrose.dag.run_history import RunHistory
+
+
+class CriticalPathTraverser(DagTraverser):
+    """a traverser that, among the nodes whose upstream nodes have run, always picks the one with the longest
+    expected time to the end of the DAG, so that the critical path is started first.
+
+    Note:
+        expected runtimes come from the run history in metadata.run_history, which DagRunner updates at the end
+        of each run. Nodes without history, or all nodes if there is no run history, count as `default_runtime_s`
+        (1 second by default), so that the longest chain of nodes goes first. Ties are broken depth first.
+
+        The order matters with a `thread` or `process` executor, which starts ready nodes in traversal order.
+
+    """
+
+    def run_section_by_section(self):
+        """Do we want go through section by section?
+
+        Note:
+            suppose we had 5 sections and we asked to run just 2: section1 and section2.
+            Is it important that we run section1 and then section 2 (if so, return True)
+            or just that we run all the nodes from section1 and section2 together in some
+            desired order (return False)
+
+        Returns:
+            result (Boolean)
+
+        """
+        return False
+
+    def runtimes(self):
+        """expected runtime of each node
+
+        Returns:
+            runtimes (dict): node name: runtime in seconds
+
+        """
+        G = self.configuration.dag.G2
+        history = RunHistory.from_metadata(self.configuration.config_metadata)
+        if history is None:
+            return {node: RunHistory.DEFAULT_RUNTIME_S for node in G.nodes}
+
+        past = history.load()
+        return {node: history.runtime(node, past) for node in G.nodes}
+
+    def priorities(self, runtimes=None):
+        """expected time from the start of each node to the end of the DAG: the node's runtime plus the longest
+        such time of its downstream nodes
+
+        Args:
+            runtimes (dict): node name: runtime in seconds. If None, those of `runtimes()`
+
+        Returns:
+            priorities (dict): node name: time in seconds
+
+        """
+        G = self.configuration.dag.G2
+        runtimes = self.runtimes() if runtimes is None else runtimes
+        priorities = {}
+        for node in reversed(list(nx.topological_sort(G))):
+            priorities[node] = runtimes[node] + max((priorities[s] for s in G.successors(node)), default=0)
+        return priorities
+
+    def critical_path(self, priorities=None):
+        """the chain of nodes with the longest expected runtime
+
+        Args:
+            priorities (dict): node name: time in seconds. If None, those of `priorities()`
+
+        Returns:
+            path (list): list of node names, from a starting node to an end node
+
+        """
+        G = self.configuration.dag.G2
+        priorities = self.priorities() if priorities is None else priorities
+        if not priorities:
+            return []
+        path = [max((n for n in G.nodes if G.in_degree(n) == 0), key=priorities.get)]
+        while G.out_degree(path[-1]):
+            path.append(max(G.successors(path[-1]), key=priorities.get))
+        return path
+
+    def ready_batches(self):
+        """nodes grouped into batches that can run at the same time: every node's upstream nodes are in earlier
+        batches. Each batch is in priority order
+
+        Returns:
+            batches (list): list of lists of node names
+
+        """
+        G = self.configuration.dag.G2
+        priorities = self.priorities()
+        order = {node: i for i, node in enumerate(DepthFirstTraverser(self.configuration).traversal_list())}
+        return [
+            sorted(generation, key=lambda n: (-priorities[n], order[n]))
+            for generation in nx.topological_generations(G)
+        ]
+
+    def traversal_list(self):
+        """get list of nodes to traverse, critical path first
+
+        Returns:
+            sequence (list): list of node names in the order that they will be run
+
+        """
+        G = self.configuration.dag.G2
+        priorities = self.priorities()
+        order = {node: i for i, node in enumerate(DepthFirstTraverser(self.configuration).traversal_list())}
+
+        waiting = {node: G.in_degree(node) for node in G.nodes}
+        ready = [(-priorities[node], order[node], node) for node, n in waiting.items() if n == 0]
+        heapq.heapify(ready)
+
+        sequence = []
+        while ready:
+            _, _, node = heapq.heappop(ready)
+            sequence.append(node)
+            for successor in G.successors(node):
+                waiting[successor] -= 1
+                if waiting[successor] == 0:
+                    heapq.heappush(ready, (-priorities[successor], order[successor], successor))
+
+        path = self.critical_path(priorities)
+        if path:
+            logging.info("Critical path: %s, expected to take %.3gs", " -> ".join(path), priorities[path[0]])
+        return sequence
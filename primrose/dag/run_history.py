@@ -0,0 +1,115 @@
+"""Runtimes of the nodes in past runs, kept in a local JSON file, for traversers that schedule by expected runtime"""
+import os
+import json
+import logging
+from primrose.util import write_atomically
+
+
+class RunHistory:
+    """per-node wall times of past runs, smoothed over runs, in a local JSON file. Configured by metadata.run_history:
+
+        - `filename`: JSON file of the history
+        - `smoothing`: weight of the latest run in the smoothed runtime, between 0 and 1, default 0.5
+        - `default_runtime_s`: runtime of nodes that have not run yet, default 1.0
+
+    """
+
+    DEFAULT_SMOOTHING = 0.5
+    DEFAULT_RUNTIME_S = 1.0
+
+    def __init__(self, filename, smoothing=DEFAULT_SMOOTHING, default_runtime_s=DEFAULT_RUNTIME_S):
+        """instantiate the history
+
+        Args:
+            filename (str): JSON file of the history. It need not exist yet
+            smoothing (float): weight of the latest run in the smoothed runtime
+            default_runtime_s (float): runtime of nodes that have not run yet, in seconds
+
+        """
+        self.filename = filename
+        self.smoothing = smoothing
+        self.default_runtime_s = default_runtime_s
+
+    @staticmethod
+    def from_metadata(config_metadata):
+        """the history configured in metadata.run_history, if any
+
+        Args:
+            config_metadata (dict): metadata section of the configuration
+
+        Returns:
+            history (RunHistory), or None
+
+        """
+        if not config_metadata or "run_history" not in config_metadata:
+            return None
+        cfg = config_metadata["run_history"]
+        return RunHistory(
+            cfg["filename"],
+            float(cfg.get("smoothing", RunHistory.DEFAULT_SMOOTHING)),
+            float(cfg.get("default_runtime_s", RunHistory.DEFAULT_RUNTIME_S)),
+        )
+
+    def load(self):
+        """the history: node name: {"runs": number of runs, "wall_time_s": smoothed runtime}
+
+        Returns:
+            history (dict)
+
+        """
+        if not os.path.exists(self.filename):
+            return {}
+        with open(self.filename, "r") as f:
+            return json.load(f)
+
+    def runtime(self, node, history=None):
+        """expected runtime of node
+
+        Args:
+            node (str): name of node
+            history (dict): history, if already loaded
+
+        Returns:
+            runtime in seconds (float): smoothed runtime of past runs, or default_runtime_s if node has not run yet
+
+        """
+        history = self.load() if history is None else history
+        return history.get(node, {}).get("wall_time_s", self.default_runtime_s)
+
+    def update(self, report):
+        """add the wall times of the nodes that ran in a run to the history, and save it
+
+        Args:
+            report (RunReport): report of the run
+
+        Returns:
+            number of nodes updated (int)
+
+        """
+        history = self.load()
+        n = 0
+        for row in report.rows:
+            if row["status"] != "ran" or row.get("wall_time_s") is None:
+                continue
+            entry = history.get(row["node"])
+            if entry is None:
+                entry = history[row["node"]] = {"runs": 0, "wall_time_s": row["wall_time_s"]}
+            else:
+                entry["wall_time_s"] = (
+                    self.smoothing * row["wall_time_s"] + (1 - self.smoothing) * entry["wall_time_s"]
+                )
+            entry["runs"] += 1
+            n += 1
+
+        if n:
+            dirname = os.path.dirname(self.filename)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+
+            def write(path):
+                with open(path, "w") as f:
+                    json.dump(history, f, indent=2, sort_keys=True)
+
+            write_atomically(self.filename, write)
+            logging.info("Updated run history %s with %s nodes", self.filename, n)
+        return n
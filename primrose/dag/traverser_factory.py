@@ -8,6 +8,7 @@ Author(s):
 import logging
 from primrose.dag.config_layer_traverser import ConfigLayerTraverser
 from primrose.dag.depth_first_traverser import DepthFirstTraverser
+from primrose.dag.critical_path_traverser import CriticalPathTraverser
 
 
 class TraverserFactory:
@@ -38,6 +39,7 @@ class TraverserFactory:
             self.name_dict = {}
             self.register("ConfigLayerTraverser", ConfigLayerTraverser)
             self.register("DepthFirstTraverser", DepthFirstTraverser)
+            self.register("CriticalPathTraverser", CriticalPathTraverser)
             self.DEFAULT_TRAVERSER = "ConfigLayerTraverser"
 
         def register(self, key, class_obj, raise_on_overwrite=False):
@@ -4,16 +4,26 @@ Author(s):
     Carl Anderson (carl.anderson@weightwatchers.com)
 
 """
-from primrose.data_object import DataObject
+from primrose.data_object import DataObject, DataObjectCacheFormat
 import networkx as nx
 import os
 import logging
 import collections
+import itertools
 import traceback
+import importlib
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from primrose.node_factory import NodeFactory
+from primrose.node_cache import NodeCache
+from primrose.checkpoint import Checkpoint
+from primrose.deferred import when_resolved, wait_for_background
+from primrose.instrumentation import Instrumentation
+from primrose.readers.connection_pool import close_all_pools
 from primrose.configuration.configuration import OperationType
+from primrose.configuration.util import ExecutorPoolType
 from primrose.notification_utils import get_notification_client
 from primrose.dag.traverser_factory import TraverserFactory
+from primrose.dag.run_history import RunHistory
 from primrose.base.conditional_path_node import AbstractConditionalPath
 
 
@@ -42,6 +52,19 @@ class DagRunner:
 
         logging.info("Traverser is of class %s", self.dag_traverser.__class__)
 
+        self.node_cache = None
+        if configuration.config_metadata and "node_cache" in configuration.config_metadata:
+            self.node_cache = NodeCache(configuration, configuration.config_metadata["node_cache"]["dir"])
+
+        # per run book-keeping of which nodes still need each node's data
+        self.remaining_consumers = None
+        self.pinned = set()
+        self.checkpoint = None
+        # futures of the checkpoints and node cache entries of the last run that wait for deferred data
+        self.pending_writes = []
+
+        self.instrumentation = Instrumentation(configuration)
+
     def create_data_object(self):
         """restore data_object from cache
 
@@ -59,7 +82,7 @@ class DagRunner:
                 assert os.path.exists(filename)
 
                 logging.info("Reading DataObject from cache " + filename)
-                return DataObject.read_from_cache(filename)
+                return DataObject.read_from_cache(filename, self.configuration)
 
         data_object = DataObject(self.configuration)
 
@@ -84,7 +107,7 @@ class DagRunner:
 
                 assert "write_filename" in cfg
                 filename = cfg["write_filename"]
-                data_object.write_to_cache(filename)
+                data_object.write_to_cache(filename, cfg.get("cache_format", DataObjectCacheFormat.DILL.value))
                 return True
 
         return False
@@ -203,22 +226,511 @@ class DagRunner:
             Exception if any upstream paths found
 
         """
-
-        for idx_from in range(len(sequence)):
-            for idx_to in range(len(sequence)):
-                if idx_from > idx_to:
-                    if self.configuration.dag.paths(sequence[idx_from], sequence[idx_to]):
-                        msg = "Upstream path found, from %s to %s" % (sequence[idx_from], sequence[idx_to],)
-                        raise Exception(msg)
+        upstream_path = self.configuration.dag.first_upstream_path(sequence)
+        if upstream_path:
+            msg = "Upstream path found, from %s to %s" % upstream_path
+            raise Exception(msg)
         return False
 
-    def run(self, dry_run=False):
+    def release_config(self):
+        """Should data be released from the DataObject once its last consumer has run? Read from metadata.data_object
+
+        Note:
+            `release_after_last_consumer` defaults to false, as `run` returns the DataObject to its caller. Instance
+            names listed in `pin` are never released. Nothing is released if the DataObject is written to cache
+            with `write_to_cache`.
+
+        Returns:
+            (tuple): tuple containing:
+
+                release (bool): release data after last consumer?
+
+                pinned (set): instance names never to release
+
+        """
+        if self.configuration.config_metadata and "data_object" in self.configuration.config_metadata:
+            cfg = self.configuration.config_metadata["data_object"]
+            release = str(cfg.get("release_after_last_consumer", False)).lower() == "true"
+            if release and cfg.get("write_to_cache"):
+                logging.info("Not releasing data after its last consumer, as the DataObject is written to cache")
+                release = False
+            return release, set(cfg.get("pin", []))
+        return False, set()
+
+    def consumers_in_sequence(self, sequence):
+        """for each node of the DAG, which nodes of sequence consume its data?
+
+        Note:
+            nodes with no consumers in sequence (sinks, or nodes whose consumers are in sections that are not run)
+            are not included: their data is kept to the end of the run.
+
+        Args:
+            sequence (list): list of nodes to run
+
+        Returns:
+            dictionary of {node: set of downstream nodes in sequence}
+
+        """
+        in_sequence = set(sequence)
+        consumers = {}
+        for node in self.dag.node_map:
+            downstream = set(self.dag.G2.successors(node)).intersection(in_sequence)
+            if downstream:
+                consumers[node] = downstream
+        return consumers
+
+    def checkpoint_dir(self):
+        """Where should the progress of runs be checkpointed? Read from metadata.checkpoint
+
+        Returns:
+            directory (str), or None if runs are not checkpointed
+
+        """
+        if self.configuration.config_metadata and "checkpoint" in self.configuration.config_metadata:
+            return self.configuration.config_metadata["checkpoint"]["dir"]
+        return None
+
+    def _write_when_resolved(self, node, data_object, write_fn):
+        """call write_fn with the data that node added once any futures and thunks among it are known, without
+        waiting for them. Writes that wait are kept in pending_writes
+
+        Args:
+            node (str): name of node
+            data_object (DataObject): instance of DataObject
+            write_fn (func): function of a dictionary of key: value
+
+        """
+        future = when_resolved(data_object.data_dict.get(node, {}), write_fn)
+        if not future.done():
+            self.pending_writes.append(future)
+
+    def _after_node(self, node, data_object, to_prune=None, terminate=False):
+        """book-keeping once a node has run or has been skipped: checkpoint it, then release any upstream data
+        that has no consumers left
+
+        Args:
+            node (str): name of node that ran or was skipped
+            data_object (DataObject): instance of DataObject
+            to_prune (set): nodes the node pruned, if any
+            terminate (bool): did the node signal to terminate the DAG?
+
+        """
+        if self.checkpoint:
+            # futures and thunks are not waited for: the node is checkpointed once their values are known
+            self._write_when_resolved(
+                node, data_object, lambda entries: self.checkpoint.save(node, entries, to_prune, terminate)
+            )
+
+        if self.remaining_consumers is None:
+            return
+
+        for upstream in self.dag.upstream_keys(node):
+            if upstream in self.remaining_consumers:
+                self.remaining_consumers[upstream].discard(node)
+                if not self.remaining_consumers[upstream]:
+                    del self.remaining_consumers[upstream]
+                    if upstream not in self.pinned:
+                        data_object.release(upstream)
+                        if self.checkpoint:
+                            self.checkpoint.discard(upstream)
+
+    def executor_config(self):
+        """How should the nodes of the sequence be executed? Read from metadata.executor
+
+        Note:
+            `pool` is an ExecutorPoolType value. `sequential` (default) runs one node at a time.
+            `thread` and `process` run every node whose upstream nodes have finished concurrently
+            on a pool of `max_workers` workers.
+
+        Returns:
+            (tuple): tuple containing:
+
+                pool (str): type of pool
+
+                max_workers (int): number of workers, None for the pool's default
+
+        """
+        if self.configuration.config_metadata and "executor" in self.configuration.config_metadata:
+            cfg = self.configuration.config_metadata["executor"]
+            return cfg.get("pool", ExecutorPoolType.SEQUENTIAL.value), cfg.get("max_workers", None)
+        return ExecutorPoolType.SEQUENTIAL.value, None
+
+    def _instantiate_node(self, node, client, slack_exception_label):
+        """instantiate the node instance, notifying on error
+
+        Args:
+            node (str): name of node
+            client (AbstractNotification): notification client, if any
+            slack_exception_label (str): prefix for messages to client
+
+        Returns:
+            node_instance (AbstractNode)
+
+        """
+        class_name = self.configuration.nodename_to_classname[node]
+        try:
+            return NodeFactory().instantiate(class_name, self.configuration, node)
+        except Exception as e:
+            msg = "Issue instantiating %s and class %s" % (node, class_name)
+            logging.error(msg)
+            if client:
+                client.post_message(f"{slack_exception_label}: {msg}")
+            raise Exception(msg)
+
+    def _node_class_path(self, node, client, slack_exception_label):
+        """the import path of the class of the node, `module:qualname`, notifying on error
+
+        Note:
+            worker processes import the class from this path, as they do not share the registry of NodeFactory
+            when they are started with `spawn`, the default on macOS and Windows
+
+        Args:
+            node (str): name of node
+            client (AbstractNotification): notification client, if any
+            slack_exception_label (str): prefix for messages to client
+
+        Returns:
+            import_path (str)
+
+        """
+        class_name = self.configuration.nodename_to_classname[node]
+        try:
+            class_obj = NodeFactory().name_dict[class_name]
+        except Exception as e:
+            msg = "Issue finding class %s of %s" % (class_name, node)
+            logging.error(msg)
+            if client:
+                client.post_message(f"{slack_exception_label}: {msg}")
+            raise Exception(msg)
+        return "%s:%s" % (class_obj.__module__, class_obj.__qualname__)
+
+    def _notify_node_error(self, node, client, slack_exception_label):
+        """log, and notify, that a node failed
+
+        Args:
+            node (str): name of node
+            client (AbstractNotification): notification client, if any
+            slack_exception_label (str): prefix for messages to client
+
+        """
+        msg = "Issue with %s" % node
+        logging.error(msg)
+        if client:
+            client.post_message(f"{slack_exception_label}: {msg}\n{traceback.format_exc()}")
+
+    def _run_node(self, node, data_object, client, slack_exception_label):
+        """instantiate and run a single node
+
+        Args:
+            node (str): name of node
+            data_object (DataObject): instance of DataObject
+            client (AbstractNotification): notification client, if any
+            slack_exception_label (str): prefix for messages to client
+
+        Returns:
+            (tuple): tuple containing:
+
+                data_object (DataObject): instance of DataObject
+
+                terminate (bool): terminate the DAG?
+
+                to_prune (set): nodes to prune, if node is a conditional path, else None
+
+        """
+        section = self.dag.node_map[node]
+        class_name = self.configuration.nodename_to_classname[node]
+        logging.info(
+            "received node %s of type %s and class %s", node, section, class_name,
+        )
+
+        states = self.instrumentation.start(node, data_object)
+
+        if self.node_cache:
+            cached = self.node_cache.load(node)
+            if cached:
+                entries, terminate = cached
+                data_object.restore(node, entries)
+                self.instrumentation.record(node, "cached", self.instrumentation.stop(node, data_object, states))
+                return data_object, terminate, None
+
+        node_instance = None
+        to_prune = None
+        try:
+            node_instance = self._instantiate_node(node, client, slack_exception_label)
+
+            data_object, terminate = node_instance.run(data_object)
+
+            if isinstance(node_instance, AbstractConditionalPath):
+                to_prune = node_instance.all_nodes_to_prune()
+
+        except Exception as e:
+            # _instantiate_node has already notified of its own errors
+            if node_instance is not None:
+                self._notify_node_error(node, client, slack_exception_label)
+            self.instrumentation.record(node, "failed", self.instrumentation.stop(node, data_object, states))
+            raise e
+
+        self.instrumentation.record(node, "ran", self.instrumentation.stop(node, data_object, states))
+
+        if self.node_cache:
+            # futures and thunks are not waited for: the node is cached once their values are known
+            self._write_when_resolved(
+                node, data_object, lambda entries: self.node_cache.save(node, entries, terminate)
+            )
+
+        return data_object, terminate, to_prune
+
+    def _run_sequentially(self, sequence, data_object, client, slack_exception_label):
+        """run the nodes one at a time in the order of sequence
+
+        Args:
+            sequence (list): list of nodes to run in given order
+            data_object (DataObject): instance of DataObject
+            client (AbstractNotification): notification client, if any
+            slack_exception_label (str): prefix for messages to client
+
+        Returns:
+            data_object (DataObject): instance of DataObject
+
+        """
+        pruned_nodes = self.checkpoint.pruned if self.checkpoint else set()
+
+        for node in sequence:
+
+            if node in pruned_nodes:
+                logging.info("Skipping pruned node " + node)
+                self.instrumentation.record(node, "pruned")
+                self._after_node(node, data_object)
+                continue
+
+            data_object, terminate, to_prune = self._run_node(node, data_object, client, slack_exception_label)
+
+            self._after_node(node, data_object, to_prune, terminate)
+
+            if to_prune:
+                pruned_nodes.update(to_prune)
+
+            if terminate:
+                msg = "Terminating early due to signal from %s" % node
+                logging.info(msg)
+                if client:
+                    client.post_message(f"{slack_exception_label}: {msg}")
+                break
+
+        return data_object
+
+    def _upstream_in_sequence(self, sequence):
+        """for each node of sequence, which of its upstream nodes must finish before it can start?
+
+        Note:
+            If the traverser runs section by section, every node of an earlier section must also have
+            finished. This keeps disconnected sections, such as cleanup, after everything else.
+
+        Args:
+            sequence (list): list of nodes to run
+
+        Returns:
+            dictionary of {node: set of nodes it waits on}
+
+        """
+        in_sequence = set(sequence)
+        waits_on = {node: set(k for k in self.dag.upstream_keys(node) if k in in_sequence) for node in sequence}
+
+        if self.dag_traverser.run_section_by_section():
+            earlier = set()
+            for section_name, section_nodes in itertools.groupby(sequence, key=lambda n: self.dag.node_map[n]):
+                section_nodes = list(section_nodes)
+                for node in section_nodes:
+                    waits_on[node].update(earlier)
+                earlier.update(section_nodes)
+
+        return waits_on
+
+    def _run_concurrently(self, sequence, data_object, client, slack_exception_label, pool, max_workers):
+        """run the nodes on a thread or process pool, starting each node as soon as its upstream nodes have finished
+
+        Note:
+            Pruning and early termination have the same semantics as when running sequentially: pruned nodes
+            are skipped and, after a terminate signal, no new nodes are started (those already running finish).
+            With a process pool, each node runs on a copy of the DataObject; the node's own entries are
+            merged back, and any entries it popped are removed. With `shared_memory` storage, dataframes and
+            arrays are passed as handles of shared memory segments rather than pickled.
+
+        Args:
+            sequence (list): list of nodes to run, in priority order
+            data_object (DataObject): instance of DataObject
+            client (AbstractNotification): notification client, if any
+            slack_exception_label (str): prefix for messages to client
+            pool (str): `thread` or `process`
+            max_workers (int): number of workers
+
+        Returns:
+            data_object (DataObject): instance of DataObject
+
+        """
+        position = {node: i for i, node in enumerate(sequence)}
+        waits_on = self._upstream_in_sequence(sequence)
+        pending = list(sequence)
+        finished = set()
+        pruned_nodes = self.checkpoint.pruned if self.checkpoint else set()
+        running = {}
+        cache_states = {}
+        terminate = False
+
+        executor_class = ThreadPoolExecutor if pool == ExecutorPoolType.THREAD.value else ProcessPoolExecutor
+        logging.info("Running nodes on a %s pool with max_workers=%s", pool, max_workers)
+
+        with executor_class(max_workers=max_workers) as executor:
+            while True:
+                # pruned nodes count as finished, which may free up others, so sweep until nothing changes
+                progress = not terminate
+                while progress:
+                    progress = False
+                    for node in [n for n in pending if waits_on[n].issubset(finished)]:
+                        pending.remove(node)
+                        if node in pruned_nodes:
+                            logging.info("Skipping pruned node " + node)
+                            self.instrumentation.record(node, "pruned")
+                            finished.add(node)
+                            self._after_node(node, data_object)
+                            progress = True
+                        elif pool == ExecutorPoolType.THREAD.value:
+                            future = executor.submit(self._run_node, node, data_object, client, slack_exception_label)
+                            running[future] = node
+                        else:
+                            class_name = self.configuration.nodename_to_classname[node]
+                            logging.info(
+                                "received node %s of type %s and class %s", node, self.dag.node_map[node], class_name,
+                            )
+                            cache_states[node] = self.instrumentation.start(node, data_object)
+                            cached = self.node_cache.load(node) if self.node_cache else None
+                            if cached:
+                                # hand the cached result to the same completion handling as a worker's result
+                                future = Future()
+                                future.set_result((cached[0], set(), cached[1], None, None))
+                            else:
+                                class_path = self._node_class_path(node, client, slack_exception_label)
+                                shared = data_object.shared_memory is not None
+                                future = executor.submit(
+                                    _run_node_in_process,
+                                    class_name,
+                                    class_path,
+                                    self.configuration,
+                                    node,
+                                    data_object.shared_memory.export(data_object) if shared else data_object,
+                                    self.instrumentation,
+                                    shared,
+                                )
+                            running[future] = node
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in sorted(done, key=lambda f: position[running[f]]):
+                    node = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if pool == ExecutorPoolType.PROCESS.value:
+                            self._notify_node_error(node, client, slack_exception_label)
+                            # the worker's metrics are lost with it: measure the node from this process instead
+                            self.instrumentation.record(
+                                node, "failed", self.instrumentation.stop(node, data_object, cache_states.pop(node))
+                            )
+                        for other in running:
+                            other.cancel()
+                        raise e
+
+                    if pool == ExecutorPoolType.THREAD.value:
+                        _, node_terminate, to_prune = result
+                    else:
+                        entries, popped, node_terminate, to_prune, metrics = result
+                        if data_object.shared_memory is not None:
+                            entries = data_object.shared_memory.adopt(node, entries)
+                        for instance_name in popped:
+                            data_object.release(instance_name)
+                        data_object.restore(node, entries)
+                        states = cache_states.pop(node)
+                        if metrics is None:
+                            self.instrumentation.record(
+                                node, "cached", self.instrumentation.stop(node, data_object, states)
+                            )
+                        else:
+                            self.instrumentation.record(node, "ran", metrics)
+                            if self.node_cache:
+                                self.node_cache.save(node, entries, node_terminate)
+
+                    finished.add(node)
+                    self._after_node(node, data_object, to_prune, node_terminate)
+
+                    if to_prune:
+                        pruned_nodes.update(to_prune)
+
+                    if node_terminate and not terminate:
+                        terminate = True
+                        msg = "Terminating early due to signal from %s" % node
+                        logging.info(msg)
+                        if client:
+                            client.post_message(f"{slack_exception_label}: {msg}")
+
+        return data_object
+
+    def resume_sequence(self, sequence, data_object, resume=None):
+        """set up the checkpoint of this run, if runs are checkpointed. When resuming an earlier run, restore its
+            checkpointed data and drop the nodes it completed from the sequence
+
+        Args:
+            sequence (list): list of nodes to run
+            data_object (DataObject): instance of DataObject
+            resume (str): run_id of the run to resume, if any
+
+        Returns:
+            (tuple): tuple containing:
+
+                sequence (list): list of nodes still to run
+
+                data_object (DataObject): instance of DataObject
+
+        Raises:
+            Exception if resume is set but runs are not checkpointed
+
+        """
+        dirname = self.checkpoint_dir()
+
+        if dirname is None:
+            if resume:
+                raise Exception("To resume run %s, metadata.checkpoint.dir must be set" % resume)
+            self.checkpoint = None
+            return sequence, data_object
+
+        if resume:
+            self.checkpoint = Checkpoint.load(dirname, resume, self.configuration.config_hash)
+            data_object = self.checkpoint.restore(data_object)
+
+            if self.checkpoint.terminated:
+                logging.info("Run %s was terminated early. Nothing to resume", resume)
+                return [], data_object
+
+            completed = set(self.checkpoint.completed)
+            sequence = [node for node in sequence if node not in completed]
+            logging.info("Resuming run %s with %s nodes completed. Nodes to run: %s", resume, len(completed), sequence)
+        else:
+            run_id = Checkpoint.run_id_for(self.configuration)
+            self.checkpoint = Checkpoint(dirname, run_id, self.configuration.config_hash)
+            logging.info("Checkpointing run %s to %s", self.checkpoint.run_id, dirname)
+
+        return sequence, data_object
+
+    def run(self, dry_run=False, resume=None):
         """run the whole DAG. Optonally, you can call dry_run=True
             which will log what would be run and in what order
             but not actually run it
 
         Args:
             dry_run: Boolean. Want to do a dry run?
+            resume (str): run_id of a checkpointed run to resume, if any
 
         Returns:
             data_object: DataObject instance
@@ -234,8 +746,7 @@ class DagRunner:
         if len(candidate_sequence) > len(sequence):
             logging.info("Sequence of nodes to be run: %s", sequence)
 
-        pruned_nodes = set()
-
+        slack_exception_label = None
         if self.configuration.config_metadata and "notify_on_error" in self.configuration.config_metadata:
             try:
                 params = self.configuration.config_metadata["notify_on_error"]
@@ -249,56 +760,139 @@ class DagRunner:
         else:
             client = None
 
-        for i, node in enumerate(sequence):
-
-            if node in pruned_nodes:
-                logging.info("Skipping pruned node " + node)
-                continue
-
-            section = self.dag.node_map[node]
-            class_name = self.configuration.nodename_to_classname[node]
-
-            if dry_run:
+        if dry_run:
+            for i, node in enumerate(sequence):
+                section = self.dag.node_map[node]
+                class_name = self.configuration.nodename_to_classname[node]
                 logging.info(
                     "DRY RUN %s: would run node %s of type %s and class %s", i, node, section, class_name,
                 )
-                continue
-            else:
-                logging.info(
-                    "received node %s of type %s and class %s", node, section, class_name,
-                )
-
-            try:
-                node_instance = NodeFactory().instantiate(class_name, self.configuration, node)
-            except Exception as e:
-                msg = "Issue instantiating %s and class %s" % (node, class_name)
-                logging.error(msg)
-                if client:
-                    client.post_message(f"{slack_exception_label}: {msg}")
-                raise Exception(msg)
-
-            try:
-                data_object, terminate = node_instance.run(data_object)
+        else:
+            data_object.run_report = self.instrumentation.reset()
+            self.pending_writes = []
 
-                if isinstance(node_instance, AbstractConditionalPath):
-                    to_prune = node_instance.all_nodes_to_prune()
-                    if to_prune:
-                        pruned_nodes.update(to_prune)
+            sequence, data_object = self.resume_sequence(sequence, data_object, resume)
 
-            except Exception as e:
-                msg = "Issue with %s" % node
-                logging.error(msg)
-                if client:
-                    client.post_message(f"{slack_exception_label}: {msg}\n{traceback.format_exc()}")
-                raise e
+            release, self.pinned = self.release_config()
+            self.remaining_consumers = self.consumers_in_sequence(sequence) if release else None
 
-            if terminate:
-                logging.info("Terminating early due to signal from %s", node)
-                if client:
-                    client.post_message(f"{slack_exception_label}: {msg}")
-                break
+            pool, max_workers = self.executor_config()
+            try:
+                if pool == ExecutorPoolType.SEQUENTIAL.value:
+                    data_object = self._run_sequentially(sequence, data_object, client, slack_exception_label)
+                else:
+                    data_object = self._run_concurrently(
+                        sequence, data_object, client, slack_exception_label, pool, max_workers
+                    )
+                if self.checkpoint:
+                    self.checkpoint.remove()
+            finally:
+                # close the pooled database connections of the readers, even if a node failed, once the
+                # queries that readers started in the background are done with them
+                wait_for_background()
+                close_all_pools()
+                # a failed run is the one whose report is needed most
+                self.instrumentation.write_report()
+                if data_object.shared_memory is not None:
+                    if data_object.shared_memory.n_shared:
+                        logging.info(
+                            "Shared %s entries (%s bytes) of the DataObject with worker processes during the run",
+                            data_object.shared_memory.n_shared,
+                            data_object.shared_memory.bytes_shared,
+                        )
+                    data_object.shared_memory.close(data_object)
+
+        if not dry_run:
+            history = RunHistory.from_metadata(self.configuration.config_metadata)
+            if history is not None:
+                history.update(self.instrumentation.report)
+
+        if data_object.spill is not None and data_object.spill.n_spilled:
+            logging.info(
+                "Spilled %s entries (%s bytes) of the DataObject to disk during the run",
+                data_object.spill.n_spilled,
+                data_object.spill.bytes_spilled,
+            )
 
         self.cache_data_object(data_object)
 
         logging.info("All done. Bye bye!")
         return data_object
+
+
+def _import_node_class(class_name, class_path):
+    """the class of a node, in a worker process
+
+    Note:
+        classes defined inside functions cannot be imported. They are looked up in NodeFactory instead, where they
+        are registered only if the worker was forked from the process that registered them
+
+    Args:
+        class_name (str): name of node class, as registered in NodeFactory
+        class_path (str): import path of the class, `module:qualname`
+
+    Returns:
+        class_obj (class)
+
+    """
+    module_name, qualname = class_path.split(":")
+    if "<locals>" in qualname:
+        return NodeFactory().name_dict[class_name]
+    class_obj = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        class_obj = getattr(class_obj, name)
+    return class_obj
+
+
+def _run_node_in_process(class_name, class_path, configuration, node, data_object, instrumentation, shared=False):
+    """run a single node in a worker process, on that process's copy of the DataObject
+
+    Args:
+        class_name (str): name of node class, as registered in NodeFactory
+        class_path (str): import path of the class, `module:qualname`
+        configuration (Configuration): Configuration instance
+        node (str): name of node
+        data_object (DataObject): instance of DataObject
+        instrumentation (Instrumentation): collectors to run around the node
+        shared (bool): is the data of data_object in shared memory? If so, so is the data the node adds
+
+    Returns:
+        (tuple): tuple containing:
+
+            entries (dict): data the node added, keyed by data key
+
+            popped (set): names of instances whose data the node popped
+
+            terminate (bool): terminate the DAG?
+
+            to_prune (set): nodes to prune, if node is a conditional path, else None
+
+            metrics (dict): metrics of the instrumentation's collectors
+
+    """
+    if shared:
+        from primrose.shared_memory_store import attach_data_object
+
+        data_object = attach_data_object(data_object)
+
+    states = instrumentation.start(node, data_object)
+    node_instance = _import_node_class(class_name, class_path)(configuration, node)
+    before = set(data_object.data_dict.keys())
+
+    data_object, terminate = node_instance.run(data_object)
+
+    to_prune = None
+    if isinstance(node_instance, AbstractConditionalPath):
+        to_prune = node_instance.all_nodes_to_prune()
+
+    metrics = instrumentation.stop(node, data_object, states)
+
+    popped = before - set(data_object.data_dict.keys())
+    # futures and thunks cannot be sent back to the parent process, their values can
+    data_object.resolve(node)
+    entries = dict(data_object.data_dict.get(node, {}))
+    if shared:
+        from primrose.shared_memory_store import share_entries
+
+        entries = share_entries(entries)
+    return entries, popped, terminate, to_prune, metrics
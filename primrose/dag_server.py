@@ -0,0 +1,225 @@
+"""Long-running serving of a DAG: the DAG is set up, and the data that does not depend on the request (such as models
+read from disk) is loaded, once. Each request then only runs the nodes between an input node and an output node
+"""
+import os
+import json
+import time
+import logging
+import socketserver
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import networkx as nx
+import pandas as pd
+from primrose.dag_runner import DagRunner
+from primrose.data_object import DataObject, DataObjectResponseType
+from primrose.node_factory import NodeFactory
+from primrose.base.conditional_path_node import AbstractConditionalPath
+
+
+class DagServer:
+    """Runs a DAG on request data. Configured by metadata.serve:
+
+        - `input_node`: node whose data is replaced by the data of each request. It is not run
+        - `output_node`: node whose data is returned
+        - `output_key`: key of the data of output_node to return. By default, its only key, or `data`
+
+    Note:
+        at start up, the nodes that output_node depends on, other than input_node and the nodes downstream of it, run
+        once, and their data is kept. Each request runs the nodes from input_node to output_node, in traversal
+        order, on a copy of that data, with new instances of the nodes, so that requests do not share state.
+        Other nodes, such as writers of output_node's data, never run.
+
+    """
+
+    def __init__(self, configuration):
+        """set up the DAG and run the nodes that do not depend on the request
+
+        Args:
+            configuration (Configuration): Configuration instance, with metadata.serve
+
+        """
+        self.configuration = configuration
+        cfg = configuration.config_metadata["serve"]
+        self.input_node = cfg["input_node"]
+        self.output_node = cfg["output_node"]
+        self.output_key = cfg.get("output_key")
+
+        G = configuration.dag.G2
+        for node in [self.input_node, self.output_node]:
+            if not G.has_node(node):
+                raise Exception("metadata.serve: node %s is not in the DAG" % node)
+        if not nx.has_path(G, self.input_node, self.output_node):
+            raise Exception("metadata.serve: %s is not downstream of %s" % (self.output_node, self.input_node))
+
+        self.runner = DagRunner(configuration)
+        sequence = self.runner.dag_traverser.traversal_list()
+
+        downstream = nx.descendants(G, self.input_node)
+        needed = nx.ancestors(G, self.output_node)
+        self.request_sequence = [
+            node for node in sequence if node in downstream and (node in needed or node == self.output_node)
+        ]
+        warm_sequence = [node for node in sequence if node in needed and node not in downstream | {self.input_node}]
+
+        start = time.perf_counter()
+        logging.info("Warming up: running %s", warm_sequence)
+        self.runner.instrumentation.reset()
+        self.data_object = self.runner._run_sequentially(warm_sequence, DataObject(configuration), None, None)
+        self.data_object.resolve()
+        logging.info(
+            "Ready to serve %s -> %s in %.3fs, running %s per request",
+            self.input_node,
+            self.output_node,
+            time.perf_counter() - start,
+            self.request_sequence,
+        )
+
+    def _request_data_object(self):
+        """a DataObject holding a copy of the data loaded at start up, that a request can add to, and pop from.
+        It has no spill or shared memory storage, which would otherwise be set up, and left behind, by every request
+
+        Returns:
+            data_object (DataObject): instance of DataObject
+
+        """
+        data_object = DataObject(None)
+        data_object.config = self.configuration
+        data_object.data_dict = defaultdict(
+            dict, {instance_name: dict(entries) for instance_name, entries in self.data_object.data_dict.items()}
+        )
+        return data_object
+
+    def score(self, df):
+        """run the DAG on some request data
+
+        Args:
+            df (DataFrame): data of input_node
+
+        Returns:
+            data (object): data of output_node, under output_key
+
+        Raises:
+            Exception if output_node adds no data, e.g. because a node terminated the DAG
+
+        """
+        data_object = self._request_data_object()
+        data_object.restore(self.input_node, {DataObject.DATA_KEY: df})
+
+        pruned = set()
+        for node in self.request_sequence:
+            if node in pruned:
+                continue
+            class_name = self.configuration.nodename_to_classname[node]
+            node_instance = NodeFactory().instantiate(class_name, self.configuration, node)
+            data_object, terminate = node_instance.run(data_object)
+            if isinstance(node_instance, AbstractConditionalPath):
+                pruned.update(node_instance.all_nodes_to_prune())
+            if terminate:
+                logging.info("Terminating early due to signal from %s", node)
+                break
+
+        if self.output_node not in data_object.data_dict:
+            raise Exception("No data from output node %s" % self.output_node)
+
+        entries = data_object.get(self.output_node, rtype=DataObjectResponseType.KEY_VALUE.value)
+        key = self.output_key
+        if key is None:
+            key = list(entries.keys())[0] if len(entries) == 1 else DataObject.DATA_KEY
+        return entries[key]
+
+    @staticmethod
+    def to_json(data):
+        """JSON of the output of a request: dataframes as a list of records, numpy arrays as lists
+
+        Args:
+            data (object): data of output_node
+
+        Returns:
+            json (str)
+
+        """
+        if isinstance(data, (pd.DataFrame, pd.Series)):
+            return data.to_json(orient="records")
+        if hasattr(data, "tolist"):
+            data = data.tolist()
+        return json.dumps(data, default=str)
+
+
+class DagRequestHandler(BaseHTTPRequestHandler):
+    """HTTP requests to a DagServer:
+
+        - `POST /score` with a JSON list of records, or a JSON dictionary of column: list of values, as body.
+          Returns the output of the DAG as JSON
+        - `GET /health`
+
+    """
+
+    def address_string(self):
+        # the client address of a Unix socket is not a (host, port) tuple
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _respond(self, status, body):
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._respond(200, json.dumps({"status": "ok"}))
+        else:
+            self._respond(404, json.dumps({"error": "Unknown path %s" % self.path}))
+
+    def do_POST(self):
+        if self.path != "/score":
+            self._respond(404, json.dumps({"error": "Unknown path %s" % self.path}))
+            return
+
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            df = pd.DataFrame(payload)
+        except Exception as e:
+            self._respond(400, json.dumps({"error": "Could not read request data: %s" % e}))
+            return
+
+        try:
+            body = DagServer.to_json(self.server.dag_server.score(df))
+        except Exception as e:
+            logging.exception("Error scoring request")
+            self._respond(500, json.dumps({"error": str(e)}))
+            return
+
+        self._respond(200, body)
+        logging.info("Scored %s rows in %.1fms", len(df), 1000 * (time.perf_counter() - start))
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server on a Unix socket"""
+
+    daemon_threads = True
+
+
+def make_server(dag_server, host="127.0.0.1", port=8080, socket_path=None):
+    """an HTTP server of dag_server, on host and port, or on a Unix socket
+
+    Args:
+        dag_server (DagServer): the DAG to serve
+        host (str): host to listen on
+        port (int): port to listen on. 0 picks a free port
+        socket_path (str): path of a Unix socket to listen on instead, if any. An existing file is replaced
+
+    Returns:
+        server (socketserver.BaseServer): call `serve_forever()` on it
+
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, DagRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), DagRequestHandler)
+    server.dag_server = dag_server
+    return server
@@ -9,6 +9,7 @@ from collections import defaultdict
 import logging
 from enum import Enum
 import dill
+from primrose.deferred import is_deferred
 
 
 class DataObjectResponseType(Enum):
@@ -41,6 +42,46 @@ class DataObjectResponseType(Enum):
         return list(map(lambda t: t.value, DataObjectResponseType))
 
 
+class DataObjectCacheFormat(Enum):
+    """Format of a DataObject cache
+
+    DILL = the whole DataObject, including its Configuration, in one dill file
+
+    DIRECTORY = a directory with one file per instance name and key, and a manifest. Dataframes are stored as Parquet
+        (if pyarrow is installed) and numpy arrays as .npy, which is memory-mapped when read. Data is only
+        loaded when a node first uses it
+
+    """
+
+    DILL = "dill"
+    DIRECTORY = "directory"
+
+    @staticmethod
+    def values():
+        """ list of all the values in the enum"""
+        return list(map(lambda t: t.value, DataObjectCacheFormat))
+
+
+class DataObjectStorage(Enum):
+    """Where the DataObject keeps its data
+
+    MEMORY = in the memory of the process running the DAG. Worker processes of a `process` executor get a pickled
+        copy of the data
+
+    SHARED_MEMORY = dataframes (if pyarrow is installed) and numpy arrays are placed in shared memory segments
+        when they are first sent to a worker process, which then reads them in place rather than unpickling a copy
+
+    """
+
+    MEMORY = "memory"
+    SHARED_MEMORY = "shared_memory"
+
+    @staticmethod
+    def values():
+        """ list of all the values in the enum"""
+        return list(map(lambda t: t.value, DataObjectStorage))
+
+
 class DataObject:
     """DataObject: a container for "data" (strings, dicts, arbitrary objects etc)"""
 
@@ -60,30 +101,135 @@ class DataObject:
         self.config = config
         self.data_dict = defaultdict(dict)
 
+        # RunReport of the DagRunner's run, set by DagRunner
+        self.run_report = None
+
+        # SpillStore, if metadata.data_object sets a memory budget
+        self.spill = None
+        cfg = {}
+        if config is not None and config.config_metadata and "data_object" in config.config_metadata:
+            cfg = config.config_metadata["data_object"]
+        if "memory_budget_mb" in cfg:
+            from primrose.data_object_cache import SpillStore
+
+            budget_bytes = int(float(cfg["memory_budget_mb"]) * 1024 * 1024)
+            self.spill = SpillStore(budget_bytes, cfg.get("spill_dir"))
+
+        # SharedMemoryStore, if metadata.data_object keeps data in shared memory
+        self.shared_memory = None
+        if cfg.get("storage") == DataObjectStorage.SHARED_MEMORY.value:
+            from primrose.shared_memory_store import SharedMemoryStore
+
+            self.shared_memory = SharedMemoryStore()
+
+    def _track(self, instance_name, key):
+        """account for a new entry in the memory budget, if any, spilling other entries to disk if over budget
+
+        Args:
+            instance_name (str): name of node in DAG
+            key (str): key of entry
+
+        """
+        if self.spill is None:
+            return
+
+        from primrose.data_object_cache import LazyEntries
+
+        entries = self.data_dict[instance_name]
+        if not isinstance(entries, LazyEntries):
+            entries = self.data_dict[instance_name] = LazyEntries(entries)
+        # entries that are loaded back from disk count against the budget again
+        entries.on_load = lambda key, value: self.spill.track(self.data_dict, instance_name, key)
+
+        self.spill.track(self.data_dict, instance_name, key)
+
+    def resolve(self, instance_name=None):
+        """replace the futures and thunks (Lazy) stored for instance_name by their values, waiting for them if need be
+
+        Args:
+            instance_name (str): name of node in DAG. If None, those of every instance
+
+        Returns:
+            nothing. Side effect is that the data of instance_name is all known
+
+        Raises:
+            the exception raised by a future's or thunk's function, if any
+
+        """
+        instance_names = list(self.data_dict.keys()) if instance_name is None else [instance_name]
+        for name in instance_names:
+            if name in self.data_dict:
+                DataObject._resolve_entries(self.data_dict[name], lambda key: self._track(name, key))
+
+    @staticmethod
+    def _resolve_entries(entries, on_resolve=None):
+        """replace the futures and thunks in a dictionary of key: data by their values
+
+        Args:
+            entries (dict): dictionary of key: data
+            on_resolve (func): function of key called once its value is known
+
+        """
+        for key in list(entries.keys()):
+            # without loading data spilled to disk
+            value = dict.__getitem__(entries, key)
+            if is_deferred(value):
+                entries[key] = value.result()
+                if on_resolve is not None:
+                    on_resolve(key)
+
+    def __getstate__(self):
+        """pickled copies, e.g. in worker processes or dill caches, hold the values of futures and thunks
+
+        Returns:
+            state (dict)
+
+        """
+        self.resolve()
+        return self.__dict__
+
     @staticmethod
-    def read_from_cache(filename):
-        """restore DatObject from dill-cached file
+    def read_from_cache(filename, config=None):
+        """restore DatObject from dill-cached file, or from a cache directory
 
         Args:
-            filename (str): cache filename
+            filename (str): cache filename, or directory written with the `directory` cache format
+            config (Configuration): Configuration instance of the restored DataObject, for a cache directory.
+                A dill-cached file holds its own
 
         Returns:
             data_object (DataObject): DataObject instance from cache
 
         """
         assert os.path.exists(filename)
+        if os.path.isdir(filename):
+            from primrose.data_object_cache import restore_cache_dir
+
+            return restore_cache_dir(DataObject(config), filename)
+
         with open(filename, "rb") as f:
             data_object = dill.load(f)
             assert isinstance(data_object, DataObject)
             return data_object
 
-    def write_to_cache(self, filename):
-        """write data_object (self) to dill-cache
+    def write_to_cache(self, filename, cache_format=DataObjectCacheFormat.DILL.value):
+        """write data_object (self) to dill-cache, or to a cache directory
+
+        Args:
+            filename (str): cache filename, or directory for the `directory` cache format
+            cache_format (str): DataObjectCacheFormat value
 
         Returns:
             nothing. Side effect is to cache object to file
 
         """
+        if cache_format == DataObjectCacheFormat.DIRECTORY.value:
+            from primrose.data_object_cache import write_cache_dir
+
+            logging.info("Cache DataObect to directory " + filename)
+            write_cache_dir(self, filename)
+            return
+
         with open(filename, "wb") as f:
             logging.info("Cache DataObect to " + filename)
             dill.dump(self, f)
@@ -102,7 +248,8 @@ class DataObject:
 
         Args:
             requestor (Node): is object (model, pipeline, writer etc) that has instance_name attribute
-            data (object): some object
+            data (object): some object. A concurrent.futures.Future, or a thunk (Lazy), is stored as is, and replaced
+                by its value the first time that the data is got, waiting for the future then
             key (string): if not supplied default data key is used
 
         Returns:
@@ -120,9 +267,11 @@ class DataObject:
 
         # as this is  defaultdict(dict) it should update existing dict with new key
         self.data_dict[requestor.instance_name][key] = data
+        self._track(requestor.instance_name, key)
 
     def get(self, instance_name, pop_data=False, rtype=DEFAULT_RESPONSE_TYPE):
-        """get some data from storage, optionally popping it off.
+        """get some data from storage, optionally popping it off. Futures and thunks among the data are replaced by
+        their values first, waiting for them if need be.
 
         Args:
             instance_name (str): name of node in DAG
@@ -149,8 +298,15 @@ class DataObject:
         d = None
         if pop_data:
             d = self.data_dict.pop(instance_name)
+            if self.spill is not None:
+                # spilled entries of d can still be loaded, until the DataObject is deleted
+                self.spill.release_sizes(instance_name)
+            DataObject._resolve_entries(d)
         else:
+            self.resolve(instance_name)
             d = self.data_dict[instance_name]
+            if self.spill is not None:
+                self.spill.touch(instance_name)
 
         if rtype == DataObjectResponseType.INSTANCE_KEY_VALUE.value:
             return {instance_name: d}
@@ -167,6 +323,38 @@ class DataObject:
             # otherwise return whatever d is
             return d
 
+    def restore(self, instance_name, entries):
+        """set data for instance_name that was produced elsewhere, e.g. loaded from a cache or sent back from a worker process
+
+        Args:
+            instance_name (str): name of node in DAG
+            entries (dict): dictionary of key:data
+
+        Returns:
+            nothing. Side effect is to (over)write these keys for instance_name
+
+        """
+        for key, data in entries.items():
+            self.data_dict[instance_name][key] = data
+            self._track(instance_name, key)
+
+    def release(self, instance_name):
+        """release all data stored for instance_name, if any, so that it can be garbage collected
+
+        Args:
+            instance_name (str): name of node in DAG
+
+        Returns:
+            whether any data was released (bool)
+
+        """
+        if self.spill is not None:
+            self.spill.release(instance_name)
+        released = self.data_dict.pop(instance_name, None) is not None
+        if self.shared_memory is not None:
+            self.shared_memory.release(instance_name)
+        return released
+
     def upstream_keys(self, instance_name, operation_type_filter=None):
         """get list of upstream node names for a given input requestor node
 
@@ -0,0 +1,394 @@
+"""Directory cache format of the DataObject, one file per instance and key, restored lazily, and spilling of the
+DataObject's data to disk to keep it within a memory budget
+"""
+import os
+import json
+import uuid
+import shutil
+import logging
+import weakref
+import tempfile
+import collections
+import dill
+import numpy as np
+from primrose.chunked_data_frame import ChunkedDataFrame
+from primrose.instrumentation import OutputSizeCollector
+from primrose.deferred import is_deferred
+
+try:
+    import pyarrow
+
+    HAS_PYARROW = True
+
+except ImportError:
+    HAS_PYARROW = False
+
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def _is_dataframe(value):
+    """is value a pandas DataFrame? Duck typed, so that this module does not need to import pandas"""
+    return type(value).__name__ == "DataFrame" and hasattr(value, "to_parquet")
+
+
+def _is_ndarray(value):
+    """is value a numpy array of numbers, which np.save writes without pickling?"""
+    return isinstance(value, np.ndarray) and not value.dtype.hasobject
+
+
+def save_entry(value, path):
+    """save one value of the DataObject: dataframes as Parquet (if pyarrow is installed), numpy arrays as .npy,
+    everything else with dill
+
+    Args:
+        value (object): data
+        path (str): path of file, without extension
+
+    Returns:
+        (tuple): tuple containing:
+
+            filename (str): name of the file written, with its extension
+
+            file_format (str): `parquet`, `npy` or `dill`
+
+    """
+    if HAS_PYARROW and _is_dataframe(value):
+        try:
+            value.to_parquet(path + ".parquet")
+            return path + ".parquet", "parquet"
+        except Exception:
+            # e.g. columns of mixed types, or non-string column names
+            logging.debug("Could not write %s as Parquet", path, exc_info=True)
+            if os.path.exists(path + ".parquet"):
+                os.remove(path + ".parquet")
+
+    if _is_ndarray(value):
+        np.save(path + ".npy", value, allow_pickle=False)
+        return path + ".npy", "npy"
+
+    with open(path + ".dill", "wb") as f:
+        dill.dump(value, f)
+    return path + ".dill", "dill"
+
+
+def load_entry(filename, file_format):
+    """load one value saved by save_entry. Numpy arrays are memory-mapped, copy on write, so that only the pages that
+    are read are loaded, and Parquet files are memory-mapped while they are read
+
+    Args:
+        filename (str): name of file
+        file_format (str): `parquet`, `npy` or `dill`
+
+    Returns:
+        value (object)
+
+    """
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(filename, memory_map=True).to_pandas()
+
+    if file_format == "npy":
+        # a plain ndarray view of the memory map, which, unlike np.memmap, can be pickled, e.g. by a checkpoint
+        return np.asarray(np.load(filename, mmap_mode="c", allow_pickle=False))
+
+    with open(filename, "rb") as f:
+        return dill.load(f)
+
+
+class _CachedEntry:
+    """placeholder of a value that has not been loaded from the cache yet"""
+
+    def __init__(self, filename, file_format):
+        self.filename = filename
+        self.file_format = file_format
+
+    def load(self):
+        logging.debug("Loading %s from DataObject cache", self.filename)
+        return load_entry(self.filename, self.file_format)
+
+
+class LazyEntries(dict):
+    """dictionary of key: data of an instance where values are only loaded from the cache the first time that they
+    are needed, and then replaced by the data itself.
+
+    Note:
+        `in`, `keys()` and `del` do not load anything. Getting a value, including through `get`, `pop`, `values()`
+        and `items()`, or copying the dictionary, does.
+
+    """
+
+    # optional function of (key, value) called when a value is loaded, e.g. by SpillStore to account for it
+    on_load = None
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, _CachedEntry):
+            value = value.load()
+            super().__setitem__(key, value)
+            if self.on_load is not None:
+                self.on_load(key, value)
+        return value
+
+    def is_loaded(self, key):
+        """is the value of key in memory?
+
+        Args:
+            key (str): key
+
+        Returns:
+            determination (bool)
+
+        """
+        return not isinstance(super().__getitem__(key), _CachedEntry)
+
+    def unload(self, key, filename, file_format):
+        """replace the value of key by a placeholder of a value saved to filename, which is loaded when next needed
+
+        Args:
+            key (str): key
+            filename (str): name of file
+            file_format (str): `parquet`, `npy` or `dill`
+
+        """
+        super().__setitem__(key, _CachedEntry(filename, file_format))
+
+    def __iter__(self):
+        # overriding __iter__ stops dict(), and dict.update, from copying the placeholders rather than the data
+        return super().__iter__()
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            super().pop(key)
+            return value
+        return super().pop(key, *default)
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def copy(self):
+        return dict(self.items())
+
+    def __reduce__(self):
+        # e.g. when sent to a worker process, or checkpointed: send the data
+        return (dict, (self.items(),))
+
+
+class SpillStore:
+    """Keeps the data of a DataObject within a memory budget by spilling the least recently used entries to disk.
+
+    Note:
+        The size of each entry is estimated when it is added. When the total is over budget, the least recently used
+        entries, other than those of the instance being accessed, are saved with save_entry and replaced by
+        placeholders. A spilled entry is loaded back, and accounted for again, the next time it is read.
+
+        Entries that cannot be saved, streamed data (ChunkedDataFrames, which are small), and futures and thunks
+        whose values are not known yet, are never spilled.
+
+    """
+
+    def __init__(self, budget_bytes, dirname=None):
+        """instantiate the store
+
+        Args:
+            budget_bytes (int): memory budget of the DataObject's data in bytes
+            dirname (str): directory to spill to. If None, a temporary directory, deleted with the store
+
+        """
+        self.budget_bytes = budget_bytes
+        if dirname is None:
+            dirname = tempfile.mkdtemp(prefix="primrose_spill_")
+            weakref.finalize(self, shutil.rmtree, dirname, True)
+        else:
+            os.makedirs(dirname, exist_ok=True)
+        self.dirname = dirname
+
+        # (instance_name, key): size in bytes, of entries in memory, least recently used first
+        self.sizes = collections.OrderedDict()
+        self.total = 0
+        self.files = {}
+        self.n_spilled = 0
+        self.bytes_spilled = 0
+
+    def __getstate__(self):
+        """copies of the DataObject, e.g. in worker processes, hold all their data in memory and never spill"""
+        state = self.__dict__.copy()
+        state["budget_bytes"] = None
+        state["sizes"] = collections.OrderedDict()
+        state["files"] = {}
+        return state
+
+    def track(self, data_dict, instance_name, key):
+        """account for an entry that was added or loaded back, then spill entries if over budget
+
+        Args:
+            data_dict (dict): data of the DataObject
+            instance_name (str): name of node in DAG
+            key (str): key of the entry
+        """
+        if self.budget_bytes is None:
+            return
+
+        value = dict.__getitem__(data_dict[instance_name], key)
+        if isinstance(value, ChunkedDataFrame) or is_deferred(value):
+            # a future or thunk is accounted for once its value is known
+            return
+
+        self._forget(instance_name, key)
+        size = OutputSizeCollector.size_of(value)
+        self.sizes[(instance_name, key)] = size
+        self.total += size
+        self.spill(data_dict, protect=instance_name)
+
+    def touch(self, instance_name):
+        """mark the entries of instance_name as most recently used
+
+        Args:
+            instance_name (str): name of node in DAG
+
+        """
+        for instance_key in [instance_key for instance_key in self.sizes if instance_key[0] == instance_name]:
+            self.sizes.move_to_end(instance_key)
+
+    def _forget(self, instance_name, key):
+        """stop accounting for an entry"""
+        size = self.sizes.pop((instance_name, key), None)
+        if size is not None:
+            self.total -= size
+
+    def release_sizes(self, instance_name):
+        """stop accounting for the entries of instance_name, e.g. once they are popped from the DataObject
+
+        Args:
+            instance_name (str): name of node in DAG
+
+        """
+        for instance_key in [instance_key for instance_key in self.sizes if instance_key[0] == instance_name]:
+            self._forget(*instance_key)
+
+    def release(self, instance_name):
+        """stop accounting for the entries of instance_name, and delete any spilled files
+
+        Args:
+            instance_name (str): name of node in DAG
+
+        """
+        self.release_sizes(instance_name)
+        for instance_key in [instance_key for instance_key in self.files if instance_key[0] == instance_name]:
+            filename = self.files.pop(instance_key)
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def spill(self, data_dict, protect=None):
+        """spill the least recently used entries to disk until the data fits in the budget
+
+        Args:
+            data_dict (dict): data of the DataObject
+            protect (str): name of an instance whose entries must stay in memory
+
+        Returns:
+            number of entries spilled (int)
+
+        """
+        n = 0
+        for instance_name, key in list(self.sizes):
+            if self.total <= self.budget_bytes:
+                break
+            if instance_name == protect:
+                continue
+
+            entries = data_dict.get(instance_name)
+            size = self.sizes[(instance_name, key)]
+            self._forget(instance_name, key)
+            if not isinstance(entries, LazyEntries) or key not in entries:
+                continue
+
+            path = os.path.join(self.dirname, uuid.uuid4().hex)
+            try:
+                filename, file_format = save_entry(dict.__getitem__(entries, key), path)
+            except Exception:
+                logging.warning("Could not spill %s:%s to disk, keeping it in memory", instance_name, key)
+                continue
+
+            entries.unload(key, filename, file_format)
+            self.files[(instance_name, key)] = filename
+            self.n_spilled += 1
+            self.bytes_spilled += size
+            n += 1
+            logging.info(
+                "Spilled %s:%s (%s bytes) to disk, %s of %s bytes now in memory",
+                instance_name,
+                key,
+                size,
+                self.total,
+                self.budget_bytes,
+            )
+        return n
+
+
+def write_cache_dir(data_object, dirname):
+    """write the data of data_object to directory dirname, one file per instance and key, with a manifest.
+    The configuration is not written: it is that of the run that reads the cache
+
+    Args:
+        data_object (DataObject): instance of DataObject
+        dirname (str): directory to write. If it exists, it is replaced
+
+    Returns:
+        manifest (dict): {instance_name: {key: {"filename": filename relative to dirname, "format": format}}}
+
+    """
+    # write to a temporary directory then swap, so that a failure midway leaves any earlier cache intact
+    tmp_dirname = dirname.rstrip(os.path.sep) + ".tmp"
+    shutil.rmtree(tmp_dirname, ignore_errors=True)
+    os.makedirs(tmp_dirname)
+
+    manifest = {}
+    for i, (instance_name, entries) in enumerate(data_object.data_dict.items()):
+        manifest[instance_name] = {}
+        os.makedirs(os.path.join(tmp_dirname, str(i)))
+        for j, (key, value) in enumerate(entries.items()):
+            filename, file_format = save_entry(value, os.path.join(tmp_dirname, str(i), str(j)))
+            manifest[instance_name][key] = {
+                "filename": os.path.relpath(filename, tmp_dirname),
+                "format": file_format,
+            }
+
+    with open(os.path.join(tmp_dirname, MANIFEST_FILENAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(dirname):
+        shutil.rmtree(dirname)
+    os.rename(tmp_dirname, dirname)
+    return manifest
+
+
+def restore_cache_dir(data_object, dirname):
+    """restore the data written by write_cache_dir into data_object. Values are only loaded when they are first used
+
+    Args:
+        data_object (DataObject): instance of DataObject
+        dirname (str): directory written by write_cache_dir
+
+    Returns:
+        data_object (DataObject): instance of DataObject
+
+    """
+    with open(os.path.join(dirname, MANIFEST_FILENAME), "r") as f:
+        manifest = json.load(f)
+
+    for instance_name, entries in manifest.items():
+        lazy = LazyEntries()
+        for key, entry in entries.items():
+            lazy[key] = _CachedEntry(os.path.join(dirname, entry["filename"]), entry["format"])
+        data_object.data_dict[instance_name] = lazy
+
+    return data_object
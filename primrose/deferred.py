@@ -0,0 +1,220 @@
+"""Deferred values of the DataObject: futures and thunks that are only waited for, or computed, when a node gets them"""
+import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+# number of threads of the background pool that runs the functions passed to submit
+BACKGROUND_WORKERS = 8
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+# futures of the functions passed to submit that have not finished yet
+_PENDING = set()
+
+
+class Lazy:
+    """a thunk: a function, and its arguments, called the first time that its value is needed
+
+    Note:
+        the value is computed once, even when several threads need it at the same time. Like a future, it takes
+        callbacks, called once the value is computed
+
+    """
+
+    _UNSET = object()
+
+    def __init__(self, fn, *args, **kwargs):
+        """instantiate the thunk
+
+        Args:
+            fn (func): function that computes the value
+            args: positional arguments of fn
+            kwargs: keyword arguments of fn
+
+        """
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self._value = Lazy._UNSET
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def result(self):
+        """the value, computing it if it has not been computed yet
+
+        Returns:
+            value (object)
+
+        """
+        callbacks = []
+        with self._lock:
+            if self._value is Lazy._UNSET:
+                self._value = self.fn(*self.args, **self.kwargs)
+                # let the arguments be garbage collected
+                self.fn, self.args, self.kwargs = None, None, None
+                callbacks, self._callbacks = self._callbacks, []
+            value = self._value
+        # outside of the lock, as callbacks get the value
+        for fn in callbacks:
+            fn(self)
+        return value
+
+    def add_done_callback(self, fn):
+        """call fn(self) once the value is computed, or now if it already is
+
+        Args:
+            fn (func): function of the thunk
+
+        """
+        with self._lock:
+            if self._value is Lazy._UNSET:
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+
+def is_deferred(value):
+    """is value a future or a thunk, whose value is not known yet?
+
+    Args:
+        value (object): data
+
+    Returns:
+        determination (bool)
+
+    """
+    return isinstance(value, (Future, Lazy))
+
+
+def resolve(value):
+    """the value of a future or thunk, waiting for it or computing it if need be. Other values are returned as is
+
+    Args:
+        value (object): data
+
+    Returns:
+        value (object)
+
+    Raises:
+        the exception raised by the future's or the thunk's function, if any
+
+    """
+    if isinstance(value, (Future, Lazy)):
+        logging.debug("Waiting for deferred value %s", value)
+        return value.result()
+    return value
+
+
+def when_resolved(entries, fn):
+    """call fn with entries, futures and thunks replaced by their values, once all of those values are known, without
+    waiting for them
+
+    Note:
+        fn is called straight away if there are no futures or thunks among the entries. Otherwise it is called by
+        the thread that completes the last future or thunk. It is not called if a future fails or is cancelled, nor
+        if a thunk is never computed, in which case the returned future never completes
+
+    Args:
+        entries (dict): key: data
+        fn (func): function of a dictionary of key: value
+
+    Returns:
+        future (concurrent.futures.Future) of the result of fn, done once fn has returned. It fails with the
+        exception of fn, or of the first future among the entries that fails
+
+    """
+    result = Future()
+    entries = dict(entries)
+    pending = [value for value in entries.values() if is_deferred(value)]
+    if not pending:
+        result.set_result(fn(entries))
+        return result
+
+    remaining = [len(pending)]
+    lock = threading.Lock()
+
+    def done(value):
+        with lock:
+            if result.done():
+                return
+            if isinstance(value, Future) and value.cancelled():
+                result.cancel()
+                return
+            if isinstance(value, Future) and value.exception() is not None:
+                result.set_exception(value.exception())
+                return
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            result.set_result(fn({key: resolve(value) for key, value in entries.items()}))
+        except Exception as e:
+            logging.exception("Error handling resolved values")
+            result.set_exception(e)
+
+    for value in pending:
+        value.add_done_callback(done)
+    return result
+
+
+def submit(fn, *args, **kwargs):
+    """run fn(*args, **kwargs) on a background pool of threads, shared by the whole process
+
+    Note:
+        for I/O, such as downloads or SQL queries, that can overlap with the nodes that run in the meantime. Add the
+        returned future to the DataObject: the node that gets it waits for its result
+
+    Args:
+        fn (func): function to run
+        args: positional arguments of fn
+        kwargs: keyword arguments of fn
+
+    Returns:
+        future (concurrent.futures.Future)
+
+    """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="primrose_background")
+        future = _EXECUTOR.submit(fn, *args, **kwargs)
+        _PENDING.add(future)
+    future.add_done_callback(_discard_pending)
+    return future
+
+
+def _discard_pending(future):
+    """forget a finished future of submit"""
+    with _EXECUTOR_LOCK:
+        _PENDING.discard(future)
+
+
+def wait_for_background(timeout=None):
+    """wait for the functions passed to submit that are queued or running, e.g. before closing resources they use
+
+    Args:
+        timeout (float): maximum number of seconds to wait, or None to wait until they have all finished
+
+    Returns:
+        number of functions that had not finished within timeout (int)
+
+    """
+    with _EXECUTOR_LOCK:
+        pending = list(_PENDING)
+    if pending:
+        logging.info("Waiting for %s background tasks to finish", len(pending))
+    _, not_done = wait(pending, timeout=timeout)
+    return len(not_done)
+
+
+def _forget_executor():
+    """in a forked child process, the threads of the parent's pool do not exist: start a new pool when needed"""
+    global _EXECUTOR, _EXECUTOR_LOCK
+    _EXECUTOR = None
+    _EXECUTOR_LOCK = threading.Lock()
+    _PENDING.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_executor)
@@ -0,0 +1,421 @@
+"""Per-node instrumentation of a DAG run: timing, memory and output sizes, collected into a RunReport"""
+import io
+import csv
+import sys
+import time
+import json
+import logging
+import threading
+import tracemalloc
+from abc import ABC, abstractmethod
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # not available on Windows
+    resource = None
+
+
+class AbstractCollector(ABC):
+    """A collector measures something about each node that is run. Users can plug in their own collectors by
+    subclassing this class and registering it with CollectorFactory
+
+    Note:
+        with a thread pool, start and stop of a node are called on the thread that runs the node, and several nodes
+        may be measured at the same time. Keep any per node state in the value returned by `start`.
+
+    """
+
+    def __init__(self, instrumentation_config):
+        """instantiate the collector
+
+        Args:
+            instrumentation_config (dict): the metadata.instrumentation section of the configuration
+
+        """
+        self.instrumentation_config = instrumentation_config
+
+    @abstractmethod
+    def start(self, node, data_object):
+        """called just before node is run
+
+        Args:
+            node (str): name of node
+            data_object (DataObject): instance of DataObject
+
+        Returns:
+            state (object): anything that `stop` needs
+
+        """
+        pass  # pragma: no cover
+
+    @abstractmethod
+    def stop(self, node, data_object, state):
+        """called just after node has run
+
+        Args:
+            node (str): name of node
+            data_object (DataObject): instance of DataObject
+            state (object): value returned by `start`
+
+        Returns:
+            metrics (dict): metric name: value
+
+        """
+        pass  # pragma: no cover
+
+
+class TimingCollector(AbstractCollector):
+    """wall time and CPU time of each node
+
+    Note:
+        CPU time is that of the whole process so, with a thread pool, it includes nodes running at the same time
+
+    """
+
+    def start(self, node, data_object):
+        return time.perf_counter(), time.process_time()
+
+    def stop(self, node, data_object, state):
+        wall, cpu = state
+        return {"wall_time_s": time.perf_counter() - wall, "cpu_time_s": time.process_time() - cpu}
+
+
+class MemoryCollector(AbstractCollector):
+    """growth of the peak RSS of the process while the node ran and, if `tracemalloc` is true in
+    metadata.instrumentation, the peak of memory allocated by Python while the node ran
+
+    Note:
+        peak RSS only ever grows, so a node that allocates less than some earlier node reports 0.
+        tracemalloc gives the node's own peak, but slows Python allocations down noticeably. It needs
+        `tracemalloc.reset_peak`, new in Python 3.9: on older versions the tracemalloc peak is None.
+
+    """
+
+    def __init__(self, instrumentation_config):
+        super().__init__(instrumentation_config)
+        self.tracemalloc = str(instrumentation_config.get("tracemalloc", False)).lower() == "true"
+        if self.tracemalloc and not hasattr(tracemalloc, "reset_peak"):
+            logging.warning("tracemalloc peaks per node need Python 3.9 or later, not reporting them")
+            self.tracemalloc = False
+            self.tracemalloc_unsupported = True
+        else:
+            self.tracemalloc_unsupported = False
+        if self.tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @staticmethod
+    def peak_rss():
+        """peak resident set size of this process in bytes, or None if it cannot be determined"""
+        if resource is None:
+            return None
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+    def start(self, node, data_object):
+        if self.tracemalloc:
+            tracemalloc.reset_peak()
+            return self.peak_rss(), tracemalloc.get_traced_memory()[0]
+        return self.peak_rss(), None
+
+    def stop(self, node, data_object, state):
+        rss, traced = state
+        after = self.peak_rss()
+        metrics = {"peak_rss_delta_bytes": after - rss if after is not None else None}
+        if self.tracemalloc:
+            metrics["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1] - traced
+        elif self.tracemalloc_unsupported:
+            metrics["tracemalloc_peak_bytes"] = None
+        return metrics
+
+
+class OutputSizeCollector(AbstractCollector):
+    """number of objects and bytes of data that each node added to the DataObject"""
+
+    @staticmethod
+    def size_of(value):
+        """approximate size of an object in bytes
+
+        Args:
+            value (object): some data
+
+        Returns:
+            size in bytes (int)
+
+        """
+        if hasattr(value, "memory_usage"):
+            # pandas DataFrame (a Series of bytes per column) or Series (an int)
+            usage = value.memory_usage(index=True, deep=True)
+            return int(usage.sum() if hasattr(usage, "sum") else usage)
+        if hasattr(value, "nbytes"):
+            # numpy arrays
+            return int(value.nbytes)
+        return sys.getsizeof(value)
+
+    def start(self, node, data_object):
+        return None
+
+    def stop(self, node, data_object, state):
+        entries = data_object.data_dict.get(node, {})
+        return {
+            "output_keys": len(entries),
+            "output_bytes": sum(self.size_of(value) for value in entries.values()),
+        }
+
+
+class CollectorFactory:
+    """Singleton Factory where one can register collectors for instantiation"""
+
+    instance = None
+
+    def __init__(self):
+        """instantiate the factory but as a singleton. The guard raails are here"""
+        if not CollectorFactory.instance:
+            CollectorFactory.instance = CollectorFactory.__HiddenFactory()
+
+    def __getattr__(self, name):
+        """getattr with instance name
+
+        Returns:
+            gettattr
+
+        """
+        return getattr(self.instance, name)
+
+    class __HiddenFactory:
+        """actual factory where registry and instantiation happens"""
+
+        def __init__(self):
+            """instantiate the HiddenFactory"""
+            self.name_dict = {}
+            self.register("TimingCollector", TimingCollector)
+            self.register("MemoryCollector", MemoryCollector)
+            self.register("OutputSizeCollector", OutputSizeCollector)
+            # OutputSizeCollector walks every cell of object columns, so it is opt-in
+            self.DEFAULT_COLLECTORS = ["TimingCollector", "MemoryCollector"]
+
+        def register(self, key, class_obj):
+            """Registering class_obj with key
+
+            Args:
+                key (str): key such as class name, e.g. 'TimingCollector'
+                class_obj (class obj), e.g. TimingCollector
+
+            Returns:
+                nothing. Side effect is to register the class
+
+            """
+            self.name_dict[key] = class_obj
+            logging.debug("Registered %s : %s", key, class_obj)
+
+        def instantiate(self, class_name, instrumentation_config):
+            """instantiate a collector, given name of collector class
+
+            Args:
+                class_name (str): name of the class
+                instrumentation_config (dict): the metadata.instrumentation section of the configuration
+
+            Returns:
+                instance (AbstractCollector): instance of a collector
+
+            """
+            return self.name_dict[class_name](instrumentation_config)
+
+
+class RunReport:
+    """structured report of a DAG run: one row per node with the node's status and the metrics of all collectors"""
+
+    def __init__(self):
+        """instantiate the report"""
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        """the lock cannot be pickled, e.g. when the DataObject is cached"""
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add(self, row):
+        """add the row of a node
+
+        Args:
+            row (dict): node, class, section, status and metrics
+
+        """
+        with self._lock:
+            self.rows.append(row)
+
+    def row(self, node):
+        """the row of a node, or None if the node is not in the report
+
+        Args:
+            node (str): name of node
+
+        Returns:
+            row (dict)
+
+        """
+        return next((row for row in self.rows if row["node"] == node), None)
+
+    def to_dataframe(self):
+        """report as a dataframe, one row per node in the order that they finished
+
+        Returns:
+            dataframe (pandas.DataFrame)
+
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.rows)
+
+    def to_json(self, filename=None):
+        """report as JSON
+
+        Args:
+            filename (str): if given, write the report to this file
+
+        Returns:
+            JSON string (str)
+
+        """
+        report = json.dumps(self.rows, indent=2, default=str)
+        if filename:
+            with open(filename, "w") as f:
+                f.write(report)
+        return report
+
+    def to_csv(self, filename=None):
+        """report as CSV
+
+        Args:
+            filename (str): if given, write the report to this file
+
+        Returns:
+            CSV string (str)
+
+        """
+        fieldnames = []
+        for row in self.rows:
+            fieldnames.extend(key for key in row if key not in fieldnames)
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(self.rows)
+        report = buffer.getvalue()
+        if filename:
+            with open(filename, "w") as f:
+                f.write(report)
+        return report
+
+
+class Instrumentation:
+    """runs the collectors around each node and builds the RunReport of a run. Configured by metadata.instrumentation:
+
+        - `enabled`: boolean, default true
+        - `collectors`: list of names of registered collectors, default TimingCollector and MemoryCollector
+        - `tracemalloc`: boolean, default false. Used by MemoryCollector
+        - `report_json`, `report_csv`: optional filenames to write the report to at the end of the run
+
+    """
+
+    def __init__(self, configuration):
+        """instantiate the instrumentation
+
+        Args:
+            configuration (Configuration): Configuration instance
+
+        """
+        self.configuration = configuration
+        self.config = {}
+        if configuration.config_metadata and "instrumentation" in configuration.config_metadata:
+            self.config = configuration.config_metadata["instrumentation"]
+
+        self.enabled = str(self.config.get("enabled", True)).lower() == "true"
+
+        names = self.config.get("collectors", CollectorFactory().DEFAULT_COLLECTORS)
+        self.collectors = [CollectorFactory().instantiate(name, self.config) for name in names] if self.enabled else []
+
+        self.report = RunReport()
+
+    def __getstate__(self):
+        """worker processes only run the collectors: leave out the configuration (sent separately) and the report"""
+        state = self.__dict__.copy()
+        state["configuration"] = None
+        state["report"] = None
+        return state
+
+    def reset(self):
+        """start a new report, for a new run
+
+        Returns:
+            report (RunReport)
+
+        """
+        self.report = RunReport()
+        return self.report
+
+    def start(self, node, data_object):
+        """start the collectors for a node
+
+        Args:
+            node (str): name of node
+            data_object (DataObject): instance of DataObject
+
+        Returns:
+            states (list): state of each collector
+
+        """
+        return [collector.start(node, data_object) for collector in self.collectors]
+
+    def stop(self, node, data_object, states):
+        """stop the collectors for a node
+
+        Args:
+            node (str): name of node
+            data_object (DataObject): instance of DataObject
+            states (list): value returned by `start`
+
+        Returns:
+            metrics (dict): metrics of all collectors
+
+        """
+        metrics = {}
+        for collector, state in zip(self.collectors, states):
+            metrics.update(collector.stop(node, data_object, state))
+        return metrics
+
+    def record(self, node, status, metrics=None):
+        """add the row of a node to the report
+
+        Args:
+            node (str): name of node
+            status (str): `ran`, `cached`, `pruned` or `failed`
+            metrics (dict): metrics of all collectors, if any
+
+        """
+        if not self.enabled:
+            return
+        row = {
+            "node": node,
+            "class": self.configuration.nodename_to_classname[node],
+            "section": self.configuration.dag.node_map[node],
+            "status": status,
+        }
+        row.update(metrics or {})
+        self.report.add(row)
+
+    def write_report(self):
+        """write the report to the files given in metadata.instrumentation, if any"""
+        if "report_json" in self.config:
+            logging.info("Writing run report to %s", self.config["report_json"])
+            self.report.to_json(self.config["report_json"])
+        if "report_csv" in self.config:
+            logging.info("Writing run report to %s", self.config["report_csv"])
+            self.report.to_csv(self.config["report_csv"])
@@ -0,0 +1,92 @@
+"""A sklearn estimator whose fits are cached on disk, so that a hyperparameter search run again only fits the
+combinations of parameters and folds that it has not fit before
+"""
+from joblib import Memory
+from sklearn.base import BaseEstimator, clone
+
+
+def _fit_estimator(estimator, X, y, **fit_params):
+    """fit an unfitted estimator. Cached by joblib on its parameters and on the data
+
+    Args:
+        estimator (BaseEstimator): unfitted estimator
+        X (dataframe): features
+        y (series): target
+
+    Returns:
+        estimator (BaseEstimator): fitted estimator
+
+    """
+    return estimator.fit(X, y, **fit_params)
+
+
+class CachedEstimator(BaseEstimator):
+    """wraps an estimator so that fitting it is cached in cache_dir: a fit with the same parameters, on the same data,
+    is loaded from disk instead of being run.
+
+    Note:
+        the parameters of the wrapped estimator are set with an `estimator__` prefix, e.g. `estimator__max_depth`.
+        The fitted estimator is `estimator_`
+
+    """
+
+    def __init__(self, estimator=None, cache_dir=None):
+        """instantiate the wrapper
+
+        Args:
+            estimator (BaseEstimator): unfitted estimator
+            cache_dir (str): directory of the cache
+
+        """
+        self.estimator = estimator
+        self.cache_dir = cache_dir
+
+    @property
+    def _estimator_type(self):
+        return getattr(self.estimator, "_estimator_type", None)
+
+    @property
+    def classes_(self):
+        return self.estimator_.classes_
+
+    def fit(self, X, y=None, **fit_params):
+        """fit the estimator, or load the fit from the cache
+
+        Args:
+            X (dataframe): features
+            y (series): target
+
+        Returns:
+            self
+
+        """
+        fit = Memory(self.cache_dir, verbose=0).cache(_fit_estimator)
+        self.estimator_ = fit(clone(self.estimator), X, y, **fit_params)
+        return self
+
+    def predict(self, X):
+        return self.estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.estimator_.predict_proba(X)
+
+    def decision_function(self, X):
+        return self.estimator_.decision_function(X)
+
+    def score(self, X, y):
+        return self.estimator_.score(X, y)
+
+
+def cache_parameters(parameters):
+    """the parameters of a search over an estimator, for a search over its CachedEstimator
+
+    Args:
+        parameters (dict or list): a parameter grid or distributions, or a list of them
+
+    Returns:
+        parameters (dict or list): with `estimator__` prefixed to each parameter name
+
+    """
+    if isinstance(parameters, list):
+        return [cache_parameters(p) for p in parameters]
+    return {"estimator__" + name: values for name, values in parameters.items()}
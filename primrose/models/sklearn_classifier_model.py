@@ -7,8 +7,9 @@ Author(s):
 """
 import logging
 import datetime
+from enum import Enum
 from sklearn.base import is_classifier
-from sklearn.model_selection import GridSearchCV
+from sklearn.model_selection import GridSearchCV, RandomizedSearchCV
 from sklearn.metrics import f1_score
 from sklearn.metrics import recall_score
 from sklearn.metrics import precision_score
@@ -16,6 +17,20 @@ from sklearn.metrics import accuracy_score
 from sklearn.metrics import auc
 from primrose.readers.dill_reader import DillReader
 from primrose.models.sklearn_model import SklearnModel
+from primrose.models.cached_estimator import CachedEstimator, cache_parameters
+
+
+class SearchType(Enum):
+    """hyperparameter search of SklearnClassifierModel, set with the node's `search` key"""
+
+    GRID = "grid"  # every combination of model_parameters
+    RANDOM = "random"  # n_iter combinations, sampled from model_parameters
+    HALVING = "halving"  # successive halving over every combination
+    HALVING_RANDOM = "halving_random"  # successive halving over sampled combinations
+
+    @staticmethod
+    def values():
+        return list(map(lambda t: t.value, SearchType))
 
 
 class SklearnClassifierModel(SklearnModel):
@@ -65,21 +80,79 @@ class SklearnClassifierModel(SklearnModel):
             self.node_config["sklearn_classifier_name"], args=None
         )
 
-        self.model = GridSearchCV(
-            self.model,
-            self.node_config["model_parameters"],
-            n_jobs=-1,
+        self.model = self._make_search(self.model)
+        self.model.fit(X_train, y_train)
+
+        best_estimator = self.model.best_estimator_
+        if isinstance(best_estimator, CachedEstimator):
+            best_estimator = best_estimator.estimator_
+        data_object.add(self, best_estimator, "model")
+
+        return data_object
+
+    def _make_search(self, estimator):
+        """the hyperparameter search of estimator, configured by the node
+
+        Note:
+            optional keys:
+                search: one of SearchType's values, default `grid`
+                n_iter: number of combinations sampled by a `random` search, default 10
+                halving_factor: proportion of candidates kept by each round of a `halving` search, default 3
+                random_state: seed of `random` and `halving` searches
+                n_jobs: number of jobs, default -1, all cores
+                pre_dispatch: number of jobs dispatched ahead of the running ones, default `2*n_jobs`
+                cache_dir: directory where each fit is cached, so that a search run again only fits new
+                    combinations of parameters and folds
+
+        Args:
+            estimator (BaseEstimator): unfitted estimator
+
+        Returns:
+            search (BaseSearchCV): unfitted search
+
+        """
+        search = self.node_config.get("search", SearchType.GRID.value)
+        if search not in SearchType.values():
+            raise Exception(
+                "Unsupported search {}. Supported searches are {}".format(
+                    search, SearchType.values()
+                )
+            )
+
+        parameters = self.node_config["model_parameters"]
+        if "cache_dir" in self.node_config:
+            logging.info("Caching fits in %s", self.node_config["cache_dir"])
+            estimator = CachedEstimator(estimator, self.node_config["cache_dir"])
+            parameters = cache_parameters(parameters)
+
+        kwargs = dict(
+            n_jobs=self.node_config.get("n_jobs", -1),
+            pre_dispatch=self.node_config.get("pre_dispatch", "2*n_jobs"),
             scoring=self.node_config["grid_search_scoring"],
             verbose=2,
             cv=self.node_config["cv_folds"],
             refit=True,
         )
+        if search != SearchType.GRID.value:
+            kwargs["random_state"] = self.node_config.get("random_state")
+
+        logging.info("Searching hyperparameters with a %s search", search)
+        if search == SearchType.GRID.value:
+            return GridSearchCV(estimator, parameters, **kwargs)
+        if search == SearchType.RANDOM.value:
+            return RandomizedSearchCV(
+                estimator, parameters, n_iter=self.node_config.get("n_iter", 10), **kwargs
+            )
 
-        self.model.fit(X_train, y_train)
-
-        data_object.add(self, self.model.best_estimator_, "model")
+        # successive halving is still experimental in sklearn
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV
 
-        return data_object
+        kwargs.pop("pre_dispatch")
+        kwargs["factor"] = self.node_config.get("halving_factor", 3)
+        if search == SearchType.HALVING.value:
+            return HalvingGridSearchCV(estimator, parameters, **kwargs)
+        return HalvingRandomSearchCV(estimator, parameters, **kwargs)
 
     def eval_model(self, data_object):
         """Evaluate model perfomance on a labeled testing dataset
@@ -96,8 +169,8 @@ class SklearnClassifierModel(SklearnModel):
 
         X_train, y_train, X_test, y_test = self._get_data(data_object)
 
-        model_predictions = self.model.predict(X_test)
-        model_probability = self.model.predict_proba(X_test)
+        model_predictions = self.predict_cached(X_test)
+        model_probability = self.predict_cached(X_test, "predict_proba")
 
         model_predictions = model_predictions.astype(int)
 
@@ -152,7 +225,7 @@ class SklearnClassifierModel(SklearnModel):
 
         X_train, y_train, X_test, y_test = self._get_data(data_object)
 
-        predictions = self.model.predict(X_test)
+        predictions = self.predict_cached(X_test)
 
         # get the upstream target_encoder if it exists
         data = data_object.get_filtered_upstream_data(
@@ -38,9 +38,6 @@ class SklearnClusterModel(SklearnModel):
             nothing. Predictions stored in self.predictions
 
         """
-        if hasattr(self, "predictions") and self.predictions is not None:
-            return
-
         if self.model is None:
             self.model = self.load_model(data_object)
 
@@ -55,7 +52,7 @@ class SklearnClusterModel(SklearnModel):
             to_predict = self.X_train
             self.predictions = self.model.labels_
         else:
-            self.predictions = self.model.predict(self.X_test)
+            self.predictions = self.predict_cached(self.X_test)
 
     def predict(self, data_object, load_model=False, use_serial=False):
         """Predict y_test from X_test
@@ -7,11 +7,19 @@ Author(s):
 from primrose.base.model import AbstractModel
 import importlib
 import logging
+from primrose.process_pool import map_blocks
+import numpy as np
+import pandas as pd
 from sklearn.metrics import roc_curve, auc
 from sklearn import metrics
 import datetime
 
 
+def _predict_block(model, block, method):
+    """predict a block of rows with the model"""
+    return getattr(model, method)(block)
+
+
 class SklearnModel(AbstractModel):
     def __init__(self, configuration, instance_name):
         """A Sklearn-based model to train, evaluate and predict on dataframe feature data
@@ -24,6 +32,9 @@ class SklearnModel(AbstractModel):
         super(SklearnModel, self).__init__(configuration, instance_name)
         self.model = None
         self.scores = {}
+        # upstream data and predictions, computed once and shared by train_model, eval_model and predict
+        self._data_cache = None
+        self._prediction_cache = {}
 
     def load_model(self, data_object):
         """finds an upstream sklearn mode
@@ -99,10 +110,15 @@ class SklearnModel(AbstractModel):
     def _get_data(self, data_object):
         """get the upstream data, split into X and Y from config, return data frame
 
+        Note:
+            the data is looked up in data_object once: later calls with the same data_object return the same frames
+
         Returns:
             dataframe (dataframe)
 
         """
+        if self._data_cache is not None and self._data_cache[0] is data_object:
+            return self._data_cache[1]
 
         # get upstream data dict which contains the subkey data_test or data_train
         data = data_object.get_filtered_upstream_data(
@@ -142,6 +158,7 @@ class SklearnModel(AbstractModel):
             size(y_test),
         )
 
+        self._data_cache = (data_object, (X_train, y_train, X_test, y_test))
         return X_train, y_train, X_test, y_test
 
     def train_model(self, data_object):
@@ -171,6 +188,65 @@ class SklearnModel(AbstractModel):
 
         return data_object
 
+    def predict_in_batches(self, X, method="predict"):
+        """call the model's method (`predict`, `predict_proba`...) on X, in blocks of rows if the node's configuration
+        asks for it, and on a pool of processes
+
+        Note:
+            optionally, predict_batch_size: number of rows per block. Only one block is held by each worker at a
+            time, which bounds the memory used by models whose predictions use memory in proportion to the rows
+
+            optionally, predict_workers: number of worker processes, default 1 (predict in this process). The model
+            is sent to each worker once. Without predict_batch_size, X is split into one block per worker. A node
+            that runs in a daemonic process, such as a worker of DagRunner's process pool on Python 3.8, cannot
+            start processes of its own, and predicts its blocks in its own process
+
+        Args:
+            X (DataFrame or ndarray): features
+            method (str): method of the model to call
+
+        Returns:
+            predictions of the blocks, concatenated in the order of X
+
+        """
+        batch_size = self.node_config.get("predict_batch_size")
+        workers = int(self.node_config.get("predict_workers", 1))
+        n = len(X)
+        if n == 0 or (batch_size is None and workers <= 1):
+            return getattr(self.model, method)(X)
+
+        batch_size = int(batch_size) if batch_size else -(-n // workers)
+        rows = X.iloc if hasattr(X, "iloc") else X
+        blocks = ((rows[start : start + batch_size], method) for start in range(0, n, batch_size))
+        logging.info(
+            "Predicting %s rows in blocks of %s with %s worker%s", n, batch_size, workers, "s" if workers > 1 else ""
+        )
+        results = map_blocks(_predict_block, self.model, blocks, workers)
+
+        if isinstance(results[0], (pd.DataFrame, pd.Series)):
+            return pd.concat(results)
+        return np.concatenate(results)
+
+    def predict_cached(self, X, method="predict"):
+        """like predict_in_batches, but computed once: calling it again with the same X and model, e.g. from
+        eval_model and then from predict, returns the same predictions
+
+        Args:
+            X (DataFrame or ndarray): features
+            method (str): method of the model to call
+
+        Returns:
+            predictions of X
+
+        """
+        cached = self._prediction_cache.get(method)
+        if cached is not None and cached[0] is X and cached[1] is self.model:
+            return cached[2]
+
+        predictions = self.predict_in_batches(X, method)
+        self._prediction_cache[method] = (X, self.model, predictions)
+        return predictions
+
     def _make_predictions(self, data_object):
         """Make predictions from X_test
 
@@ -181,9 +257,6 @@ class SklearnModel(AbstractModel):
             nothing. Predictions stored in self.predictions
 
         """
-        if hasattr(self, "predictions") and self.predictions is not None:
-            return
-
         if self.model is None:
             self.model = self.load_model(data_object)
 
@@ -192,7 +265,7 @@ class SklearnModel(AbstractModel):
         )
 
         logging.info("Making predictions with model")
-        self.predictions = self.model.predict(self.X_test)
+        self.predictions = self.predict_cached(self.X_test)
 
     def predict(self, data_object, load_model=False, use_serial=False):
         """Predict y_test from X_test
@@ -0,0 +1,252 @@
+"""Content-addressed cache of the data each node adds to the DataObject"""
+import os
+import glob
+import inspect
+import hashlib
+import logging
+import dill
+from primrose.util import write_atomically
+from primrose.node_factory import NodeFactory
+from primrose.base.reader import AbstractReader
+from primrose.base.writer import AbstractWriter
+from primrose.chunked_data_frame import ChunkedDataFrame
+
+
+class NodeCache:
+    """Cache of the data each node adds to the DataObject, keyed on a fingerprint of the node's inputs.
+
+    Note:
+        the fingerprint of a node combines the hash of its configuration block, the source of its class
+        (and base classes) and the fingerprints of its upstream nodes. Thus, changing a node's configuration
+        or code invalidates the cached results of that node and of everything downstream of it.
+
+        The data a reader reads is outside its configuration. The fingerprint of a reader of local files (set
+        in `filename`) includes their sizes and modification times. Other readers, e.g. SQL readers, are only
+        cached if they opt in with `"node_cache": true`. Readers that are not cached, and nodes that opt out with
+        `"node_cache": false`, always run, and so do the nodes downstream of them.
+
+        Only the data in the DataObject is cached, not side effects. Thus, writers, conditional path nodes
+        and nodes that add no data, or that add streamed data (ChunkedDataFrames), always run.
+
+    """
+
+    CACHE_EXT = ".dill"
+
+    def __init__(self, configuration, dirname):
+        """instantiate the cache
+
+        Args:
+            configuration (Configuration): Configuration instance
+            dirname (str): directory to store cached results
+
+        """
+        self.configuration = configuration
+        self.dirname = dirname
+        self.fingerprints = {}
+        self.always_run = {}
+
+    @staticmethod
+    def class_source_hash(class_obj):
+        """hash of the source of a class and of its base classes
+
+        Args:
+            class_obj (class): class of node
+
+        Returns:
+            hash (str): sha256 hex digest
+
+        """
+        sha = hashlib.sha256()
+        for klass in inspect.getmro(class_obj):
+            if klass.__module__ in ("builtins", "abc"):
+                continue
+            try:
+                source = inspect.getsource(klass)
+            except (OSError, TypeError):
+                # e.g. classes defined interactively: fall back to the name
+                source = klass.__module__ + "." + klass.__qualname__
+            sha.update(source.encode("utf-8"))
+        return sha.hexdigest()
+
+    @staticmethod
+    def input_files_signature(node_config):
+        """paths, sizes and modification times of the local files that a reader reads, from its `filename`
+
+        Args:
+            node_config (dict): configuration of the reader
+
+        Returns:
+            signature (str), empty if the reader reads no local files
+
+        """
+        patterns = node_config.get("filename")
+        if not patterns:
+            return ""
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        paths = []
+        for pattern in patterns:
+            for match in glob.glob(pattern) or [pattern]:
+                if os.path.isdir(match):
+                    for root, _, files in os.walk(match):
+                        paths.extend(os.path.join(root, f) for f in files)
+                elif os.path.exists(match):
+                    paths.append(match)
+
+        signature = []
+        for path in sorted(paths):
+            stat = os.stat(path)
+            signature.append("%s:%s:%s" % (path, stat.st_size, stat.st_mtime_ns))
+        return "\n".join(signature)
+
+    def _class(self, instance_name):
+        """class of a node"""
+        return NodeFactory().name_dict[self.configuration.nodename_to_classname[instance_name]]
+
+    def fingerprint(self, instance_name):
+        """fingerprint of a node: its configuration, its class source and its upstream nodes' fingerprints
+
+        Args:
+            instance_name (str): name of node
+
+        Returns:
+            fingerprint (str): sha256 hex digest
+
+        """
+        if instance_name not in self.fingerprints:
+            class_obj = self._class(instance_name)
+            upstream = sorted(self.configuration.dag.upstream_keys(instance_name))
+
+            sha = hashlib.sha256()
+            sha.update(self.configuration.config_hash_for_instance(instance_name).encode("utf-8"))
+            sha.update(self.class_source_hash(class_obj).encode("utf-8"))
+            if issubclass(class_obj, AbstractReader):
+                node_config = self.configuration.config_for_instance(instance_name)
+                sha.update(self.input_files_signature(node_config).encode("utf-8"))
+            for upstream_name in upstream:
+                sha.update((upstream_name + self.fingerprint(upstream_name)).encode("utf-8"))
+
+            self.fingerprints[instance_name] = sha.hexdigest()
+
+        return self.fingerprints[instance_name]
+
+    def _always_runs(self, instance_name):
+        """does the node, or a node upstream of it, always run, so that its fingerprint cannot tell whether its
+        input data changed?
+
+        Args:
+            instance_name (str): name of node
+
+        Returns:
+            determination (bool)
+
+        """
+        if instance_name not in self.always_run:
+            node_config = self.configuration.config_for_instance(instance_name)
+            opt_in = node_config.get("node_cache")
+            if opt_in is not None:
+                always_run = str(opt_in).lower() != "true"
+            elif issubclass(self._class(instance_name), AbstractReader):
+                always_run = not self.input_files_signature(node_config)
+            else:
+                always_run = False
+
+            self.always_run[instance_name] = always_run or any(
+                self._always_runs(upstream) for upstream in self.configuration.dag.upstream_keys(instance_name)
+            )
+
+        return self.always_run[instance_name]
+
+    def is_cacheable(self, instance_name):
+        """can this node's results be cached?
+
+        Note:
+            writers always run for their side effects, and conditional path nodes as the DagRunner needs them
+            to prune. Users can opt a node out with `"node_cache": false` in its configuration, and opt in
+            readers whose data the fingerprint cannot see, such as SQL readers, with `"node_cache": true`.
+
+        Args:
+            instance_name (str): name of node
+
+        Returns:
+            determination (bool)
+
+        """
+        if instance_name in self.configuration.dag.conditional_nodes:
+            return False
+        if issubclass(self._class(instance_name), AbstractWriter):
+            return False
+        return not self._always_runs(instance_name)
+
+    def _filename(self, instance_name):
+        """path to the cache file of a node's current fingerprint
+
+        Args:
+            instance_name (str): name of node
+
+        Returns:
+            filename (str)
+
+        """
+        return os.path.join(self.dirname, instance_name, self.fingerprint(instance_name) + NodeCache.CACHE_EXT)
+
+    def load(self, instance_name):
+        """load the cached results of a node, if its inputs are unchanged
+
+        Args:
+            instance_name (str): name of node
+
+        Returns:
+            (tuple): tuple containing, or None if there is no valid cached result:
+
+                entries (dict): data the node added to the DataObject, keyed by data key
+
+                terminate (bool): did the node signal to terminate the DAG?
+
+        """
+        if not self.is_cacheable(instance_name):
+            return None
+
+        filename = self._filename(instance_name)
+        if not os.path.exists(filename):
+            return None
+
+        with open(filename, "rb") as f:
+            cached = dill.load(f)
+
+        logging.info("Using cached results of %s from %s", instance_name, filename)
+        return cached["entries"], cached["terminate"]
+
+    def save(self, instance_name, entries, terminate):
+        """cache the results of a node under its current fingerprint, removing results of previous fingerprints
+
+        Args:
+            instance_name (str): name of node
+            entries (dict): data the node added to the DataObject, keyed by data key
+            terminate (bool): did the node signal to terminate the DAG?
+
+        Returns:
+            whether it was cached (bool)
+
+        """
+        if not entries or not self.is_cacheable(instance_name):
+            return False
+
+        if any(isinstance(value, ChunkedDataFrame) for value in entries.values()):
+            # streamed data is read lazily, from its source, by its consumers: there is nothing to cache
+            return False
+
+        filename = self._filename(instance_name)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+        for stale in glob.glob(os.path.join(os.path.dirname(filename), "*" + NodeCache.CACHE_EXT)):
+            if stale != filename:
+                os.remove(stale)
+
+        def write(path):
+            with open(path, "wb") as f:
+                dill.dump({"entries": dict(entries), "terminate": terminate}, f)
+
+        write_atomically(filename, write)
+        return True
@@ -9,43 +9,99 @@ Author(s):
 
 import logging
 import inspect
+import importlib
 import sys
 from primrose.base.node import AbstractNode
 
-from primrose.readers.csv_reader import CsvReader
-from primrose.readers.gcs_dill_reader import GcsDillReader
-from primrose.readers.dill_reader import DillReader
-from primrose.readers.deserializer import Deserializer, GcsDeserializer
-from primrose.readers.sklearn_dataset_reader import SklearnDatasetReader
-from primrose.readers.mysql_reader import MySQLReader
-from primrose.readers.sqlite_reader import SQLiteReader
-from primrose.readers.postgres_reader import PostgresReader
 
-from primrose.conditionalpath.simple_switch import SimpleSwitch
+# built-in nodes, as import paths that are only imported when the class is needed, so that importing primrose
+# does not pull in boto3, google.cloud.storage, matplotlib, the sklearn models and the like
+BUILTIN_NODES = {
+    "CsvReader": "primrose.readers.csv_reader:CsvReader",
+    "ParquetReader": "primrose.readers.parquet_reader:ParquetReader",
+    "SQLiteReader": "primrose.readers.sqlite_reader:SQLiteReader",
+    "MySQLReader": "primrose.readers.mysql_reader:MySQLReader",
+    "PostgresReader": "primrose.readers.postgres_reader:PostgresReader",
+    "GcsDillReader": "primrose.readers.gcs_dill_reader:GcsDillReader",
+    "DillReader": "primrose.readers.dill_reader:DillReader",
+    "Deserializer": "primrose.readers.deserializer:Deserializer",
+    "GcsDeserializer": "primrose.readers.deserializer:GcsDeserializer",
+    "DataFrameJoiner": "primrose.pipelines.dataframe_joiner:DataFrameJoiner",
+    "EncodeTrainTestSplit": "primrose.pipelines.encode_train_test_split:EncodeTrainTestSplit",
+    "TrainTestSplit": "primrose.pipelines.train_test_split:TrainTestSplit",
+    "CsvWriter": "primrose.writers.csv_writer:CsvWriter",
+    "ParquetWriter": "primrose.writers.parquet_writer:ParquetWriter",
+    "FileWriter": "primrose.writers.file_writer:FileWriter",
+    "DillWriter": "primrose.writers.dill_writer:DillWriter",
+    "Serializer": "primrose.writers.serializer:Serializer",
+    "S3Writer": "primrose.writers.s3_writer:S3Writer",
+    "SklearnClassifierModel": "primrose.models.sklearn_classifier_model:SklearnClassifierModel",
+    "LoggingSuccess": "primrose.cleanup.logging_success:LoggingSuccess",
+    "ClusterPlotter": "primrose.dataviz.cluster_plotter:ClusterPlotter",
+    "SklearnClusterModel": "primrose.models.sklearn_cluster_model:SklearnClusterModel",
+    "SklearnPreprocessingPipeline": "primrose.pipelines.sklearn_preprocessing_pipeline:SklearnPreprocessingPipeline",
+    "SklearnDatasetReader": "primrose.readers.sklearn_dataset_reader:SklearnDatasetReader",
+    "SklearnRegressionModel": "primrose.models.sklearn_regression_model:SklearnRegressionModel",
+    "SimpleSwitch": "primrose.conditionalpath.simple_switch:SimpleSwitch",
+    "TransformerPipeline": "primrose.pipelines.transformer_pipeline:TransformerPipeline",
+    "ClientNotification": "primrose.notifications.success_notification:ClientNotification",
+    "RReader": "primrose.readers.r_reader:RReader",
+}
+
+
+class LazyClassDict(dict):
+    """dictionary of name: class where a value can also be an import path, `module:ClassName`, which is imported
+    the first time that the value is needed and then replaced by the class itself.
+
+    Note:
+        `in`, `keys()` and `del` do not import anything. Getting a value, including through `get`, `pop`, `values()`
+        and `items()`, or copying the dictionary, does.
+
+    """
+
+    @staticmethod
+    def resolve(import_path):
+        """import a class given its import path
 
-from primrose.pipelines.dataframe_joiner import DataFrameJoiner
-from primrose.pipelines.encode_train_test_split import EncodeTrainTestSplit
-from primrose.pipelines.train_test_split import TrainTestSplit
-from primrose.pipelines.sklearn_preprocessing_pipeline import (
-    SklearnPreprocessingPipeline,
-)
-from primrose.pipelines.transformer_pipeline import TransformerPipeline
-from primrose.models.sklearn_classifier_model import SklearnClassifierModel
-from primrose.models.sklearn_cluster_model import SklearnClusterModel
-from primrose.models.sklearn_regression_model import SklearnRegressionModel
+        Args:
+            import_path (str): `module:ClassName`
+
+        Returns:
+            class_obj (class)
+
+        """
+        module_name, class_name = import_path.split(":")
+        return getattr(importlib.import_module(module_name), class_name)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, str):
+            value = LazyClassDict.resolve(value)
+            super().__setitem__(key, value)
+        return value
+
+    def __iter__(self):
+        # as in LazyEntries, overriding __iter__ makes dict() and {**d} copy through __getitem__
+        return super().__iter__()
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
 
-from primrose.notifications.success_notification import ClientNotification
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            super().pop(key)
+            return value
+        return super().pop(key, *default)
 
-from primrose.writers.csv_writer import CsvWriter
-from primrose.writers.file_writer import FileWriter
-from primrose.writers.dill_writer import DillWriter
-from primrose.writers.serializer import Serializer
-from primrose.writers.s3_writer import S3Writer
+    def values(self):
+        return [self[key] for key in self]
 
-from primrose.dataviz.cluster_plotter import ClusterPlotter
+    def items(self):
+        return [(key, self[key]) for key in self]
 
-from primrose.cleanup.logging_success import LoggingSuccess
-from primrose.readers.r_reader import RReader
+    def copy(self):
+        return dict(self.items())
 
 
 class NodeFactory:
@@ -81,35 +137,7 @@ class NodeFactory:
 
         def __init__(self):
             """instantiate the HiddenFactory"""
-            self.name_dict = {
-                "CsvReader": CsvReader,
-                "SQLiteReader": SQLiteReader,
-                "MySQLReader": MySQLReader,
-                "PostgresReader": PostgresReader,
-                "GcsDillReader": GcsDillReader,
-                "DillReader": DillReader,
-                "Deserializer": Deserializer,
-                "GcsDeserializer": GcsDeserializer,
-                "DataFrameJoiner": DataFrameJoiner,
-                "EncodeTrainTestSplit": EncodeTrainTestSplit,
-                "TrainTestSplit": TrainTestSplit,
-                "CsvWriter": CsvWriter,
-                "FileWriter": FileWriter,
-                "DillWriter": DillWriter,
-                "Serializer": Serializer,
-                "S3Writer": S3Writer,
-                "SklearnClassifierModel": SklearnClassifierModel,
-                "LoggingSuccess": LoggingSuccess,
-                "ClusterPlotter": ClusterPlotter,
-                "SklearnClusterModel": SklearnClusterModel,
-                "SklearnPreprocessingPipeline": SklearnPreprocessingPipeline,
-                "SklearnDatasetReader": SklearnDatasetReader,
-                "SklearnRegressionModel": SklearnRegressionModel,
-                "SimpleSwitch": SimpleSwitch,
-                "TransformerPipeline": TransformerPipeline,
-                "ClientNotification": ClientNotification,
-                "RReader": RReader,
-            }
+            self.name_dict = LazyClassDict(BUILTIN_NODES)
 
         def register(self, key, class_obj, raise_on_overwrite=False):
             """Registering class_obj with key
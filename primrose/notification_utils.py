@@ -8,9 +8,6 @@ import importlib
 import logging
 import os
 
-import slack
-from slack.errors import SlackApiError
-
 from primrose.notifications.abstract_notification import AbstractNotification
 
 
@@ -30,6 +27,9 @@ class SlackClient(AbstractNotification):
             None
 
         """
+        # imported here so that importing primrose does not pull in the slack client
+        import slack
+
         self.channel = channel
         self.member_id = member_id  # this is not userid. See https://medium.com/@moshfeu/how-to-find-my-member-id-in-slack-workspace-d4bba942e38c
         self.client = slack.WebClient(token=token)
@@ -43,6 +43,7 @@ class SlackClient(AbstractNotification):
             slack.web.slack_response.SlackResponse, and message is posted to slack.
 
         """
+        from slack.errors import SlackApiError
 
         if self.member_id:
             message += f"\n <@{self.member_id}>"
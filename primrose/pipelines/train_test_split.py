@@ -11,6 +11,7 @@ from sklearn.model_selection import train_test_split
 
 from primrose.base.pipeline import AbstractPipeline, PipelineModeType
 from primrose.data_object import DataObject, DataObjectResponseType
+from primrose.chunked_data_frame import ChunkedDataFrame
 
 
 class TrainTestSplit(AbstractPipeline):
@@ -186,6 +187,73 @@ class TrainTestSplit(AbstractPipeline):
 
         return pd.concat(dataframes_to_join).reset_index(drop=True)
 
+    @staticmethod
+    def _is_chunked(data):
+        """is any of the upstream data streamed, as a ChunkedDataFrame?
+
+        Args:
+            data (list): list of dicts keyed to instances
+
+        Returns:
+            determination (bool)
+
+        """
+        return any(isinstance(data[source][key], ChunkedDataFrame) for source in data for key in data[source])
+
+    def _check_chunk_safe(self):
+        """check that every transformer of the sequence can transform streamed data, chunk by chunk
+
+        Raises:
+            Exception if some transformers are not chunk safe
+
+        """
+        unsafe = [
+            transformer.__class__.__name__
+            for transformer in self.transformer_sequence.transformers()
+            if not transformer.chunk_safe
+        ]
+        if unsafe:
+            raise Exception(
+                "Cannot transform streamed data in %s: transformers %s are not chunk safe" % (self.instance_name, unsafe)
+            )
+
+    def _transform_chunks(self, data_list, data_object):
+        """Transform streamed data chunk by chunk, using the pre-trained transformer sequence
+
+        Note:
+            every upstream dataframe, streamed or not, is streamed through the transformer sequence, one after
+            the other. Nothing is transformed until the consumer of this node's data iterates over the chunks.
+
+        Args:
+            data_list (list): list of dicts keyed to instances
+            data_object (DataObject): instance of DataObject
+
+        Returns:
+            data_object (DataObject): instance of DataObject
+
+        """
+        self._check_chunk_safe()
+
+        frames = [
+            data_list[source][key]
+            for source in data_list
+            for key in data_list[source]
+            if isinstance(data_list[source][key], (pd.DataFrame, ChunkedDataFrame))
+        ]
+        data = ChunkedDataFrame.concat(frames).map(
+            lambda chunk: self.execute_pipeline(chunk, PipelineModeType.TRANSFORM)
+        )
+
+        self.data = data
+
+        data_object.add(self, data.map(lambda chunk: chunk[self.features(chunk)]), key="data_test", overwrite=False)
+
+        if "target_variable" in self.node_config:
+            target_variable = self.node_config["target_variable"]
+            data_object.add(self, data.map(lambda chunk: chunk[target_variable]), key="target_test", overwrite=False)
+
+        return self.final_data_object_additions(data_object)
+
     def fit_transform(self, data_object):
         """Split data into testing and training sets, then applies the categorical transform to each
 
@@ -195,6 +263,9 @@ class TrainTestSplit(AbstractPipeline):
         Returns:
             data_object (DataObject): instance of DataObject
 
+        Raises:
+            Exception if the upstream data is streamed, as fitting needs all the data
+
         """
 
         # we're can expect multiple objects from a reader, so we need to concatenate
@@ -204,6 +275,11 @@ class TrainTestSplit(AbstractPipeline):
             rtype=DataObjectResponseType.INSTANCE_KEY_VALUE.value,
         )
 
+        if self._is_chunked(data_list):
+            raise Exception(
+                "%s: streamed data can only be transformed, not fit. Set is_training to false" % self.instance_name
+            )
+
         data = self._concatenate_upstream_dataframes(data_list)
 
         train_data, test_data = self._train_test_split(data)
@@ -272,6 +348,9 @@ class TrainTestSplit(AbstractPipeline):
             rtype=DataObjectResponseType.INSTANCE_KEY_VALUE.value,
         )
 
+        if self._is_chunked(data_list):
+            return self._transform_chunks(data_list, data_object)
+
         data = self._concatenate_upstream_dataframes(data_list)
 
         data = self.execute_pipeline(data, PipelineModeType.TRANSFORM)
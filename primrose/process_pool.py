@@ -0,0 +1,56 @@
+"""Run a function on blocks of data on a pool of worker processes, each sent the data shared by all blocks once"""
+import collections
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# the state shared by all blocks, in a worker process of map_blocks, sent once, when the worker starts
+_WORKER_STATE = None
+
+
+def _set_worker_state(state):
+    """initializer of the worker processes of map_blocks"""
+    global _WORKER_STATE
+    _WORKER_STATE = state
+
+
+def _call_with_state(fn, args):
+    """call fn with the worker process's state"""
+    return fn(_WORKER_STATE, *args)
+
+
+def map_blocks(fn, state, blocks, workers=1):
+    """call fn(state, *args) for the args of each block, on a pool of worker processes
+
+    Note:
+        state, e.g. a model or a matrix, is sent to each worker once, blocks one at a time. At most two blocks per
+        worker are in flight, rather than all blocks pickled into the queue at once, as each block's result is held
+        until it is collected. A daemonic process, such as a worker of DagRunner's process pool on Python 3.8,
+        cannot start processes of its own: there, as with a single worker, the blocks are run in this process
+
+    Args:
+        fn (func): module level function of state and the args of a block
+        state (object): data shared by all blocks
+        blocks (iterable): tuple of args per block
+        workers (int): number of worker processes
+
+    Returns:
+        list of the results of the blocks, in order
+
+    """
+    if workers > 1 and multiprocessing.current_process().daemon:
+        logging.info("Running in a daemonic process, which cannot start workers: running the blocks in this process")
+        workers = 1
+
+    if workers <= 1:
+        return [fn(state, *args) for args in blocks]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_set_worker_state, initargs=(state,)) as executor:
+        running = collections.deque()
+        for args in blocks:
+            if len(running) >= 2 * workers:
+                results.append(running.popleft().result())
+            running.append(executor.submit(_call_with_state, fn, args))
+        results.extend(future.result() for future in running)
+    return results
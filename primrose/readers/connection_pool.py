@@ -0,0 +1,208 @@
+"""Process-wide pools of database connections, keyed by credentials, shared by SQL readers"""
+import os
+import time
+import logging
+import threading
+
+
+class ConnectionPool:
+    """A thread-safe pool of at most `max_size` connections to one database
+
+    Note:
+        `acquire` hands out an idle connection if there is one, checking first that it is still healthy if it has
+        been idle for more than `health_check_interval` seconds, and opens a new one otherwise. If `max_size`
+        connections are in use, it waits for one to be released. `release` rolls back any open transaction and
+        returns the connection to the pool.
+
+    """
+
+    def __init__(self, connect_fn, max_size=4, health_check_fn=None, health_check_interval=30, timeout=300):
+        """instantiate the pool
+
+        Args:
+            connect_fn (func): function with no arguments returning a new DB-API connection
+            max_size (int): maximum number of connections, idle and in use
+            health_check_fn (func): function of a connection returning whether it is usable.
+                The default runs `SELECT 1`
+            health_check_interval (float): check connections that have been idle for longer than this, in seconds
+            timeout (float): how long to wait for a connection when max_size connections are in use, in seconds
+
+        """
+        self.connect_fn = connect_fn
+        self.max_size = max_size
+        self.health_check_fn = health_check_fn or ConnectionPool.select_one
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+
+        self.idle = []  # list of (connection, time it was released)
+        self.in_use = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def select_one(conn):
+        """default health check: can we run a trivial query?
+
+        Args:
+            conn (connection): DB-API connection
+
+        Returns:
+            determination (bool)
+
+        """
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        """close a connection, ignoring errors from connections that are already broken"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """borrow a connection
+
+        Returns:
+            conn (connection): DB-API connection
+
+        Raises:
+            Exception if the pool is closed or no connection was released within timeout
+
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = None
+            with self.condition:
+                while True:
+                    if self.closed:
+                        raise Exception("Connection pool is closed")
+
+                    # either way, count the connection as in use already: it is checked, or opened, outside the
+                    # lock, so that a slow or hung database does not hold up the other threads
+                    if self.idle:
+                        conn, released = self.idle.pop()
+                        self.in_use += 1
+                        break
+
+                    if self.in_use < self.max_size:
+                        self.in_use += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self.condition.wait(remaining):
+                        raise Exception("Timed out waiting for a pooled connection, max_size=%s" % self.max_size)
+
+            if conn is None:
+                try:
+                    return self.connect_fn()
+                except Exception:
+                    self._give_back_slot()
+                    raise
+
+            if time.monotonic() - released < self.health_check_interval or self.health_check_fn(conn):
+                return conn
+
+            logging.info("Dropping unhealthy pooled connection")
+            ConnectionPool._close(conn)
+            self._give_back_slot()
+
+    def _give_back_slot(self):
+        """a connection counted as in use was not handed out after all: let another thread have its slot"""
+        with self.condition:
+            self.in_use -= 1
+            self.condition.notify()
+
+    def release(self, conn):
+        """return a borrowed connection to the pool
+
+        Args:
+            conn (connection): DB-API connection returned by `acquire`
+
+        """
+        try:
+            # don't hand a connection with an open (or failed) transaction to the next borrower
+            conn.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+
+        with self.condition:
+            self.in_use -= 1
+            if healthy and not self.closed:
+                self.idle.append((conn, time.monotonic()))
+                conn = None
+            self.condition.notify()
+
+        if conn is not None:
+            ConnectionPool._close(conn)
+
+    def close(self):
+        """close idle connections. Connections still in use are closed when they are released"""
+        with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.condition.notify_all()
+
+        for conn, _ in idle:
+            ConnectionPool._close(conn)
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(key, connect_fn, **kwargs):
+    """get the process-wide pool for key, creating it if needed
+
+    Note:
+        the pool is created with the kwargs of the first call for a key
+
+    Args:
+        key (tuple): identity of the database, e.g. driver name and credentials
+        connect_fn (func): function with no arguments returning a new connection
+        kwargs: other arguments of ConnectionPool
+
+    Returns:
+        pool (ConnectionPool)
+
+    """
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = ConnectionPool(connect_fn, **kwargs)
+        return _POOLS[key]
+
+
+def close_all_pools():
+    """close and forget all pools, e.g. at the end of a DAG run
+
+    Returns:
+        number of pools closed (int)
+
+    """
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+
+    for pool in pools:
+        pool.close()
+    return len(pools)
+
+
+def _forget_pools():
+    """in a forked child process, forget the parent's pools without closing them: their sockets are shared with
+    the parent, so closing them here would close the parent's connections"""
+    global _POOLS_LOCK
+    _POOLS_LOCK = threading.Lock()
+    _POOLS.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pools)
@@ -5,9 +5,14 @@ Author(s):
 
 """
 
+import os
+import glob
+import json
 import logging
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from primrose.base.reader import AbstractReader
+from primrose.chunked_data_frame import ChunkedDataFrame
 
 
 class CsvReader(AbstractReader):
@@ -21,7 +26,24 @@ class CsvReader(AbstractReader):
             node_config (dict): set of parameters / attributes for the node
 
         Note:
-            filename: name of the file
+            filename: name of the file. Can also be a glob, such as `data/shard_*.csv`, or a list of names and/or
+            globs: the files are then read in parallel, and concatenated in order of their (sorted) names
+
+            optionally, chunksize: stream the file as a ChunkedDataFrame of chunks of this many rows, rather than
+            reading it into a single dataframe. The DAG is then not terminated if the file is empty.
+
+            optionally, max_workers: number of files to read at a time, default the thread pool's default
+
+            optionally, dtypes_file: JSON file of column name to dtype. If it exists, it is passed to
+            pandas.read_csv as `dtype`. If not, the dtypes are inferred from the first rows of the first file and saved
+            to it, so that they are not inferred again for the other files, nor in later runs. Integer columns are
+            saved as the nullable `Int64`, in case other files have missing values.
+
+            optionally, dtypes_sample_rows: number of rows the dtypes are inferred from, default 10000. Edit the
+            dtypes file if columns only show their type further down, e.g. floats in a column that starts with integers
+
+            Other arguments of pandas.read_csv go in kwargs, e.g. `"usecols": ["a", "b"]` to only parse some
+            columns, or `"engine": "pyarrow"` for pyarrow's multithreaded parser.
 
         Returns:
             set of necessary keys for the CsvReader object
@@ -51,18 +73,122 @@ class CsvReader(AbstractReader):
         else:
             return {}
 
+    def filenames(self):
+        """names of the files to read, in order. Globs are expanded, and sorted; other names are kept as is
+
+        Returns:
+            filenames (list)
+
+        """
+        patterns = self.node_config["filename"]
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        filenames = []
+        for pattern in patterns:
+            if glob.has_magic(pattern):
+                matches = sorted(glob.glob(pattern))
+                if not matches:
+                    raise Exception("No files match {}".format(pattern))
+                filenames.extend(matches)
+            else:
+                filenames.append(pattern)
+        return filenames
+
+    @staticmethod
+    def _persisted_dtype(dtype):
+        """dtype to save to dtypes_file, for a dtype that pandas inferred, or None if pandas should infer it
+
+        Args:
+            dtype (numpy.dtype): inferred dtype
+
+        Returns:
+            dtype (str)
+
+        """
+        if pd.api.types.is_integer_dtype(dtype):
+            return "Int64"
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            # read_csv only creates datetimes through parse_dates
+            return None
+        return str(dtype)
+
+    def _read_kwargs(self, filenames, kwargs):
+        """kwargs of pandas.read_csv, with the dtypes of dtypes_file if configured, inferring and saving them from the
+        first file if the dtypes file does not exist yet
+
+        Args:
+            filenames (list): files to read
+            kwargs (dict): kwargs from the node's configuration
+
+        Returns:
+            kwargs (dict)
+
+        """
+        if "dtypes_file" not in self.node_config:
+            return kwargs
+
+        dtypes_file = self.node_config["dtypes_file"]
+        if os.path.exists(dtypes_file):
+            with open(dtypes_file, "r") as f:
+                dtypes = json.load(f)
+        else:
+            # a bounded sample, as the first file is read again, with these dtypes, afterwards
+            sample_kwargs = dict(kwargs)
+            sample_rows = int(self.node_config.get("dtypes_sample_rows", 10000))
+            sample_kwargs["nrows"] = min(sample_rows, kwargs["nrows"]) if "nrows" in kwargs else sample_rows
+            logging.info("Inferring dtypes from the first {} rows of {}".format(sample_kwargs["nrows"], filenames[0]))
+            sample = pd.read_csv(filenames[0], **sample_kwargs)
+            dtypes = {str(column): self._persisted_dtype(dtype) for column, dtype in sample.dtypes.items()}
+            dtypes = {column: dtype for column, dtype in dtypes.items() if dtype is not None}
+            logging.info("Saving dtypes to {}".format(dtypes_file))
+            with open(dtypes_file, "w") as f:
+                json.dump(dtypes, f, indent=2)
+
+        kwargs = dict(kwargs)
+        # dtypes set explicitly in kwargs win
+        kwargs["dtype"] = {**dtypes, **kwargs.get("dtype", {})}
+        return kwargs
+
     def run(self, data_object):
         """Read CSV to a pandas dataframe
 
+        Args:
+            data_object (DataObject): instance of DataObject
+
         Returns:
             data_object (DataObject): DataObject instance
             terminate (bool): should we terminate the DAG? true or false
 
         """
-        filename = self.node_config["filename"]
-        logging.info("Reading {} from CSV".format(filename))
-        kwargs = self.get_optional_config()
-        df = pd.read_csv(filename, **kwargs)
+        filenames = self.filenames()
+        kwargs = self._read_kwargs(filenames, self.get_optional_config())
+
+        if "chunksize" in self.node_config:
+            # streaming: the files are read, chunk by chunk, by whichever node consumes the data
+            chunksize = int(self.node_config["chunksize"])
+            logging.info("Streaming {} from CSV in chunks of {} rows".format(", ".join(filenames), chunksize))
+
+            def chunks():
+                for filename in filenames:
+                    yield from pd.read_csv(filename, chunksize=chunksize, **kwargs)
+
+            data_object.add(self, ChunkedDataFrame(chunks))
+            return data_object, False
+
+        if len(filenames) == 1:
+            logging.info("Reading {} from CSV".format(filenames[0]))
+            df = pd.read_csv(filenames[0], **kwargs)
+        else:
+            logging.info("Reading {} files from CSV".format(len(filenames)))
+            with ThreadPoolExecutor(max_workers=self.node_config.get("max_workers")) as executor:
+                dfs = list(executor.map(lambda filename: pd.read_csv(filename, **kwargs), filenames))
+            # concatenate once, at the end
+            df = pd.concat(dfs, ignore_index=True)
+            # categoricals with different categories in different files are concatenated as objects
+            categoricals = [column for column, dtype in dfs[0].dtypes.items() if str(dtype) == "category"]
+            df = df.astype({column: "category" for column in categoricals if str(df[column].dtype) != "category"})
+
         data_object.add(self, df)
         terminate = df.empty
         return data_object, terminate
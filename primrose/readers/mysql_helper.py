@@ -6,6 +6,7 @@ Author(s):
 """
 import mysql.connector
 from primrose.readers.database_helper import get_env_val
+from primrose.readers.connection_pool import get_pool
 
 
 class MySQLHelper:
@@ -56,3 +57,20 @@ class MySQLHelper:
             auth_plugin="mysql_native_password",
         )
         return conn
+
+    @staticmethod
+    def connection_pool(**kwargs):
+        """process-wide pool of connections to the database, shared by all readers with the same credentials
+
+        Args:
+            kwargs: keyword arguments of ConnectionPool, such as max_size. Only used when the pool is created
+
+        Returns:
+            pool (ConnectionPool)
+
+        """
+        key = ("mysql",) + MySQLHelper.extract_mysql_credentials()
+        # a cheaper health check than running a query
+        return get_pool(
+            key, MySQLHelper.create_db_connection, health_check_fn=lambda conn: conn.is_connected(), **kwargs
+        )
@@ -11,6 +11,8 @@ from primrose.readers.mysql_helper import MySQLHelper
 class MySQLReader(AbstractSqlReader):
     """Runs MySQL queries into pandas dataframes"""
 
+    opens_connections = True
+
     def get_connection(self):
         """return connection to MySQL DB
 
@@ -19,3 +21,37 @@ class MySQLReader(AbstractSqlReader):
 
         """
         return MySQLHelper.create_db_connection()
+
+    def connection_identity(self):
+        """identity of the MySQL DB, for the query cache
+
+        Returns:
+            identity (str): URL of the database, without password
+
+        """
+        host, port, username, _, database = MySQLHelper.extract_mysql_credentials()
+        return "mysql://%s@%s:%s/%s" % (username, host, port, database)
+
+    def connection_pool(self):
+        """return the pool of connections to MySQL DB, unless disabled in the `connection_pool` key of metadata
+
+        Returns:
+            pool (ConnectionPool), or None
+
+        """
+        config = self.connection_pool_config()
+        if config is None:
+            return None
+        return MySQLHelper.connection_pool(**config)
+
+    def cursor(self, conn):
+        """return an unbuffered cursor, which reads rows from the server as they are fetched
+
+        Args:
+            conn (DB connection): connection to MySQL DB
+
+        Returns:
+            cursor
+
+        """
+        return conn.cursor(buffered=False)
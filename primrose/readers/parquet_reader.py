@@ -0,0 +1,109 @@
+"""Module with AbstractNode implementation, able to read Parquet files and partitioned datasets"""
+import logging
+from primrose.base.reader import AbstractReader
+from primrose.chunked_data_frame import ChunkedDataFrame
+
+try:
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    HAS_PYARROW = True
+
+except ImportError:
+    HAS_PYARROW = False
+
+
+class ParquetReader(AbstractReader):
+    """Reads a Parquet file, or a directory of Parquet files such as a partitioned dataset, into a pandas dataframe"""
+
+    @staticmethod
+    def necessary_config(node_config):
+        """Returns the necessary configuration keys for the ParquetReader object
+
+        Args:
+            node_config (dict): set of parameters / attributes for the node
+
+        Note:
+            filename: name of the file, or of the directory of a dataset. Directories named `column=value`
+            (hive partitioning) add a column of that name to the data
+
+            optionally, columns: list of columns to read. Other columns are not read from disk at all
+
+            optionally, filters: rows to read, as a list of `[column, op, value]` conditions that must all be true,
+            or as a list of such lists, any one of which must be true. `op` is one of `=`, `==`, `!=`, `<`, `<=`,
+            `>`, `>=`, `in` and `not in`. Row groups, and partitions, that cannot match are skipped
+
+            optionally, categoricals: list of columns to read as pandas categoricals, from their dictionary encoding
+
+            optionally, chunksize: stream the data as a ChunkedDataFrame of chunks of at most this many rows
+
+        Returns:
+            set of necessary keys for the ParquetReader object
+
+        """
+        return set(["filename"])
+
+    def dataset(self):
+        """the dataset to read, with its dictionary encoded columns
+
+        Returns:
+            dataset (pyarrow.dataset.Dataset)
+
+        """
+        if not HAS_PYARROW:
+            raise ImportError("pyarrow is necessary to read Parquet")
+
+        categoricals = self.node_config.get("categoricals", [])
+        file_format = ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(dictionary_columns=categoricals))
+        return ds.dataset(self.node_config["filename"], format=file_format, partitioning="hive")
+
+    def filter_expression(self):
+        """the filters of the node's configuration as a pyarrow expression, if any
+
+        Returns:
+            expression (pyarrow.dataset.Expression), or None
+
+        """
+        filters = self.node_config.get("filters")
+        if not filters:
+            return None
+        # JSON has no tuples
+        if isinstance(filters[0][0], list):
+            filters = [[tuple(condition) for condition in conjunction] for conjunction in filters]
+        else:
+            filters = [tuple(condition) for condition in filters]
+        return pq.filters_to_expression(filters)
+
+    def run(self, data_object):
+        """Read Parquet to a pandas dataframe
+
+        Args:
+            data_object (DataObject): instance of DataObject
+
+        Returns:
+            data_object (DataObject): DataObject instance
+            terminate (bool): should we terminate the DAG? true or false
+
+        """
+        filename = self.node_config["filename"]
+        dataset = self.dataset()
+        columns = self.node_config.get("columns")
+        filter_expression = self.filter_expression()
+
+        if "chunksize" in self.node_config:
+            # streaming: the data is read, batch by batch, by whichever node consumes the data
+            chunksize = int(self.node_config["chunksize"])
+            logging.info("Streaming {} from Parquet in chunks of {} rows".format(filename, chunksize))
+
+            def chunks():
+                batches = dataset.to_batches(columns=columns, filter=filter_expression, batch_size=chunksize)
+                return (batch.to_pandas() for batch in batches)
+
+            data_object.add(self, ChunkedDataFrame(chunks))
+            return data_object, False
+
+        logging.info("Reading {} from Parquet".format(filename))
+        df = dataset.to_table(columns=columns, filter=filter_expression).to_pandas()
+        data_object.add(self, df)
+        terminate = df.empty
+        return data_object, terminate
@@ -8,6 +8,7 @@ Author(s):
 """
 import os
 from primrose.readers.database_helper import get_env_val
+from primrose.readers.connection_pool import get_pool
 
 try:
     import psycopg2
@@ -70,3 +71,17 @@ class PostgresHelper:
             sslmode="require",
         )
         return conn
+
+    @staticmethod
+    def connection_pool(**kwargs):
+        """process-wide pool of connections to the database, shared by all readers with the same credentials
+
+        Args:
+            kwargs: keyword arguments of ConnectionPool, such as max_size. Only used when the pool is created
+
+        Returns:
+            pool (ConnectionPool)
+
+        """
+        key = ("postgres",) + PostgresHelper.extract_postgres_credentials()
+        return get_pool(key, PostgresHelper.create_db_connection, **kwargs)
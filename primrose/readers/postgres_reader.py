@@ -4,6 +4,7 @@ Author(s):
     Carl Anderson (carl.anderson@weightwatchers.com)
 
 """
+import uuid
 from primrose.base.sql_reader import AbstractSqlReader
 from primrose.readers.postgres_helper import PostgresHelper
 
@@ -11,6 +12,8 @@ from primrose.readers.postgres_helper import PostgresHelper
 class PostgresReader(AbstractSqlReader):
     """Runs PostgreSQL queries into pandas dataframes"""
 
+    opens_connections = True
+
     def get_connection(self):
         """return connection to PostgreSQL DB
 
@@ -19,3 +22,38 @@ class PostgresReader(AbstractSqlReader):
 
         """
         return PostgresHelper.create_db_connection()
+
+    def connection_identity(self):
+        """identity of the PostgreSQL DB, for the query cache
+
+        Returns:
+            identity (str): URL of the database, without password
+
+        """
+        host, port, username, _, database = PostgresHelper.extract_postgres_credentials()
+        return "postgres://%s@%s:%s/%s" % (username, host, port, database)
+
+    def connection_pool(self):
+        """return the pool of connections to PostgreSQL DB, unless disabled in the `connection_pool` key of metadata
+
+        Returns:
+            pool (ConnectionPool), or None
+
+        """
+        config = self.connection_pool_config()
+        if config is None:
+            return None
+        return PostgresHelper.connection_pool(**config)
+
+    def cursor(self, conn):
+        """return a named, server-side, cursor: psycopg2's default cursors read the whole result into memory when the
+        query runs
+
+        Args:
+            conn (DB connection): connection to PostgreSQL DB
+
+        Returns:
+            cursor
+
+        """
+        return conn.cursor(name="primrose_" + uuid.uuid4().hex)
@@ -0,0 +1,148 @@
+"""Local cache of the results of SQL queries, keyed on the rendered query and the database it runs against"""
+import os
+import time
+import glob
+import logging
+import pandas as pd
+from primrose.util import write_atomically
+
+try:
+    import pyarrow
+
+    HAS_PYARROW = True
+
+except ImportError:
+    HAS_PYARROW = False
+
+
+class QueryCache:
+    """Cache of query results, one file per result, with a time to live and a bound on the total size.
+
+    Note:
+        Results are stored as Parquet, a columnar format, if pyarrow is installed, and pickled otherwise.
+
+        The modification time of a file is when the result was cached, and is used for the time to live. Its access
+        time is set explicitly whenever the result is read, and is used to evict the least recently used results when
+        the cache grows beyond max_bytes.
+
+    """
+
+    def __init__(self, dirname, ttl=86400, max_bytes=None):
+        """instantiate the cache
+
+        Args:
+            dirname (str): directory to store cached results
+            ttl (float): default time to live of results, in seconds
+            max_bytes (int): maximum total size of the cache in bytes, if any
+
+        """
+        self.dirname = dirname
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.ext = ".parquet" if HAS_PYARROW else ".pkl"
+
+    @staticmethod
+    def from_metadata(config_metadata):
+        """instantiate the cache configured in the `query_cache` key of metadata, if any
+
+        Args:
+            config_metadata (dict): metadata section of the configuration, or None
+
+        Returns:
+            cache (QueryCache), or None
+
+        """
+        if not config_metadata or "query_cache" not in config_metadata:
+            return None
+        cfg = config_metadata["query_cache"]
+        max_bytes = int(float(cfg["max_size_mb"]) * 1024 * 1024) if "max_size_mb" in cfg else None
+        return QueryCache(cfg["dir"], ttl=float(cfg.get("ttl", 86400)), max_bytes=max_bytes)
+
+    def _filename(self, key):
+        """file of the result cached under key"""
+        return os.path.join(self.dirname, key + self.ext)
+
+    def get(self, key, ttl=None):
+        """cached result for key, if it has not expired
+
+        Args:
+            key (str): hash of the query and database
+            ttl (float): time to live in seconds, if not the cache's default
+
+        Returns:
+            dataframe (DataFrame), or None on a miss
+
+        """
+        filename = self._filename(key)
+        try:
+            written = os.path.getmtime(filename)
+        except OSError:
+            return None
+
+        now = time.time()
+        if now - written > (self.ttl if ttl is None else ttl):
+            logging.info("Cached result %s has expired", key)
+            return None
+
+        df = pd.read_parquet(filename) if self.ext == ".parquet" else pd.read_pickle(filename)
+        os.utime(filename, (now, written))
+        return df
+
+    def put(self, key, df):
+        """cache a result, then evict the least recently used results if the cache is too big
+
+        Note:
+            a result that cannot be written, e.g. an object column of mixed types that Parquet rejects, is logged and
+            not cached: the query has succeeded, so the node goes on with its result
+
+        Args:
+            key (str): hash of the query and database
+            df (DataFrame): result of the query
+
+        Returns:
+            determination (bool) of whether the result was cached
+
+        """
+        os.makedirs(self.dirname, exist_ok=True)
+        try:
+            write_atomically(self._filename(key), df.to_parquet if self.ext == ".parquet" else df.to_pickle)
+        except Exception as e:
+            logging.warning("Could not cache result %s, continuing without caching it: %s", key, e)
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        """delete the least recently used results until the cache fits in max_bytes
+
+        Returns:
+            number of results deleted (int)
+
+        """
+        if self.max_bytes is None:
+            return 0
+
+        entries = []
+        for filename in glob.glob(os.path.join(self.dirname, "*" + self.ext)):
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                # deleted by another process
+                continue
+            entries.append((stat.st_atime, stat.st_size, filename))
+
+        total = sum(size for _, size, _ in entries)
+        n = 0
+        for _, size, filename in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            total -= size
+            n += 1
+
+        if n:
+            logging.info("Evicted %s results from the query cache", n)
+        return n
@@ -4,6 +4,7 @@ Author(s):
     Carl Anderson (carl.anderson@weightwatchers.com)
 
 """
+import os
 import sqlite3
 from primrose.base.sql_reader import AbstractSqlReader
 
@@ -11,6 +12,8 @@ from primrose.base.sql_reader import AbstractSqlReader
 class SQLiteReader(AbstractSqlReader):
     """Runs SQLite queries into pandas dataframes"""
 
+    opens_connections = True
+
     @staticmethod
     def necessary_config(node_config):
         """Return a list of necessary configuration keys within the implementation
@@ -35,3 +38,12 @@ class SQLiteReader(AbstractSqlReader):
 
         """
         return sqlite3.connect(self.node_config["filename"])
+
+    def connection_identity(self):
+        """identity of the SQLite DB, for the query cache
+
+        Returns:
+            identity (str): absolute path of the DB file
+
+        """
+        return "sqlite://" + os.path.abspath(self.node_config["filename"])
@@ -0,0 +1,308 @@
+"""Shared memory storage of the DataObject, so that the data that nodes running in worker processes read and write
+is not copied through pickle on every hop
+"""
+import gc
+import collections
+import logging
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+try:
+    import pyarrow as pa
+
+    HAS_PYARROW = True
+
+except ImportError:
+    HAS_PYARROW = False
+
+
+# segments this process has mapped, by name. The arrays handed out are views of their memory, so a segment must stay
+# mapped for as long as they may be used
+_SEGMENTS = {}
+
+
+def _is_dataframe(value):
+    """is value a pandas DataFrame?"""
+    return type(value).__name__ == "DataFrame" and hasattr(value, "to_parquet")
+
+
+def _segment(name):
+    """the segment called name, mapping it in this process on first use"""
+    if name not in _SEGMENTS:
+        _SEGMENTS[name] = shared_memory.SharedMemory(name=name)
+    return _SEGMENTS[name]
+
+
+class SharedArray:
+    """handle of a numpy array in a shared memory segment, which is what is pickled instead of the array"""
+
+    def __init__(self, name, dtype, shape, order):
+        self.name = name
+        self.dtype = dtype
+        self.shape = shape
+        self.order = order
+
+    def view(self):
+        """the array, without copying it
+
+        Returns:
+            array (numpy.ndarray)
+
+        """
+        return np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=_segment(self.name).buf, order=self.order)
+
+
+class SharedTable:
+    """handle of a dataframe in a shared memory segment, as an Arrow IPC stream"""
+
+    def __init__(self, name, nbytes):
+        self.name = name
+        self.nbytes = nbytes
+
+    def view(self):
+        """the dataframe. Numeric columns without nulls are views of the segment, other columns are copied
+
+        Returns:
+            df (pandas.DataFrame)
+
+        """
+        buffer = pa.py_buffer(_segment(self.name).buf)[: self.nbytes]
+        table = pa.ipc.open_stream(buffer).read_all()
+        # one block per column, so that pandas does not copy the columns into 2-D blocks
+        return table.to_pandas(split_blocks=True)
+
+
+def _create(nbytes):
+    """create a segment of nbytes bytes"""
+    segment = shared_memory.SharedMemory(create=True, size=nbytes)
+    _SEGMENTS[segment.name] = segment
+    return segment
+
+
+def share(value):
+    """copy value to a new shared memory segment, if it is a numpy array of numbers, or a dataframe and pyarrow is
+    installed
+
+    Args:
+        value (object): data
+
+    Returns:
+        handle (SharedArray or SharedTable) of value, or None if value is not shared
+
+    """
+    if isinstance(value, np.ndarray) and not value.dtype.hasobject and value.nbytes > 0:
+        order = "F" if value.flags.f_contiguous and not value.flags.c_contiguous else "C"
+        segment = _create(value.nbytes)
+        np.ndarray(value.shape, dtype=value.dtype, buffer=segment.buf, order=order)[...] = value
+        return SharedArray(segment.name, value.dtype.str, value.shape, order)
+
+    if HAS_PYARROW and _is_dataframe(value) and not value.empty:
+        try:
+            table = pa.Table.from_pandas(value)
+        except Exception:
+            # e.g. columns of mixed types: pickled, as without shared memory
+            logging.debug("Could not convert dataframe to Arrow", exc_info=True)
+            return None
+
+        sink = pa.MockOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        nbytes = sink.size()
+
+        segment = _create(nbytes)
+        stream = pa.FixedSizeBufferWriter(pa.py_buffer(segment.buf))
+        with pa.ipc.new_stream(stream, table.schema) as writer:
+            writer.write_table(table)
+        stream.close()
+        return SharedTable(segment.name, nbytes)
+
+    return None
+
+
+def attach(entries):
+    """replace the handles in a dictionary of key: data by the data they refer to
+
+    Args:
+        entries (dict): dictionary of key: data or handle
+
+    Returns:
+        entries (dict): dictionary of key: data
+
+    """
+    return {
+        key: value.view() if isinstance(value, (SharedArray, SharedTable)) else value for key, value in entries.items()
+    }
+
+
+def share_entries(entries):
+    """share the data in a dictionary of key: data, e.g. that a node added in a worker process. The segments are left
+    to the process that attaches them, and closed in this one
+
+    Args:
+        entries (dict): dictionary of key: data
+
+    Returns:
+        entries (dict): dictionary of key: data or handle
+
+    """
+    shared = {}
+    for key, value in entries.items():
+        handle = share(value)
+        shared[key] = value if handle is None else handle
+        if handle is not None:
+            _SEGMENTS.pop(handle.name).close()
+    return shared
+
+
+def attach_data_object(data_object):
+    """replace the handles in the data of a DataObject sent to a worker process by views of the shared data
+
+    Args:
+        data_object (DataObject): instance of DataObject, as sent by SharedMemoryStore.export
+
+    Returns:
+        data_object (DataObject): instance of DataObject
+
+    """
+    for instance_name in list(data_object.data_dict.keys()):
+        data_object.data_dict[instance_name] = attach(data_object.data_dict[instance_name])
+    return data_object
+
+
+class SharedMemoryStore:
+    """Keeps the dataframes and numpy arrays of a DataObject in shared memory segments while nodes run in worker
+    processes.
+
+    Note:
+        Data is copied to shared memory the first time it is sent to a worker process, and the DataObject's copy is
+        replaced by a view of the segment. From then on, only a small handle is pickled: workers map the segment and
+        read the data in place. Data that worker processes add is sent back the same way.
+
+        Segments are owned by the process running the DAG, which deletes them when their data is released and when
+        the run finishes.
+
+    """
+
+    def __init__(self):
+        """instantiate the store"""
+        # (instance_name, key): (data, handle) of data in shared memory
+        self.handles = {}
+        self.n_shared = 0
+        self.bytes_shared = 0
+
+    def __getstate__(self):
+        """copies of the DataObject, e.g. checkpoints, hold their own data"""
+        state = self.__dict__.copy()
+        state["handles"] = {}
+        return state
+
+    def _add(self, instance_name, key, handle):
+        """take ownership of handle, and return a view of its data"""
+        value = handle.view()
+        self.handles[(instance_name, key)] = (value, handle)
+        self.n_shared += 1
+        self.bytes_shared += _SEGMENTS[handle.name].size
+        return value
+
+    def export(self, data_object):
+        """a copy of data_object to send to a worker process, where data is replaced by handles of shared memory
+
+        Args:
+            data_object (DataObject): instance of DataObject
+
+        Returns:
+            data_object (DataObject): a shallow copy of data_object, holding handles
+
+        """
+        # worker processes forked before the resource tracker runs start their own, which deletes the segments that
+        # they create or map when they exit
+        resource_tracker.ensure_running()
+        data_object.resolve()
+
+        exported = data_object.__class__.__new__(data_object.__class__)
+        exported.__dict__.update(data_object.__dict__)
+        exported.spill = None
+        exported.shared_memory = None
+        exported.data_dict = collections.defaultdict(dict)
+
+        for instance_name in list(data_object.data_dict.keys()):
+            entries = data_object.data_dict[instance_name]
+            exported.data_dict[instance_name] = {}
+            for key in list(entries.keys()):
+                value = entries[key]
+                shared_value, handle = self.handles.get((instance_name, key), (None, None))
+                if shared_value is not value:
+                    # not shared yet, or overwritten since
+                    handle = share(value)
+                    if handle is not None:
+                        # the DataObject keeps a view of the segment rather than its own copy
+                        entries[key] = self._add(instance_name, key, handle)
+                exported.data_dict[instance_name][key] = value if handle is None else handle
+
+        return exported
+
+    def adopt(self, instance_name, entries):
+        """take ownership of the segments of entries sent back by a worker process
+
+        Args:
+            instance_name (str): name of node in DAG
+            entries (dict): dictionary of key: data or handle
+
+        Returns:
+            entries (dict): dictionary of key: data
+
+        """
+        adopted = {}
+        for key, value in entries.items():
+            if isinstance(value, (SharedArray, SharedTable)):
+                value = self._add(instance_name, key, value)
+            adopted[key] = value
+        return adopted
+
+    @staticmethod
+    def _delete(handle):
+        """delete the segment of handle. It stays mapped if some data still uses it, until this process exits"""
+        segment = _SEGMENTS.get(handle.name)
+        if segment is None:
+            return
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            segment.close()
+            del _SEGMENTS[handle.name]
+        except BufferError:
+            logging.debug("Segment %s is still in use, leaving it mapped", handle.name)
+
+    def release(self, instance_name):
+        """delete the segments of the data of instance_name
+
+        Args:
+            instance_name (str): name of node in DAG
+
+        """
+        instance_keys = [instance_key for instance_key in self.handles if instance_key[0] == instance_name]
+        handles = [self.handles.pop(instance_key)[1] for instance_key in instance_keys]
+        gc.collect()
+        for handle in handles:
+            SharedMemoryStore._delete(handle)
+
+    def close(self, data_object):
+        """copy the data of data_object that is in shared memory back to the process's own memory, and delete every
+        segment
+
+        Args:
+            data_object (DataObject): instance of DataObject
+
+        """
+        for (instance_name, key), (value, handle) in self.handles.items():
+            entries = data_object.data_dict.get(instance_name)
+            if entries is not None and key in entries and entries[key] is value:
+                entries[key] = value.copy()
+
+        handles = [handle for _, handle in self.handles.values()]
+        self.handles = {}
+        gc.collect()
+        for handle in handles:
+            SharedMemoryStore._delete(handle)
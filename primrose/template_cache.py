@@ -0,0 +1,106 @@
+"""Shared jinja environments, so that templates are compiled once per process rather than on every render"""
+import os
+import hashlib
+import threading
+from jinja2 import Environment, FileSystemLoader, pass_context
+
+# number of compiled templates kept by each environment
+CACHE_SIZE = 1000
+
+_ENVIRONMENTS = {}
+_LOCK = threading.Lock()
+
+
+@pass_context
+def env_override(context, value, key):
+    """jinja filter: the value of environment variable key, if set, else value
+
+    Note:
+        taking the context stops jinja from running the filter once, when the template is compiled, rather than
+        each time it is rendered, which would make compiled templates unsafe to reuse
+
+    Args:
+        context (jinja2.runtime.Context): context of the render
+        value (str): default value
+        key (str): name of environment variable
+
+    Returns:
+        value (str)
+
+    """
+    return os.getenv(key, value)
+
+
+def _environment(name, **kwargs):
+    """the environment called name, created with kwargs on first use
+
+    Note:
+        an environment caches the templates that it loads from files, keyed by file name. Before reusing a template,
+        it checks that the modification time of the file has not changed, and if it has, compiles the file again.
+
+    Args:
+        name (str): name of environment
+        kwargs: keyword arguments of jinja2.Environment
+
+    Returns:
+        environment (jinja2.Environment)
+
+    """
+    with _LOCK:
+        if name not in _ENVIRONMENTS:
+            _ENVIRONMENTS[name] = Environment(
+                loader=FileSystemLoader([".", "/"]), cache_size=CACHE_SIZE, auto_reload=True, **kwargs
+            )
+        return _ENVIRONMENTS[name]
+
+
+def sql_environment():
+    """environment of SQL queries, which searches for templates using relative and absolute paths, and uses
+    `{` and `}` around variables
+
+    Returns:
+        environment (jinja2.Environment)
+
+    """
+    return _environment("sql", variable_start_string="{", variable_end_string="}")
+
+
+def config_environment():
+    """environment of configuration files, which searches for fragments using relative and absolute paths, and has
+    an `env_override` filter
+
+    Returns:
+        environment (jinja2.Environment)
+
+    """
+    env = _environment("config")
+    env.filters["env_override"] = env_override
+    return env
+
+
+_STRING_TEMPLATES = {}
+
+
+def config_template(config_str):
+    """the compiled template of the content of a configuration file, compiling it only the first time it is seen
+
+    Note:
+        fragments that the template includes are loaded, and cached, by the environment when it is rendered
+
+    Args:
+        config_str (str): content of some configuration file
+
+    Returns:
+        template (jinja2.Template)
+
+    """
+    key = hashlib.sha256(config_str.encode("utf-8")).hexdigest()
+    with _LOCK:
+        template = _STRING_TEMPLATES.get(key)
+    if template is None:
+        template = config_environment().from_string(config_str)
+        with _LOCK:
+            if len(_STRING_TEMPLATES) >= CACHE_SIZE:
+                _STRING_TEMPLATES.clear()
+            _STRING_TEMPLATES[key] = template
+    return template
@@ -45,6 +45,11 @@ def parse_arguments():
         default=False,
         type=lambda x: (str(x).lower() == "true"),
     )
+    parser.add_argument(
+        "--resume",
+        help="run_id of a checkpointed run to resume",
+        default=None,
+    )
 
     known_args, pipeline_args = parser.parse_known_args()
     return known_args, pipeline_args
@@ -63,7 +68,7 @@ def main():
 
     configuration = Configuration(config_location=args.config_loc)
 
-    DagRunner(configuration).run(dry_run=args.is_dry_run)
+    DagRunner(configuration).run(dry_run=args.is_dry_run, resume=args.resume)
 
 
 if __name__ == "__main__":
@@ -158,6 +158,9 @@ class ExplicitCategoricalTransform(AbstractTransformer):
 class ImplicitCategoricalTransform(AbstractTransformer):
     """Class which implicitly transforms all string columns of a dataframe with sklearn LabelEncoder"""
 
+    # encodes with the encoders learned by fit
+    chunk_safe = True
+
     def __init__(self, target_variable):
         """initialize this ImplicitCategoricalTransform
 
@@ -17,6 +17,9 @@ from primrose.base.transformer import AbstractTransformer
 class FilterByPandasExpression(AbstractTransformer):
     """Applies filters to data as defined in feature_filters"""
 
+    # filters rows one at a time
+    chunk_safe = True
+
     def __init__(self, feature_filters):
         """initialize filter with a list of feature_filters"""
         self.feature_filters = feature_filters
@@ -14,6 +14,9 @@ from primrose.base.transformer import AbstractTransformer
 class ColumnSpecificImpute(AbstractTransformer):
     """Transform config specified columns NULL values into zero, mean, median, mode, inf or negative inf"""
 
+    # imputes with the values learned by fit
+    chunk_safe = True
+
     def __init__(
         self,
         columns_to_zero,
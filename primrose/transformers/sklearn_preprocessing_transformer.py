@@ -13,6 +13,9 @@ from primrose.base.transformer import AbstractTransformer
 
 
 class SklearnPreprocessingTransformer(AbstractTransformer):
+    # transforms with the preprocessor learned by fit, which for sklearn preprocessors works row by row
+    chunk_safe = True
+
     def __init__(self, preprocessor, columns, args=None):
         """initialize the proprocessor
 
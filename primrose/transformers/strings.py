@@ -13,6 +13,9 @@ from primrose.base.transformer import AbstractTransformer
 class StringTransformer(AbstractTransformer):
     """Transforms Series of strings in a Series or DataFrame."""
 
+    # applies string methods value by value
+    chunk_safe = True
+
     def __init__(self, method, columns, *args, **kwargs):
         """
 
@@ -1,4 +1,4 @@
-"""Enum to speacify type of run mode: train, predict, and eval
+"""Enum to speacify type of run mode: train, predict, and eval, and writing files atomically
 
 Author(s):
     Michael Skarlinski (michael.skarlinski@weightwatchers.com)
@@ -6,6 +6,8 @@ Author(s):
     Carl Anderson (carl.anderson@weightwatchers.com)
 
 """
+import os
+import uuid
 from enum import Enum
 
 
@@ -35,3 +37,26 @@ class RunModes(Enum):
 
         """
         return list(map(lambda t: t.value, RunModes))
+
+
+def write_atomically(filename, write_fn):
+    """write a file by writing a temporary file, then renaming it to filename
+
+    Note:
+        so that a failure midway never leaves a truncated file, and readers of the file see either its old or its
+        new content. The temporary file is unique per call, as several threads or processes may write the same file
+        at the same time, and it is removed if writing fails
+
+    Args:
+        filename (str): path of file
+        write_fn (func): function of a path that writes the content of the file to it
+
+    """
+    tmp_filename = "%s.%s.tmp" % (filename, uuid.uuid4().hex)
+    try:
+        write_fn(tmp_filename)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
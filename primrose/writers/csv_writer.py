@@ -40,7 +40,7 @@ class CsvWriter(AbstractFileWriter):
             return {"index": False}
 
     def run(self, data_object):
-        """write some dataframe to a local CSV file
+        """write some dataframe to a local CSV file. A streamed dataframe (ChunkedDataFrame) is written chunk by chunk
 
         Returns:
             (tuple): tuple containing:
@@ -0,0 +1,149 @@
+"""write some dataframe to a local Parquet file, or partitioned dataset."""
+import os
+import shutil
+import logging
+from primrose.data_object import DataObjectResponseType
+from primrose.writers.abstract_file_writer import AbstractFileWriter
+from primrose.chunked_data_frame import ChunkedDataFrame
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    HAS_PYARROW = True
+
+except ImportError:
+    HAS_PYARROW = False
+
+
+class ParquetWriter(AbstractFileWriter):
+    """write some dataframe to a local Parquet file, or partitioned dataset."""
+
+    @staticmethod
+    def necessary_config(node_config):
+        """Necessary inputs for the ParquetWriter:
+
+        Args:
+            node_config (dict): set of parameters / attributes for the node
+
+        Note:
+            key: key that identifies object to write
+            dir: directory to write to
+            filename: name of file to be written, or of the directory of a partitioned dataset
+
+            optionally, compression: `snappy` (default), `gzip`, `brotli`, `zstd`, `lz4` or `none`
+
+            optionally, partition_cols: list of columns to partition the data by. The data is then written as a
+            dataset, with a directory `column=value` for each value of these columns. Any existing dataset is
+            deleted first
+
+            optionally, kwargs: other keyword arguments of `pyarrow.parquet.write_table`
+
+        Returns:
+            set of necessary configuration keys
+
+        """
+        return set(["key", "dir", "filename"])
+
+    def get_optional_config(self):
+        """keyword arguments of `pyarrow.parquet.write_table`
+
+        Returns:
+            kwargs (dict): dictionary of kwargs key-value pairs
+
+        """
+        kwargs = dict(self.node_config.get("kwargs", {}))
+        kwargs["compression"] = self.node_config.get("compression", "snappy")
+        return kwargs
+
+    @staticmethod
+    def to_table(df):
+        """convert a dataframe to an Arrow table. Like CsvWriter, the index is not written
+
+        Args:
+            df (DataFrame): dataframe
+
+        Returns:
+            table (pyarrow.Table)
+
+        """
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+    def _write_chunks(self, chunked, filename, partition_cols, kwargs):
+        """write a ChunkedDataFrame chunk by chunk, holding one chunk in memory at a time
+
+        Args:
+            chunked (ChunkedDataFrame): streamed data
+            filename (str): file, or dataset directory, to write to
+            partition_cols (list): columns to partition by, if any
+            kwargs (dict): keyword arguments of `pyarrow.parquet.write_table`
+
+        Returns:
+            number of chunks written (int)
+
+        """
+        n = 0
+        writer = None
+        try:
+            for n, chunk in enumerate(chunked, 1):
+                table = ParquetWriter.to_table(chunk)
+                if partition_cols:
+                    pq.write_to_dataset(
+                        table,
+                        filename,
+                        partition_cols=partition_cols,
+                        basename_template="part-%s-{i}.parquet" % n,
+                        **kwargs,
+                    )
+                    continue
+                if writer is None:
+                    writer = pq.ParquetWriter(filename, table.schema, **kwargs)
+                # chunks can differ in schema, e.g. in the categories of a categorical
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+
+        logging.info("Wrote %s chunks to %s", n, filename)
+        return n
+
+    def run(self, data_object):
+        """write some dataframe to a local Parquet file. A streamed dataframe (ChunkedDataFrame) is written chunk by chunk
+
+        Returns:
+            (tuple): tuple containing:
+
+                data_object (DataObject): instance of DataObject
+
+                terminate (bool): terminate the DAG?
+
+        """
+        if not HAS_PYARROW:
+            raise ImportError("pyarrow is necessary to write Parquet")
+
+        filename = self.node_config["dir"] + os.path.sep + self.node_config["filename"]
+        key = self.node_config["key"]
+        logging.info("Saving %s data to %s", key, filename)
+        data_to_write = data_object.get_upstream_data(
+            self.instance_name,
+            pop_data=False,
+            rtype=DataObjectResponseType.KEY_VALUE.value,
+        )
+        df = data_to_write[key]
+        partition_cols = self.node_config.get("partition_cols")
+        kwargs = self.get_optional_config()
+
+        if partition_cols and os.path.isdir(filename):
+            # as a file would be, the dataset is overwritten rather than added to
+            logging.info("Removing existing dataset %s", filename)
+            shutil.rmtree(filename)
+
+        if isinstance(df, ChunkedDataFrame):
+            self._write_chunks(df, filename, partition_cols, kwargs)
+        elif partition_cols:
+            pq.write_to_dataset(self.to_table(df), filename, partition_cols=partition_cols, **kwargs)
+        else:
+            pq.write_table(self.to_table(df), filename, **kwargs)
+
+        terminate = False
+        return data_object, terminate
@@ -44,7 +44,7 @@ class S3Writer(AbstractWriter):
             data_object (DataObject): instance of DataObject
 
         Note:
-            generates unique filename using uuid
+            generates unique filename using uuid. A streamed dataframe (ChunkedDataFrame) is written chunk by chunk
 
         Returns:
             filename (str)
@@ -0,0 +1,103 @@
+"""Benchmark of the check that a sequence of nodes never runs a node before one of its upstream nodes,
+as done by DagRunner.check_for_upstream, on synthetic layered DAGs of 10 to 5,000 nodes.
+
+Compares ConfigurationDag.first_upstream_path with the previous check of `paths` for every pair of nodes,
+which is only run up to --max_pairwise nodes as it is cubic in the number of nodes.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmark_upstream_check.py --sizes 10,100,300,1000,5000 --max_pairwise 300
+"""
+import argparse
+import random
+import time
+from primrose.configuration.configuration_dag import ConfigurationDag
+
+
+def synthetic_config(n_nodes, fan_out=2, seed=42):
+    """implementation_config of a layered DAG of about sqrt(n_nodes) layers of sqrt(n_nodes) nodes: each node sends
+    data to fan_out random nodes of the next layer
+
+    Args:
+        n_nodes (int): number of nodes
+        fan_out (int): number of destinations of each node
+        seed (int): random seed
+
+    Returns:
+        implementation_config (dict)
+
+    """
+    rng = random.Random(seed)
+    width = max(2, int(n_nodes ** 0.5))
+    names = ["node_%s" % i for i in range(n_nodes)]
+    layers = [names[i : i + width] for i in range(0, n_nodes, width)]
+
+    section = {}
+    for layer, next_layer in zip(layers, layers[1:] + [[]]):
+        for name in layer:
+            destinations = rng.sample(next_layer, min(fan_out, len(next_layer)))
+            section[name] = {"class": "SklearnDatasetReader", "destinations": destinations}
+
+    # make sure every node of the next layer has an upstream node
+    for layer, next_layer in zip(layers, layers[1:]):
+        for i, name in enumerate(next_layer):
+            destinations = section[layer[i % len(layer)]]["destinations"]
+            if name not in destinations:
+                destinations.append(name)
+
+    return {"pipeline_config": section}
+
+
+def pairwise_upstream_path(dag, sequence):
+    """the previous check: look for a path between every pair of nodes
+
+    Args:
+        dag (ConfigurationDag): the DAG
+        sequence (list): list of node names
+
+    Returns:
+        (source, target) tuple of node names, or None if there is no such path
+
+    """
+    for idx_from in range(len(sequence)):
+        for idx_to in range(len(sequence)):
+            if idx_from > idx_to:
+                if dag.paths(sequence[idx_from], sequence[idx_to]):
+                    return sequence[idx_from], sequence[idx_to]
+    return None
+
+
+def timed(fn, *args):
+    """run fn, returning its result and the time it took in seconds"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,30,100,300,1000,3000,5000", help="comma separated numbers of nodes")
+    parser.add_argument("--max_pairwise", default=300, type=int, help="largest DAG to run the pairwise check on")
+    args = parser.parse_args()
+
+    print("%8s %14s %14s %14s" % ("nodes", "index (s)", "pairwise (s)", "speedup"))
+    for n_nodes in [int(size) for size in args.sizes.split(",")]:
+        dag = ConfigurationDag(synthetic_config(n_nodes))
+        dag.create_dag()
+
+        # a valid sequence is the worst case: every pair has to be checked
+        sequence = list(dag.topological_order())
+        dag._topological_order = None
+
+        result, index_time = timed(dag.first_upstream_path, sequence)
+        assert result is None
+
+        if n_nodes <= args.max_pairwise:
+            pairwise_result, pairwise_time = timed(pairwise_upstream_path, dag, sequence)
+            assert pairwise_result == result
+            print("%8s %14.5f %14.5f %13.0fx" % (n_nodes, index_time, pairwise_time, pairwise_time / index_time))
+        else:
+            print("%8s %14.5f %14s %14s" % (n_nodes, index_time, "-", "-"))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import math
 import pytest
 import pandas as pd
 from primrose.configuration.configuration import Configuration
+from primrose.configuration.util import ConfigurationError
 from primrose.base.search_engine import AbstractSearchEngine
 from primrose.base.node import AbstractNode
 from nltk import ngrams
@@ -108,3 +109,100 @@ def test_cosine_similarity_matrix():
     assert engine.ids == [1, 2, 3]
     assert engine.docs == ["spinach omelet", "kale omelet", "cherry pie"]
     assert engine.tfidf is not None
+
+
+@pytest.mark.parametrize("block_size,workers", [(1000, 1), (2, 1), (1, 2)])
+def test_top_k_similarity_matrix(block_size, workers):
+    class Testpipeline(AbstractNode):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            return data_object, False
+
+    NodeFactory().register("Testpipeline", Testpipeline)
+
+    class TestTopKSearchEngine(AbstractSearchEngine):
+        def tokenize(self, s, stopwords=[], add_ngrams=True):
+            return s.lower().split(" ")
+
+    NodeFactory().register("TestTopKSearchEngine", TestTopKSearchEngine)
+
+    config = {
+        "implementation_config": {
+            "pipeline_config": {
+                "pipeline1": {
+                    "class": "Testpipeline",
+                    "destinations": ["recipe_name_model"],
+                }
+            },
+            "model_config": {
+                "recipe_name_model": {
+                    "class": "TestTopKSearchEngine",
+                    "id_key": "id",
+                    "doc_key": "name",
+                    "mode": "predict",
+                    "top_k": 2,
+                    "similarity_block_size": block_size,
+                    "similarity_workers": workers,
+                    "destinations": [],
+                }
+            },
+        }
+    }
+
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+
+    corpus = [
+        {"id": 1, "name": "spinach omelet"},
+        {"id": 2, "name": "kale omelet"},
+        {"id": 3, "name": "cherry pie"},
+        {"id": 4, "name": "kale spinach omelet"},
+    ]
+    data_object = DataObject(configuration)
+    data_object.add(Testpipeline(configuration, "pipeline1"), pd.DataFrame(corpus))
+
+    engine = TestTopKSearchEngine(configuration, "recipe_name_model")
+    data_object = engine.predict(data_object)
+    m = data_object.get("recipe_name_model", rtype=DataObjectResponseType.VALUE.value)
+
+    dense = engine.cosine_similarity_matrix()
+    assert m.shape == (4, 4)
+    for i in range(4):
+        row = m[i].toarray()[0]
+        # the two highest similarities of each document, and nothing else
+        best = sorted(dense[i][dense[i] > 0], reverse=True)[:2]
+        assert sorted(row[row > 0], reverse=True) == pytest.approx(best)
+        for j in row.nonzero()[0]:
+            assert math.isclose(row[j], dense[i, j], abs_tol=0.001)
+
+    # cherry pie is similar to nothing else
+    assert m[2].nnz == 1
+    assert math.isclose(m[2, 2], 1.0, abs_tol=0.001)
+
+
+@pytest.mark.parametrize("top_k", [0, -1, "many"])
+def test_top_k_bad(top_k):
+    class TestTopKSearchEngine(AbstractSearchEngine):
+        def tokenize(self, s):
+            return s.lower().split(" ")
+
+    NodeFactory().register("TestTopKSearchEngine", TestTopKSearchEngine)
+
+    config = {
+        "implementation_config": {
+            "model_config": {
+                "recipe_name_model": {
+                    "class": "TestTopKSearchEngine",
+                    "id_key": "id",
+                    "doc_key": "name",
+                    "mode": "predict",
+                    "top_k": top_k,
+                    "destinations": [],
+                }
+            }
+        }
+    }
+    with pytest.raises(ConfigurationError, match="top_k must be a positive integer"):
+        Configuration(None, is_dict_config=True, dict_config=config)
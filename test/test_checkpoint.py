@@ -0,0 +1,60 @@
+import os
+import json
+import pytest
+from primrose.checkpoint import Checkpoint
+from primrose.configuration.configuration import Configuration
+from primrose.data_object import DataObject, DataObjectResponseType
+
+
+def test_save_restore(tmpdir):
+    checkpoint = Checkpoint(str(tmpdir), "run1", "abc")
+    checkpoint.save("reader", {"data": [1, 2, 3], "query": "select 1"})
+    checkpoint.save("conditional", None, to_prune={"writer2", "writer1"})
+
+    with open(os.path.join(str(tmpdir), "run1", Checkpoint.STATE_FILENAME)) as f:
+        state = json.load(f)
+    assert state["completed"] == ["reader", "conditional"]
+    assert state["pruned"] == ["writer1", "writer2"]
+    assert not state["terminated"]
+
+    checkpoint = Checkpoint.load(str(tmpdir), "run1", "abc")
+    assert checkpoint.completed == ["reader", "conditional"]
+    assert checkpoint.pruned == {"writer1", "writer2"}
+
+    data_object = checkpoint.restore(DataObject(None))
+    assert data_object.get("reader") == {"data": [1, 2, 3], "query": "select 1"}
+    assert "conditional" not in data_object.data_dict
+
+
+def test_discard(tmpdir):
+    checkpoint = Checkpoint(str(tmpdir), "run1", "abc")
+    checkpoint.save("reader", {"data": 1})
+    checkpoint.save("pipeline", {"data": 2}, terminate=True)
+    checkpoint.discard("reader")
+
+    assert not os.path.exists(os.path.join(str(tmpdir), "run1", "reader"))
+
+    checkpoint = Checkpoint.load(str(tmpdir), "run1", "abc")
+    assert checkpoint.terminated
+    data_object = checkpoint.restore(DataObject(None))
+    assert list(data_object.data_dict.keys()) == ["pipeline"]
+
+
+def test_load_missing(tmpdir):
+    with pytest.raises(Exception) as e:
+        Checkpoint.load(str(tmpdir), "nope", "abc")
+    assert "No checkpoint of run nope in" in str(e)
+
+
+def test_run_id_for():
+    config = {
+        "implementation_config": {
+            "reader_config": {"read_data": {"class": "SklearnDatasetReader", "dataset": "iris"}},
+        }
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    run_id = Checkpoint.run_id_for(configuration)
+    assert run_id.split("_")[2] == configuration.config_hash[:8]
+
+    # runs of the same configuration started in the same second get their own checkpoints
+    assert Checkpoint.run_id_for(configuration) != run_id
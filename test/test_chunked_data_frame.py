@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import pytest
+import pandas as pd
+from primrose.chunked_data_frame import ChunkedDataFrame
+from primrose.configuration.configuration import Configuration
+from primrose.dag_runner import DagRunner
+from primrose.data_object import DataObject, DataObjectResponseType
+from primrose.readers.csv_reader import CsvReader
+from primrose.readers.sqlite_reader import SQLiteReader
+
+
+def _chunks():
+    return ChunkedDataFrame(lambda: iter([pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [3]})]))
+
+
+def test_iterate_twice():
+    chunked = _chunks()
+    assert [len(chunk) for chunk in chunked] == [2, 1]
+    assert [len(chunk) for chunk in chunked] == [2, 1]
+
+
+def test_map_to_frame():
+    chunked = _chunks().map(lambda chunk: chunk * 10)
+    assert chunked.to_frame()["a"].tolist() == [10, 20, 30]
+
+
+def test_concat():
+    chunked = ChunkedDataFrame.concat([_chunks(), pd.DataFrame({"a": [4]})])
+    assert chunked.to_frame()["a"].tolist() == [1, 2, 3, 4]
+
+
+def test_to_csv(tmpdir):
+    filename = os.path.join(str(tmpdir), "out.csv")
+    assert _chunks().to_csv(filename, index=False) == 2
+    assert pd.read_csv(filename)["a"].tolist() == [1, 2, 3]
+
+    empty = os.path.join(str(tmpdir), "empty.csv")
+    assert ChunkedDataFrame(lambda: iter([])).to_csv(empty) == 0
+    assert os.path.exists(empty)
+
+
+def _config(transformer, chunksize=3):
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "read_data": {
+                    "class": "CsvReader",
+                    "filename": "test/tennis.csv",
+                    "chunksize": chunksize,
+                    "destinations": ["transformers"],
+                }
+            },
+            "pipeline_config": {
+                "transformers": {
+                    "class": "TransformerPipeline",
+                    "is_training": False,
+                    "transformer_sequence": [transformer],
+                    "destinations": ["write_output"],
+                }
+            },
+            "writer_config": {
+                "write_output": {
+                    "class": "CsvWriter",
+                    "key": "data_test",
+                    "dir": "cache",
+                    "filename": "test_chunked_data_frame.csv",
+                }
+            },
+        }
+    }
+    return Configuration(None, is_dict_config=True, dict_config=config)
+
+
+def test_csv_reader_chunksize():
+    configuration = _config({"class": "primrose.transformers.filter.FilterByPandasExpression", "feature_filters": []})
+    data_object, terminate = CsvReader(configuration, "read_data").run(DataObject(configuration))
+    assert not terminate
+
+    chunked = data_object.get("read_data", rtype=DataObjectResponseType.VALUE.value)
+    assert isinstance(chunked, ChunkedDataFrame)
+    assert [len(chunk) for chunk in chunked] == [3, 3, 3, 3, 2]
+    assert chunked.to_frame().equals(pd.read_csv("test/tennis.csv"))
+
+
+def test_streaming_dag():
+    transformer = {
+        "class": "primrose.transformers.strings.StringTransformer",
+        "method": "replace",
+        "columns": "outlook",
+        "pat": "sunny",
+        "repl": "rainy",
+    }
+    DagRunner(_config(transformer)).run()
+
+    expected = pd.read_csv("test/tennis.csv")
+    expected["outlook"] = expected["outlook"].str.replace("sunny", "rainy")
+    written = pd.read_csv(os.path.join("cache", "test_chunked_data_frame.csv"))
+    assert written.equals(expected)
+
+
+def test_streaming_not_chunk_safe():
+    transformer = {"class": "primrose.transformers.categoricals.ExplicitCategoricalTransform", "categoricals": {}}
+    with pytest.raises(Exception) as e:
+        DagRunner(_config(transformer)).run()
+    assert "transformers ['ExplicitCategoricalTransform'] are not chunk safe" in str(e)
+
+
+def test_sql_reader_chunksize(tmpdir):
+    filename = os.path.join(str(tmpdir), "test.db")
+    conn = sqlite3.connect(filename)
+    conn.execute("create table test(firstname text, lastname text);")
+    conn.execute("insert into test(firstname, lastname) values('joe', 'doe'), ('mary','poppins'), ('a', 'b');")
+    conn.commit()
+    conn.close()
+
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {
+                    "class": "SQLiteReader",
+                    "filename": filename,
+                    "chunksize": 2,
+                    "query_json": [{"query": "test/test_sqlite.sql"}],
+                }
+            }
+        }
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    data_object, terminate = SQLiteReader(configuration, "mynode").run(DataObject(configuration))
+    assert not terminate
+
+    chunked = data_object.get("mynode", rtype=DataObjectResponseType.KEY_VALUE.value)["query_0"]
+    assert [len(chunk) for chunk in chunked] == [2, 1]
+
+
+def test_sql_reader_chunksize_closes_connections(tmpdir, monkeypatch):
+    filename = os.path.join(str(tmpdir), "test.db")
+    conn = sqlite3.connect(filename)
+    conn.execute("create table test(firstname text, lastname text);")
+    conn.execute("insert into test(firstname, lastname) values('joe', 'doe'), ('mary','poppins'), ('a', 'b');")
+    conn.commit()
+    conn.close()
+
+    opened = []
+
+    class TrackedConnection:
+        def __init__(self):
+            self.conn = sqlite3.connect(filename)
+            self.closed = False
+            opened.append(self)
+
+        def cursor(self):
+            return self.conn.cursor()
+
+        def close(self):
+            self.closed = True
+            self.conn.close()
+
+    monkeypatch.setattr(SQLiteReader, "get_connection", lambda self: TrackedConnection())
+
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {
+                    "class": "SQLiteReader",
+                    "filename": filename,
+                    "chunksize": 2,
+                    "query_json": [{"query": "test/test_sqlite.sql"}],
+                }
+            }
+        }
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    data_object, terminate = SQLiteReader(configuration, "mynode").run(DataObject(configuration))
+    chunked = data_object.get("mynode", rtype=DataObjectResponseType.KEY_VALUE.value)["query_0"]
+
+    # nothing is opened until the chunks are read
+    assert opened == []
+
+    assert [len(chunk) for chunk in chunked] == [2, 1]
+    assert len(opened) == 1 and opened[0].closed
+
+    # an abandoned iteration closes its connection too
+    chunks = iter(chunked)
+    next(chunks)
+    del chunks
+    assert len(opened) == 2 and opened[1].closed
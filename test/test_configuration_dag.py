@@ -488,3 +488,67 @@ def test_paths():
 
     paths = configuration.dag.paths("write_output", "decision_tree_model")
     assert not paths
+
+
+def test_first_upstream_path():
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "read_data": {
+                    "class": "CsvReader",
+                    "filename": "test/tennis.csv",
+                    "destinations": ["write_output", "write_output2"],
+                }
+            },
+            "writer_config": {
+                "write_output": {
+                    "class": "CsvWriter",
+                    "key": "data",
+                    "dir": "cache",
+                    "filename": "unittest.csv",
+                },
+                "write_output2": {
+                    "class": "CsvWriter",
+                    "key": "data",
+                    "dir": "cache",
+                    "filename": "unittest.csv",
+                },
+            },
+        }
+    }
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+    dag = configuration.dag
+
+    assert dag.topological_order()[0] == "read_data"
+    assert dag.first_upstream_path(["read_data", "write_output", "write_output2"]) is None
+    assert dag.first_upstream_path(["write_output2", "write_output"]) is None
+    assert dag.first_upstream_path(["write_output2", "write_output", "read_data"]) == ("read_data", "write_output2")
+    assert dag.first_upstream_path(["read_data", "read_data"]) == ("read_data", "read_data")
+
+
+def test_first_upstream_path_matches_pairwise():
+    import random
+    import networkx as nx
+
+    def pairwise(dag, sequence):
+        for idx_from in range(len(sequence)):
+            for idx_to in range(len(sequence)):
+                if idx_from > idx_to:
+                    if dag.paths(sequence[idx_from], sequence[idx_to]):
+                        return sequence[idx_from], sequence[idx_to]
+        return None
+
+    rng = random.Random(0)
+    for _ in range(50):
+        G2 = nx.gnp_random_graph(12, 0.2, seed=rng.randint(0, 10000), directed=True)
+        G2 = nx.DiGraph([("n%s" % u, "n%s" % v) for u, v in G2.edges() if u < v])
+        G2.add_nodes_from("n%s" % i for i in range(12))
+
+        dag = ConfigurationDag({})
+        dag.G2 = G2
+        dag.node_map = {node: "pipeline_config" for node in G2.nodes()}
+        dag._topological_order = None
+
+        # subsets of the nodes, in random order: paths may go through nodes not in sequence
+        sequence = rng.sample(list(G2.nodes()), rng.randint(2, 12))
+        assert dag.first_upstream_path(sequence) == pairwise(dag, sequence)
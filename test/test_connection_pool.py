@@ -0,0 +1,132 @@
+import pytest
+import threading
+from primrose.readers.connection_pool import ConnectionPool, get_pool, close_all_pools
+
+
+class FakeConnection:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = False
+        self.rollbacks = 0
+
+    def rollback(self):
+        if not self.healthy:
+            raise Exception("connection lost")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def test_acquire_reuses_released_connection():
+    connections = []
+
+    def connect():
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    pool = ConnectionPool(connect, max_size=2)
+
+    conn = pool.acquire()
+    pool.release(conn)
+    assert conn.rollbacks == 1
+
+    assert pool.acquire() is conn
+    assert len(connections) == 1
+
+    other = pool.acquire()
+    assert other is not conn
+    assert len(connections) == 2
+    assert pool.in_use == 2
+
+
+def test_acquire_waits_for_max_size():
+    pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.1)
+    conn = pool.acquire()
+
+    with pytest.raises(Exception) as e:
+        pool.acquire()
+    assert "Timed out waiting for a pooled connection, max_size=1" in str(e)
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(pool.acquire()))
+    pool.timeout = 10
+    thread.start()
+    pool.release(conn)
+    thread.join()
+    assert result == [conn]
+
+
+def test_health_check():
+    pool = ConnectionPool(FakeConnection, health_check_fn=lambda c: c.healthy, health_check_interval=0)
+    conn = pool.acquire()
+    pool.release(conn)
+
+    # idle for longer than the interval, and fails the check
+    conn.healthy = False
+    other = pool.acquire()
+    assert other is not conn
+    assert conn.closed
+    assert pool.in_use == 1
+
+
+def test_health_check_outside_lock():
+    checking = threading.Event()
+    hung = threading.Event()
+
+    def check(conn):
+        checking.set()
+        return hung.wait(10)
+
+    pool = ConnectionPool(FakeConnection, max_size=2, health_check_fn=check, health_check_interval=0)
+    conn = pool.acquire()
+    pool.release(conn)
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(pool.acquire()))
+    thread.start()
+    assert checking.wait(10)
+
+    # the first thread is stuck checking the idle connection, but this one still gets a new connection
+    other = pool.acquire()
+    assert other is not conn
+    assert pool.in_use == 2
+
+    hung.set()
+    thread.join()
+    assert result == [conn]
+
+
+def test_release_broken_connection():
+    pool = ConnectionPool(lambda: FakeConnection(healthy=False))
+    conn = pool.acquire()
+    pool.release(conn)
+    assert conn.closed
+    assert pool.idle == []
+    assert pool.in_use == 0
+
+
+def test_close_all_pools():
+    close_all_pools()
+
+    pool = get_pool(("fake", "db"), FakeConnection, max_size=3)
+    assert get_pool(("fake", "db"), FakeConnection) is pool
+    assert pool.max_size == 3
+
+    idle = pool.acquire()
+    busy = pool.acquire()
+    pool.release(idle)
+
+    assert close_all_pools() == 1
+    assert idle.closed
+    assert not busy.closed
+
+    pool.release(busy)
+    assert busy.closed
+
+    with pytest.raises(Exception) as e:
+        pool.acquire()
+    assert "Connection pool is closed" in str(e)
+
+    assert get_pool(("fake", "db"), FakeConnection) is not pool
+    close_all_pools()
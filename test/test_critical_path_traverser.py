@@ -0,0 +1,122 @@
+import json
+import pytest
+from primrose.configuration.configuration import Configuration
+from primrose.configuration.util import ConfigurationError
+from primrose.dag.critical_path_traverser import CriticalPathTraverser
+from primrose.dag.run_history import RunHistory
+from primrose.dag_runner import DagRunner
+
+
+def config(metadata=None):
+    return {
+        "metadata": metadata or {},
+        "implementation_config": {
+            "reader_config": {
+                "short_reader": {
+                    "class": "CsvReader",
+                    "filename": "test/minimal.csv",
+                    "destinations": ["successlogger"],
+                },
+                "long_reader": {
+                    "class": "CsvReader",
+                    "filename": "test/minimal.csv",
+                    "destinations": ["csv_writer"],
+                },
+            },
+            "writer_config": {
+                "csv_writer": {
+                    "class": "CsvWriter",
+                    "key": "data",
+                    "dir": "cache",
+                    "filename": "unittest_critical_path.csv",
+                    "destinations": ["successlogger"],
+                }
+            },
+            "cleanup_config": {
+                "successlogger": {
+                    "class": "LoggingSuccess",
+                    "msg": "woohoo, all done!",
+                    "level": "INFO",
+                }
+            },
+        },
+    }
+
+
+def test_traversal_list_without_history():
+    configuration = Configuration(None, is_dict_config=True, dict_config=config())
+    traverser = CriticalPathTraverser(configuration)
+
+    # the longest chain of nodes goes first
+    assert traverser.traversal_list() == ["long_reader", "csv_writer", "short_reader", "successlogger"]
+    assert traverser.critical_path() == ["long_reader", "csv_writer", "successlogger"]
+    assert traverser.ready_batches() == [["long_reader", "short_reader"], ["csv_writer"], ["successlogger"]]
+    assert not traverser.run_section_by_section()
+
+
+def test_traversal_list_with_history(tmpdir):
+    filename = str(tmpdir.join("history.json"))
+    with open(filename, "w") as f:
+        json.dump({"short_reader": {"runs": 3, "wall_time_s": 10.0}}, f)
+
+    metadata = {"run_history": {"filename": filename}, "traverser": "CriticalPathTraverser"}
+    configuration = Configuration(None, is_dict_config=True, dict_config=config(metadata))
+    traverser = CriticalPathTraverser(configuration)
+
+    assert traverser.priorities() == {
+        "short_reader": 11.0,
+        "long_reader": 3.0,
+        "csv_writer": 2.0,
+        "successlogger": 1.0,
+    }
+    assert traverser.traversal_list() == ["short_reader", "long_reader", "csv_writer", "successlogger"]
+    assert traverser.critical_path() == ["short_reader", "successlogger"]
+    assert traverser.ready_batches()[0] == ["short_reader", "long_reader"]
+
+
+def test_run_updates_history(tmpdir):
+    filename = str(tmpdir.join("history.json"))
+    metadata = {"run_history": {"filename": filename, "smoothing": 0.25}, "traverser": "CriticalPathTraverser"}
+    configuration = Configuration(None, is_dict_config=True, dict_config=config(metadata))
+
+    DagRunner(configuration).run()
+    with open(filename) as f:
+        history = json.load(f)
+    assert sorted(history) == ["csv_writer", "long_reader", "short_reader", "successlogger"]
+    assert history["long_reader"]["runs"] == 1
+    first = history["long_reader"]["wall_time_s"]
+
+    DagRunner(configuration).run()
+    with open(filename) as f:
+        history = json.load(f)
+    assert history["long_reader"]["runs"] == 2
+    assert history["long_reader"]["wall_time_s"] != first
+
+
+def test_run_history_update(tmpdir):
+    class Report:
+        rows = [
+            {"node": "a", "status": "ran", "wall_time_s": 4.0},
+            {"node": "b", "status": "cached", "wall_time_s": 0.0},
+        ]
+
+    history = RunHistory(str(tmpdir.join("history.json")), smoothing=0.5)
+    assert history.runtime("a") == RunHistory.DEFAULT_RUNTIME_S
+
+    assert history.update(Report()) == 1
+    assert history.load() == {"a": {"runs": 1, "wall_time_s": 4.0}}
+
+    Report.rows[0]["wall_time_s"] = 2.0
+    history.update(Report())
+    assert history.runtime("a") == 3.0
+    assert history.runtime("b") == RunHistory.DEFAULT_RUNTIME_S
+
+
+def test_run_history_config_bad():
+    with pytest.raises(ConfigurationError, match="metadata.run_history: you must set 'filename'"):
+        Configuration(None, is_dict_config=True, dict_config=config({"run_history": {}}))
+
+    with pytest.raises(ConfigurationError, match="smoothing must be a number"):
+        Configuration(
+            None, is_dict_config=True, dict_config=config({"run_history": {"filename": "h.json", "smoothing": 2}})
+        )
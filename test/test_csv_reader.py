@@ -1,4 +1,6 @@
 import pytest
+import json
+import pandas as pd
 from primrose.configuration.configuration import Configuration
 from primrose.readers.csv_reader import CsvReader
 from primrose.data_object import DataObject, DataObjectResponseType
@@ -62,3 +64,78 @@ def test_kwargs():
     df = data_object.get("csv_reader", rtype=DataObjectResponseType.VALUE.value)
     assert df is not None
     assert df.shape == (3, 1)
+
+
+def _read(node_config):
+    node_config = dict({"class": "CsvReader", "destinations": []}, **node_config)
+    config = {"implementation_config": {"reader_config": {"csv_reader": node_config}}}
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+    data_object, terminate = CsvReader(configuration, "csv_reader").run(DataObject(configuration))
+    return data_object.get("csv_reader", rtype=DataObjectResponseType.VALUE.value), terminate
+
+
+def test_read_glob(tmpdir):
+    for i in range(5):
+        tmpdir.join("shard_%s.csv" % i).write("a,b\n%s,x%s\n%s,y%s\n" % (2 * i, i, 2 * i + 1, i))
+    tmpdir.join("other.csv").write("a,b\n100,z\n")
+
+    df, terminate = _read({"filename": str(tmpdir.join("shard_*.csv")), "max_workers": 3})
+    assert not terminate
+    assert list(df["a"]) == list(range(10))
+    assert list(df.index) == list(range(10))
+
+    # lists of names and globs, and streaming
+    filename = [str(tmpdir.join("other.csv")), str(tmpdir.join("shard_[01].csv"))]
+    df, _ = _read({"filename": filename})
+    assert list(df["a"]) == [100, 0, 1, 2, 3]
+
+    chunked, _ = _read({"filename": filename, "chunksize": 10})
+    assert [len(chunk) for chunk in chunked] == [1, 2, 2]
+
+    with pytest.raises(Exception) as e:
+        _read({"filename": str(tmpdir.join("missing_*.csv"))})
+    assert "No files match" in str(e)
+
+
+def test_read_dtypes_file(tmpdir):
+    tmpdir.join("shard_0.csv").write("a,b,c\n1,x,0.5\n2,y,1.5\n")
+    tmpdir.join("shard_1.csv").write("a,b,c\n,x,2.5\n4,z,3.5\n")
+    dtypes_file = str(tmpdir.join("dtypes.json"))
+
+    node_config = {
+        "filename": str(tmpdir.join("shard_*.csv")),
+        "dtypes_file": dtypes_file,
+        "kwargs": {"dtype": {"b": "category"}},
+    }
+    df, _ = _read(node_config)
+    assert [str(dtype) for dtype in df.dtypes] == ["Int64", "category", "float64"]
+    assert df["a"].isna().sum() == 1
+
+    with open(dtypes_file) as f:
+        assert json.load(f) == {"a": "Int64", "b": "category", "c": "float64"}
+
+    # the saved dtypes are used from then on
+    with open(dtypes_file, "w") as f:
+        json.dump({"a": "float32"}, f)
+    df, _ = _read(node_config)
+    assert [str(dtype) for dtype in df.dtypes] == ["float32", "category", "float64"]
+
+
+def test_read_dtypes_file_sample(tmpdir, monkeypatch):
+    tmpdir.join("shard_0.csv").write("a,b\n" + "".join("%s,x\n" % i for i in range(100)))
+    dtypes_file = str(tmpdir.join("dtypes.json"))
+
+    calls = []
+    read_csv = pd.read_csv
+
+    def spy(filename, **kwargs):
+        calls.append(kwargs.get("nrows"))
+        return read_csv(filename, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", spy)
+
+    df, _ = _read({"filename": str(tmpdir.join("shard_0.csv")), "dtypes_file": dtypes_file, "dtypes_sample_rows": 5})
+    # the dtypes are inferred from 5 rows, then the whole file is read once
+    assert calls == [5, None]
+    assert len(df) == 100
+    assert [str(dtype) for dtype in df.dtypes] == ["Int64", "object"]
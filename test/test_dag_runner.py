@@ -1,8 +1,11 @@
 import os
+import multiprocessing
 import unittest
 import unittest.mock as mock
 
 import pytest
+import pandas as pd
+import numpy as np
 
 from primrose.configuration.configuration import Configuration
 from primrose.readers.csv_reader import CsvReader
@@ -16,7 +19,10 @@ from primrose.data_object import DataObjectResponseType
 from primrose.dag.dag_traverser import DagTraverser
 from primrose.dag.traverser_factory import TraverserFactory
 from abc import abstractmethod
+from primrose.base.reader import AbstractReader
 from primrose.base.writer import AbstractWriter
+from primrose.base.node import AbstractNode
+from primrose.configuration.configuration import ConfigurationError
 
 
 def test_run():
@@ -766,3 +772,680 @@ def test_run_pruned():
         ("root", "INFO", "left node!"),
         ("root", "INFO", "All done. Bye bye!"),
     )
+
+
+def test_executor_config():
+    config = {
+        "metadata": {"executor": {"pool": "thread", "max_workers": 3}},
+        "implementation_config": {
+            "reader_config": {
+                "csv_reader": {
+                    "class": "CsvReader",
+                    "filename": "test/minimal.csv",
+                    "destinations": [],
+                }
+            }
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    assert DagRunner(configuration).executor_config() == ("thread", 3)
+
+    config["metadata"] = {}
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    assert DagRunner(configuration).executor_config() == ("sequential", None)
+
+
+def test_executor_config_bad():
+    config = {
+        "metadata": {"executor": {"pool": "junk"}},
+        "implementation_config": {
+            "reader_config": {
+                "csv_reader": {
+                    "class": "CsvReader",
+                    "filename": "test/minimal.csv",
+                    "destinations": [],
+                }
+            }
+        },
+    }
+    with pytest.raises(Exception) as e:
+        Configuration(None, is_dict_config=True, dict_config=config)
+    assert "Unsupported metadata.executor.pool: junk" in str(e)
+
+
+def test_run_thread_pool_concurrent():
+    import threading
+
+    barrier = threading.Barrier(2, timeout=10)
+
+    class BarrierReader(AbstractNode):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            # only passes if both readers are running at the same time
+            barrier.wait()
+            data_object.add(self, self.instance_name)
+            return data_object, False
+
+    class CollectingWriter(AbstractWriter):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            upstream = data_object.get_upstream_data(self.instance_name)
+            data_object.add(self, sorted(upstream.keys()))
+            return data_object, False
+
+    NodeFactory().register("BarrierReader", BarrierReader)
+    NodeFactory().register("CollectingWriter", CollectingWriter)
+
+    config = {
+        "metadata": {"executor": {"pool": "thread", "max_workers": 2}},
+        "implementation_config": {
+            "reader_config": {
+                "reader1": {"class": "BarrierReader", "destinations": ["writer"]},
+                "reader2": {"class": "BarrierReader", "destinations": ["writer"]},
+            },
+            "writer_config": {"writer": {"class": "CollectingWriter"}},
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    data_object = DagRunner(configuration).run()
+
+    assert data_object.get("writer", rtype=DataObjectResponseType.VALUE.value) == ["reader1", "reader2"]
+
+
+def _chain_config(metadata=None):
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "read_data": {
+                    "class": "SklearnDatasetReader",
+                    "dataset": "iris",
+                    "destinations": ["train_test_split"],
+                }
+            },
+            "pipeline_config": {
+                "train_test_split": {
+                    "class": "TrainTestSplit",
+                    "features": ["sepal length (cm)", "petal length (cm)", "petal width (cm)"],
+                    "target_variable": "sepal width (cm)",
+                    "training_fraction": 0.65,
+                    "is_training": True,
+                    "seed": 42,
+                    "destinations": ["regression_model"],
+                }
+            },
+            "model_config": {
+                "regression_model": {
+                    "class": "SklearnRegressionModel",
+                    "mode": "train",
+                    "model": {"class": "linear_model.LinearRegression"},
+                    "destinations": [],
+                }
+            },
+        },
+    }
+    if metadata:
+        config["metadata"] = metadata
+    return Configuration(None, is_dict_config=True, dict_config=config)
+
+
+def test_run_process_pool():
+    configuration = _chain_config({"executor": {"pool": "process", "max_workers": 2}})
+    data_object = DagRunner(configuration).run()
+
+    scores = data_object.get("regression_model")["scores"]
+    assert abs(scores["Explained variance"] - 0.531103247696713) < 0.00001
+
+
+def test_run_process_pool_shared_memory():
+    # dataframes are only shared in memory with pyarrow
+    pytest.importorskip("pyarrow")
+
+    metadata = {
+        "executor": {"pool": "process", "max_workers": 2},
+        "data_object": {"storage": "shared_memory"},
+    }
+    data_object = DagRunner(_chain_config(metadata)).run()
+
+    scores = data_object.get("regression_model")["scores"]
+    assert abs(scores["Explained variance"] - 0.531103247696713) < 0.00001
+
+    shared_memory = data_object.shared_memory
+    assert shared_memory.n_shared > 0
+    assert shared_memory.handles == {}
+
+
+class ArrayReader(AbstractNode):
+    """adds a numpy array, for nodes running in worker processes"""
+
+    @staticmethod
+    def necessary_config(node_config):
+        return set([])
+
+    def run(self, data_object):
+        data_object.add(self, np.arange(1000, dtype=np.float64))
+        return data_object, False
+
+
+class ArraySum(AbstractNode):
+    """adds the sum of its upstream array, for nodes running in worker processes"""
+
+    @staticmethod
+    def necessary_config(node_config):
+        return set([])
+
+    def run(self, data_object):
+        array = data_object.get_upstream_data(self.instance_name, rtype=DataObjectResponseType.VALUE.value)
+        data_object.add(self, float(array.sum()))
+        return data_object, False
+
+
+def test_run_process_pool_shared_memory_arrays():
+    # numpy arrays are shared in memory with or without pyarrow
+    NodeFactory().register("ArrayReader", ArrayReader)
+    NodeFactory().register("ArraySum", ArraySum)
+
+    config = {
+        "metadata": {
+            "executor": {"pool": "process", "max_workers": 2},
+            "data_object": {"storage": "shared_memory"},
+        },
+        "implementation_config": {
+            "reader_config": {"array": {"class": "ArrayReader", "destinations": ["sum"]}},
+            "pipeline_config": {"sum": {"class": "ArraySum"}},
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    data_object = DagRunner(configuration).run()
+
+    assert data_object.get("sum", rtype=DataObjectResponseType.VALUE.value) == 499500.0
+    shared_memory = data_object.shared_memory
+    assert shared_memory.n_shared > 0
+    assert shared_memory.handles == {}
+
+
+def test_run_thread_pool_pruned():
+    config = {
+        "metadata": {"executor": {"pool": "thread"}},
+        "implementation_config": {
+            "reader_config": {
+                "read_data": {
+                    "class": "CsvReader",
+                    "filename": "data/tennis.csv",
+                    "destinations": ["conditional_node"],
+                },
+                "conditional_node": {
+                    "class": "SimpleSwitch",
+                    "path_to_travel": "left",
+                    "destinations": ["left", "right"],
+                },
+            },
+            "writer_config": {
+                "left": {"class": "LoggingSuccess", "msg": "left node!", "level": "INFO"},
+                "right": {
+                    "class": "LoggingSuccess",
+                    "msg": "right node!",
+                    "level": "INFO",
+                    "destinations": ["right2"],
+                },
+                "right2": {"class": "LoggingSuccess", "msg": "right node2!", "level": "INFO"},
+            },
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    runner = DagRunner(configuration)
+    with LogCapture() as l:
+        runner.run()
+    messages = [r.getMessage() for r in l.records]
+    assert "Skipping pruned node right" in messages
+    assert "Skipping pruned node right2" in messages
+    assert "left node!" in messages
+    assert "right node!" not in messages
+
+
+def test_run_thread_pool_terminate():
+    class TerminatingReader(AbstractNode):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            return data_object, True
+
+    NodeFactory().register("TerminatingReader", TerminatingReader)
+
+    config = {
+        "metadata": {"executor": {"pool": "thread"}},
+        "implementation_config": {
+            "reader_config": {
+                "csv_reader": {"class": "TerminatingReader", "destinations": ["csv_writer"]},
+            },
+            "writer_config": {"csv_writer": {"class": "TestWriterTmp2"}},
+        },
+    }
+
+    class TestWriterTmp2(AbstractWriter):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            raise Exception("should not have run")
+
+    NodeFactory().register("TestWriterTmp2", TestWriterTmp2)
+
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    with LogCapture() as l:
+        DagRunner(configuration).run()
+    messages = [r.getMessage() for r in l.records]
+    assert "Terminating early due to signal from csv_reader" in messages
+    assert "received node csv_writer of type writer_config and class TestWriterTmp2" not in messages
+
+
+def test_run_thread_pool_error():
+    class FailingWriter(AbstractWriter):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            raise Exception("Deliberate error")
+
+    NodeFactory().register("FailingWriter", FailingWriter)
+
+    config = {
+        "metadata": {"executor": {"pool": "thread"}},
+        "implementation_config": {
+            "writer_config": {"mywriter": {"class": "FailingWriter", "destinations": []}}
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+
+    with pytest.raises(Exception) as e:
+        DagRunner(configuration).run()
+    assert "Deliberate error" in str(e)
+
+
+def test_consumers_in_sequence():
+    configuration = _chain_config()
+    runner = DagRunner(configuration)
+    consumers = runner.consumers_in_sequence(["train_test_split", "regression_model"])
+    assert consumers == {
+        "read_data": {"train_test_split"},
+        "train_test_split": {"regression_model"},
+    }
+
+
+def test_run_keeps_data_by_default():
+    data_object = DagRunner(_chain_config()).run()
+    assert set(data_object.data_dict.keys()) == {"read_data", "train_test_split", "regression_model"}
+
+
+def test_run_releases_consumed_data():
+    metadata = {"data_object": {"release_after_last_consumer": True}}
+    data_object = DagRunner(_chain_config(metadata)).run()
+    assert set(data_object.data_dict.keys()) == {"regression_model"}
+
+
+def test_run_releases_consumed_data_pinned():
+    metadata = {"data_object": {"release_after_last_consumer": True, "pin": ["train_test_split"]}}
+    data_object = DagRunner(_chain_config(metadata)).run()
+    assert set(data_object.data_dict.keys()) == {"train_test_split", "regression_model"}
+
+
+def test_run_releases_consumed_data_write_to_cache(tmpdir):
+    filename = os.path.join(str(tmpdir), "data_object.dill")
+    metadata = {
+        "data_object": {"release_after_last_consumer": True, "write_to_cache": True, "write_filename": filename}
+    }
+    DagRunner(_chain_config(metadata)).run()
+
+    data_object = DataObject.read_from_cache(filename)
+    assert set(data_object.data_dict.keys()) == {"read_data", "train_test_split", "regression_model"}
+
+
+def test_run_node_cache(tmpdir):
+    runs = []
+
+    class CountingReader(AbstractNode):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            runs.append(self.instance_name)
+            data_object.add(self, self.node_config.get("value", 1))
+            return data_object, False
+
+    class CollectingWriter(AbstractWriter):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            upstream = data_object.get_upstream_data(self.instance_name)
+            data_object.add(self, sorted(upstream.keys()))
+            return data_object, False
+
+    NodeFactory().register("CountingReader", CountingReader)
+    NodeFactory().register("CollectingWriter", CollectingWriter)
+
+    def run_config(value):
+        config = {
+            "metadata": {"node_cache": {"dir": str(tmpdir)}},
+            "implementation_config": {
+                "reader_config": {
+                    "reader1": {"class": "CountingReader", "value": value, "destinations": ["writer"]},
+                    "reader2": {"class": "CountingReader", "destinations": ["writer"]},
+                },
+                "writer_config": {"writer": {"class": "CollectingWriter"}},
+            },
+        }
+        configuration = Configuration(None, is_dict_config=True, dict_config=config)
+        return DagRunner(configuration).run()
+
+    run_config(1)
+    assert sorted(runs) == ["reader1", "reader2"]
+
+    # unchanged inputs: both readers are loaded from the cache
+    runs.clear()
+    data_object = run_config(1)
+    assert runs == []
+    assert data_object.get("writer", rtype=DataObjectResponseType.VALUE.value) == ["reader1", "reader2"]
+
+    # reader1's configuration changed: only it reruns, and its stale cache file is replaced
+    runs.clear()
+    run_config(2)
+    assert runs == ["reader1"]
+    assert len(os.listdir(os.path.join(str(tmpdir), "reader1"))) == 1
+    assert not os.path.exists(os.path.join(str(tmpdir), "writer"))
+
+
+def test_run_node_cache_readers(tmpdir):
+    runs = []
+
+    class CountingPipeline(AbstractNode):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            runs.append(self.instance_name)
+            data_object.add(self, sorted(data_object.get_upstream_data(self.instance_name).keys()))
+            return data_object, False
+
+    class QueryReader(AbstractReader):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            runs.append(self.instance_name)
+            data_object.add(self, 42)
+            return data_object, False
+
+    NodeFactory().register("CountingPipeline", CountingPipeline)
+    NodeFactory().register("QueryReader", QueryReader)
+
+    filename = os.path.join(str(tmpdir), "data.csv")
+    pd.DataFrame({"a": [1, 2]}).to_csv(filename, index=False)
+
+    def run_config(query_node_cache=None):
+        query_config = {"class": "QueryReader", "destinations": ["query_pipeline"]}
+        if query_node_cache is not None:
+            query_config["node_cache"] = query_node_cache
+        config = {
+            "metadata": {"node_cache": {"dir": os.path.join(str(tmpdir), "nodes")}},
+            "implementation_config": {
+                "reader_config": {
+                    "csv": {
+                        "class": "CsvReader",
+                        "filename": filename,
+                        "destinations": ["csv_pipeline", "query_pipeline"],
+                    },
+                    "query": query_config,
+                },
+                "pipeline_config": {
+                    "csv_pipeline": {"class": "CountingPipeline"},
+                    "query_pipeline": {"class": "CountingPipeline"},
+                },
+            },
+        }
+        configuration = Configuration(None, is_dict_config=True, dict_config=config)
+        return DagRunner(configuration).run()
+
+    run_config()
+    assert sorted(runs) == ["csv_pipeline", "query", "query_pipeline"]
+
+    # the CSV file is unchanged, but the query reader, and so what is downstream of it, always run
+    runs.clear()
+    run_config()
+    assert sorted(runs) == ["query", "query_pipeline"]
+
+    # the CSV file changed: its reader and pipeline rerun
+    runs.clear()
+    pd.DataFrame({"a": [1, 2, 3]}).to_csv(filename, index=False)
+    run_config()
+    assert sorted(runs) == ["csv_pipeline", "query", "query_pipeline"]
+
+    # the query reader opted in
+    run_config(query_node_cache=True)
+    runs.clear()
+    run_config(query_node_cache=True)
+    assert runs == []
+
+
+def test_node_cache_config_bad():
+    config = {
+        "metadata": {"node_cache": {}},
+        "implementation_config": {"reader_config": {"read_data": {"class": "SklearnDatasetReader", "dataset": "iris"}}},
+    }
+    with pytest.raises(ConfigurationError) as e:
+        Configuration(None, is_dict_config=True, dict_config=config)
+    assert "metadata.node_cache: you must set 'dir'" in str(e)
+
+
+def test_run_resume(tmpdir):
+    runs = []
+    failures = [True]
+
+    class CountingReader(AbstractNode):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            runs.append(self.instance_name)
+            data_object.add(self, 42)
+            return data_object, False
+
+    class FailingOnceNode(AbstractNode):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            runs.append(self.instance_name)
+            if failures:
+                failures.pop()
+                raise Exception("transient failure")
+            value = data_object.get("reader", rtype=DataObjectResponseType.VALUE.value)
+            data_object.add(self, value + 1)
+            return data_object, False
+
+    NodeFactory().register("CountingReader", CountingReader)
+    NodeFactory().register("FailingOnceNode", FailingOnceNode)
+
+    config = {
+        "metadata": {"checkpoint": {"dir": str(tmpdir)}},
+        "implementation_config": {
+            "reader_config": {"reader": {"class": "CountingReader", "destinations": ["pipeline"]}},
+            "pipeline_config": {"pipeline": {"class": "FailingOnceNode"}},
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+
+    with pytest.raises(Exception) as e:
+        DagRunner(configuration).run()
+    assert "transient failure" in str(e)
+    assert runs == ["reader", "pipeline"]
+
+    run_id = os.listdir(str(tmpdir))[0]
+
+    runs.clear()
+    data_object = DagRunner(configuration).run(resume=run_id)
+    assert runs == ["pipeline"]
+    assert data_object.get("pipeline", rtype=DataObjectResponseType.VALUE.value) == 43
+
+    # the run has completed: its checkpoint is removed
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_run_resume_without_checkpoint():
+    config = {
+        "implementation_config": {
+            "reader_config": {"read_data": {"class": "SklearnDatasetReader", "dataset": "iris"}},
+        }
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    with pytest.raises(Exception) as e:
+        DagRunner(configuration).run(resume="some_run")
+    assert "To resume run some_run, metadata.checkpoint.dir must be set" in str(e)
+
+
+def test_cache_data_object_directory(tmpdir):
+    dirname = str(tmpdir.join("data_object"))
+    config = {
+        "metadata": {"data_object": {"write_to_cache": True, "write_filename": dirname, "cache_format": "directory"}},
+        "implementation_config": {
+            "reader_config": {
+                "csv_reader": {"class": "CsvReader", "filename": "test/minimal.csv", "destinations": []}
+            }
+        },
+    }
+    data_object = DagRunner(Configuration(None, is_dict_config=True, dict_config=config)).run()
+    assert os.path.exists(os.path.join(dirname, "manifest.json"))
+
+    config["metadata"]["data_object"] = {"read_from_cache": True, "read_filename": dirname}
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    restored = DagRunner(configuration).create_data_object()
+    assert restored.config is configuration
+    pd.testing.assert_frame_equal(restored.get("csv_reader")["data"], data_object.get("csv_reader")["data"])
+
+    config["metadata"]["data_object"] = {"cache_format": "zip"}
+    with pytest.raises(ConfigurationError) as e:
+        Configuration(None, is_dict_config=True, dict_config=config)
+    assert "Unsupported metadata.data_object.cache_format: zip" in str(e)
+
+
+class SpawnReader(AbstractNode):
+    """a user-registered node, importable by worker processes"""
+
+    @staticmethod
+    def necessary_config(node_config):
+        return set([])
+
+    def run(self, data_object):
+        data_object.add(self, os.getpid())
+        return data_object, False
+
+
+@pytest.fixture()
+def spawn_start_method():
+    """start worker processes with spawn, restoring the start method afterwards"""
+    start_method = multiprocessing.get_start_method(allow_none=True)
+    multiprocessing.set_start_method("spawn", force=True)
+    yield
+    multiprocessing.set_start_method(start_method, force=True)
+
+
+def test_run_process_pool_spawn(spawn_start_method):
+    NodeFactory().register("MyReader", SpawnReader)
+
+    config = {
+        "metadata": {
+            "executor": {"pool": "process", "max_workers": 2},
+            "data_object": {"release_after_last_consumer": True},
+        },
+        "implementation_config": {
+            "reader_config": {
+                "reader1": {"class": "MyReader", "destinations": ["reader2"]},
+                "reader2": {"class": "MyReader", "destinations": []},
+            }
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    data_object = DagRunner(configuration).run()
+
+    # reader1's data is released once reader2 has run
+    assert set(data_object.data_dict.keys()) == {"reader2"}
+    assert data_object.get("reader2", rtype=DataObjectResponseType.VALUE.value) != os.getpid()
+
+
+def test_run_deferred_not_waited_for_by_caches(tmpdir):
+    import threading
+    from concurrent.futures import wait
+    from primrose.deferred import submit
+
+    event = threading.Event()
+    values = []
+
+    class DeferredReader(AbstractNode):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            # only ready once the next node has run: waiting for it here would time out
+            data_object.add(self, submit(lambda: event.wait(5)))
+            return data_object, False
+
+    class EventSetter(AbstractNode):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            event.set()
+            data_object.add(self, True)
+            return data_object, False
+
+    class Consumer(AbstractNode):
+        @staticmethod
+        def necessary_config(node_config):
+            return set([])
+
+        def run(self, data_object):
+            values.append(data_object.get("deferred", rtype=DataObjectResponseType.VALUE.value))
+            return data_object, False
+
+    NodeFactory().register("DeferredReader", DeferredReader)
+    NodeFactory().register("EventSetter", EventSetter)
+    NodeFactory().register("Consumer", Consumer)
+
+    node_cache_dir = os.path.join(str(tmpdir), "nodes")
+    config = {
+        "metadata": {
+            "node_cache": {"dir": node_cache_dir},
+            "checkpoint": {"dir": os.path.join(str(tmpdir), "checkpoints")},
+        },
+        "implementation_config": {
+            "reader_config": {"deferred": {"class": "DeferredReader", "destinations": ["events", "consumer"]}},
+            "pipeline_config": {"events": {"class": "EventSetter", "destinations": ["consumer"]}},
+            "model_config": {"consumer": {"class": "Consumer"}},
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    runner = DagRunner(configuration)
+    runner.run()
+    assert values == [True]
+
+    # the deferred data is cached once it is known, from the thread that computed it
+    assert len(runner.pending_writes) == 2
+    assert not wait(runner.pending_writes, timeout=10).not_done
+    assert len(os.listdir(os.path.join(node_cache_dir, "deferred"))) == 1
@@ -0,0 +1,162 @@
+import json
+import socket
+import threading
+import http.client
+import pytest
+import pandas as pd
+from primrose.base.reader import AbstractReader
+from primrose.base.pipeline import AbstractPipeline
+from primrose.configuration.configuration import Configuration
+from primrose.configuration.util import ConfigurationError
+from primrose.dag_server import DagServer, make_server
+from primrose.data_object import DataObjectResponseType
+from primrose.node_factory import NodeFactory
+
+
+class FactorReader(AbstractReader):
+    """stands in for a reader that loads a model: counts how many times it is run"""
+
+    loads = 0
+
+    @staticmethod
+    def necessary_config(node_config):
+        return set()
+
+    def run(self, data_object):
+        FactorReader.loads += 1
+        data_object.add(self, 10, key="factor")
+        return data_object, False
+
+
+class Scorer(AbstractPipeline):
+    @staticmethod
+    def necessary_config(node_config):
+        return set()
+
+    def transform(self, data):
+        pass
+
+    def run(self, data_object):
+        data = data_object.get_upstream_data(self.instance_name)
+        df = data["scoring_data"]["data"]
+        data_object.add(self, df * data["factor_reader"]["factor"], key="scores")
+        return data_object, False
+
+
+def config():
+    return {
+        "metadata": {"serve": {"input_node": "scoring_data", "output_node": "scorer"}},
+        "implementation_config": {
+            "reader_config": {
+                "factor_reader": {"class": "FactorReader", "destinations": ["scorer"]},
+                "scoring_data": {"class": "CsvReader", "filename": "does_not_exist.csv", "destinations": ["scorer"]},
+            },
+            "pipeline_config": {"scorer": {"class": "Scorer", "destinations": ["csv_writer"]}},
+            "writer_config": {
+                "csv_writer": {
+                    "class": "CsvWriter",
+                    "key": "scores",
+                    "dir": "does_not_exist",
+                    "filename": "scores.csv",
+                }
+            },
+        },
+    }
+
+
+@pytest.fixture()
+def dag_server():
+    NodeFactory().register("FactorReader", FactorReader)
+    NodeFactory().register("Scorer", Scorer)
+    FactorReader.loads = 0
+    configuration = Configuration(None, is_dict_config=True, dict_config=config())
+    return DagServer(configuration)
+
+
+def test_score(dag_server):
+    assert dag_server.request_sequence == ["scorer"]
+    assert FactorReader.loads == 1
+
+    for i in range(3):
+        scores = dag_server.score(pd.DataFrame({"x": [1, i]}))
+        assert scores["x"].tolist() == [10, 10 * i]
+
+    # the reader ran once, the writer never
+    assert FactorReader.loads == 1
+    assert "scorer" not in dag_server.data_object.data_dict
+    assert dag_server.data_object.get("factor_reader", rtype=DataObjectResponseType.VALUE.value) == 10
+
+
+def test_score_no_request_storage(monkeypatch):
+    import primrose.data_object_cache
+
+    NodeFactory().register("FactorReader", FactorReader)
+    NodeFactory().register("Scorer", Scorer)
+    server_config = config()
+    server_config["metadata"]["data_object"] = {"memory_budget_mb": 100}
+    dag_server = DagServer(Configuration(None, is_dict_config=True, dict_config=server_config))
+
+    spill_stores = []
+    original = primrose.data_object_cache.SpillStore.__init__
+
+    def init(self, *args, **kwargs):
+        spill_stores.append(self)
+        original(self, *args, **kwargs)
+
+    monkeypatch.setattr(primrose.data_object_cache.SpillStore, "__init__", init)
+
+    scores = dag_server.score(pd.DataFrame({"x": [1, 2]}))
+    assert scores["x"].tolist() == [10, 20]
+    # requests do not set up spill directories of their own
+    assert spill_stores == []
+
+
+def _post(connection, body):
+    connection.request("POST", "/score", body=body, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_http(dag_server):
+    server = make_server(dag_server, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        assert _post(connection, json.dumps([{"x": 1}, {"x": 2}])) == (200, [{"x": 10}, {"x": 20}])
+        assert _post(connection, json.dumps({"x": [3]})) == (200, [{"x": 30}])
+        assert _post(connection, "not json")[0] == 400
+
+        connection.request("GET", "/health")
+        assert connection.getresponse().status == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unix_socket(dag_server, tmpdir):
+    socket_path = str(tmpdir.join("primrose.sock"))
+    server = make_server(dag_server, socket_path=socket_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = http.client.HTTPConnection("localhost")
+        connection.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.sock.connect(socket_path)
+        assert _post(connection, json.dumps([{"x": 4}])) == (200, [{"x": 40}])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_serve_config_bad():
+    NodeFactory().register("FactorReader", FactorReader)
+    NodeFactory().register("Scorer", Scorer)
+    bad = config()
+    del bad["metadata"]["serve"]["output_node"]
+    with pytest.raises(ConfigurationError, match="metadata.serve: you must set"):
+        Configuration(None, is_dict_config=True, dict_config=bad)
+
+    bad = config()
+    bad["metadata"]["serve"]["output_node"] = "factor_reader"
+    configuration = Configuration(None, is_dict_config=True, dict_config=bad)
+    with pytest.raises(Exception, match="factor_reader is not downstream of scoring_data"):
+        DagServer(configuration)
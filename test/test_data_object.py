@@ -1,10 +1,16 @@
 import pytest
 import sys
 import os
+import json
+import dill
+import numpy as np
+import pandas as pd
 from primrose.data_object import DataObject
-from primrose.data_object import DataObjectResponseType
+from primrose.data_object import DataObjectResponseType, DataObjectCacheFormat
+from primrose.data_object_cache import _CachedEntry
+from primrose.deferred import Lazy, submit, when_resolved
 from primrose.configuration.configuration import Configuration
-from primrose.configuration.util import OperationType
+from primrose.configuration.util import OperationType, ConfigurationError
 from primrose.readers.csv_reader import CsvReader
 
 
@@ -369,3 +375,197 @@ def test_get_filtered_multiple_upstream_data():
 
     data = data_object.get_filtered_upstream_data("recipe_s3_writer", "JUNK")
     assert not data
+
+
+def test_release(setup_vars):
+    configuration, data_object = setup_vars
+    reader = CsvReader(configuration, "csv_reader")
+    data_object.add(reader, "TESTING")
+
+    assert data_object.release("csv_reader")
+    assert "csv_reader" not in data_object.data_dict
+    assert not data_object.release("csv_reader")
+
+
+def test_deferred(setup_vars):
+    configuration, data_object = setup_vars
+    reader = CsvReader(configuration, "csv_reader")
+
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "computed"
+
+    data_object.add(reader, Lazy(compute))
+    data_object.add(reader, submit(lambda: "downloaded"), key="future")
+    assert calls == []
+
+    assert data_object.get("csv_reader") == {"data": "computed", "future": "downloaded"}
+    assert data_object.get("csv_reader", rtype=DataObjectResponseType.VALUE.value) == data_object.get("csv_reader")
+    assert calls == [1]
+
+    def fail():
+        raise ValueError("could not download")
+
+    data_object.add(reader, submit(fail), key="failed")
+    with pytest.raises(ValueError, match="could not download"):
+        data_object.get("csv_reader", pop_data=True)
+
+
+def test_deferred_pickled(setup_vars):
+    configuration, data_object = setup_vars
+    reader = CsvReader(configuration, "csv_reader")
+    data_object.add(reader, submit(lambda: "downloaded"))
+
+    copy = dill.loads(dill.dumps(data_object))
+    assert copy.data_dict["csv_reader"]["data"] == "downloaded"
+
+
+def test_when_resolved():
+    import threading
+
+    results = []
+    event = threading.Event()
+    thunk = Lazy(lambda: "computed")
+    entries = {"future": submit(lambda: event.wait(5) and "downloaded"), "thunk": thunk, "data": 1}
+
+    resolved = when_resolved(entries, results.append)
+    assert results == []
+
+    event.set()
+    entries["future"].result()
+    assert results == []
+    assert not resolved.done()
+
+    thunk.result()
+    resolved.result(timeout=5)
+    assert results == [{"future": "downloaded", "thunk": "computed", "data": 1}]
+
+    assert when_resolved({"data": 1}, results.append).done()
+    assert results[-1] == {"data": 1}
+
+    def fail():
+        raise ValueError("could not download")
+
+    failed = submit(fail)
+    resolved = when_resolved({"failed": failed}, results.append)
+    with pytest.raises(ValueError):
+        resolved.result(timeout=5)
+    assert len(results) == 2
+
+
+def test_caching_directory(tmpdir, monkeypatch):
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "csv_reader": {
+                    "class": "CsvReader",
+                    "filename": "test/minimal.csv",
+                    "destinations": [],
+                }
+            }
+        }
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    data_object = DataObject(configuration)
+
+    reader = CsvReader(configuration, "csv_reader")
+    df = pd.DataFrame({"a": [1, 2], "b": pd.Categorical(["x", "y"])}, index=[3, 4])
+    data_object.add(reader, df)
+    data_object.add(reader, np.arange(6).reshape(2, 3), key="array")
+    data_object.add(reader, {"some": "object"}, key="other")
+
+    dirname = str(tmpdir.join("cache"))
+    data_object.write_to_cache(dirname, cache_format=DataObjectCacheFormat.DIRECTORY.value)
+
+    with open(os.path.join(dirname, "manifest.json")) as f:
+        manifest = json.load(f)
+    formats = {key: entry["format"] for key, entry in manifest["csv_reader"].items()}
+    assert formats["array"] == "npy"
+    assert formats["other"] == "dill"
+
+    loaded = []
+    original = _CachedEntry.load
+
+    def load(self):
+        loaded.append(os.path.basename(self.filename))
+        return original(self)
+
+    monkeypatch.setattr(_CachedEntry, "load", load)
+
+    restored_data_object = DataObject.read_from_cache(dirname, configuration)
+    assert restored_data_object.config is configuration
+    assert restored_data_object.upstream_keys("csv_reader") is not None
+    assert loaded == []
+
+    # data is loaded on first use only
+    array = restored_data_object.get("csv_reader")["array"]
+    assert isinstance(array.base, np.memmap)
+    assert array.tolist() == [[0, 1, 2], [3, 4, 5]]
+    restored_data_object.get("csv_reader")["array"]
+    assert loaded == ["1.npy"]
+
+    entries = dict(restored_data_object.get("csv_reader"))
+    pd.testing.assert_frame_equal(entries["data"], df)
+    assert entries["other"] == {"some": "object"}
+    assert len(loaded) == 3
+
+    # rewriting replaces the directory
+    restored_data_object.write_to_cache(dirname, cache_format=DataObjectCacheFormat.DIRECTORY.value)
+    restored_data_object = DataObject.read_from_cache(dirname, configuration)
+    assert restored_data_object.get("csv_reader")["other"] == {"some": "object"}
+
+
+def test_memory_budget(tmpdir):
+    config = {
+        "metadata": {"data_object": {"memory_budget_mb": 0.02, "spill_dir": str(tmpdir)}},
+        "implementation_config": {
+            "reader_config": {
+                "reader_a": {"class": "CsvReader", "filename": "test/minimal.csv", "destinations": ["reader_b"]},
+                "reader_b": {"class": "CsvReader", "filename": "test/minimal.csv", "destinations": ["reader_c"]},
+                "reader_c": {"class": "CsvReader", "filename": "test/minimal.csv", "destinations": []},
+            }
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    data_object = DataObject(configuration)
+    budget = data_object.spill.budget_bytes
+
+    # each dataframe takes a little over a third of the budget
+    df = pd.DataFrame({"a": np.arange(budget // 3 // 8 + 10, dtype="int64")})
+    for name in ["reader_a", "reader_b"]:
+        data_object.add(CsvReader(configuration, name), df.copy())
+    assert data_object.spill.n_spilled == 0
+
+    data_object.get("reader_a")
+    data_object.add(CsvReader(configuration, "reader_c"), df.copy())
+
+    # reader_b was the least recently used
+    assert data_object.spill.n_spilled == 1
+    assert not data_object.data_dict["reader_b"].is_loaded("data")
+    assert data_object.data_dict["reader_a"].is_loaded("data")
+    assert len(os.listdir(str(tmpdir))) == 1
+    assert data_object.spill.total <= budget
+
+    # and is loaded back, transparently, spilling reader_a in turn
+    pd.testing.assert_frame_equal(data_object.get("reader_b", rtype=DataObjectResponseType.VALUE.value), df)
+    assert data_object.data_dict["reader_b"].is_loaded("data")
+    assert not data_object.data_dict["reader_a"].is_loaded("data")
+    assert data_object.spill.n_spilled == 2
+
+    # releasing data deletes its spilled file
+    data_object.release("reader_a")
+    assert len(os.listdir(str(tmpdir))) == 1
+
+
+def test_memory_budget_config_bad():
+    config = {
+        "metadata": {"data_object": {"memory_budget_mb": "lots"}},
+        "implementation_config": {
+            "reader_config": {"reader_a": {"class": "CsvReader", "filename": "test/minimal.csv", "destinations": []}}
+        },
+    }
+    with pytest.raises(ConfigurationError) as e:
+        Configuration(None, is_dict_config=True, dict_config=config)
+    assert "metadata.data_object.memory_budget_mb must be a positive number" in str(e)
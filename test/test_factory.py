@@ -1,5 +1,7 @@
+import sys
+import subprocess
 import pytest
-from primrose.node_factory import NodeFactory
+from primrose.node_factory import NodeFactory, LazyClassDict
 from primrose.writers.abstract_file_writer import AbstractFileWriter
 from primrose.configuration.configuration import Configuration
 from primrose.readers.csv_reader import CsvReader
@@ -87,3 +89,45 @@ def test_valid_configuration():
     with pytest.raises(Exception) as e:
         f.valid_configuration(TestWriter, missing_config)
     assert "Configuration missing necessary keys for" in str(e)
+
+
+def test_lazy_registry():
+    factory = NodeFactory()
+    assert isinstance(factory.name_dict, LazyClassDict)
+    assert "CsvWriter" in factory.name_dict
+
+    class_obj = factory.name_dict["CsvWriter"]
+    assert class_obj.__name__ == "CsvWriter"
+    # resolved once, then stored
+    assert dict.__getitem__(factory.name_dict, "CsvWriter") is class_obj
+    assert factory.name_dict.get("DoesNotExist") is None
+
+
+def test_lazy_class_dict_copies():
+    name_dict = LazyClassDict({"CsvWriter": "primrose.writers.csv_writer:CsvWriter"})
+    for copied in [dict(name_dict), {**name_dict}, name_dict.copy()]:
+        assert copied["CsvWriter"].__name__ == "CsvWriter"
+
+    name_dict = LazyClassDict({"CsvWriter": "primrose.writers.csv_writer:CsvWriter"})
+    assert name_dict.pop("CsvWriter").__name__ == "CsvWriter"
+    assert name_dict.pop("CsvWriter", None) is None
+
+
+def test_lazy_imports():
+    # a fresh interpreter, so that modules imported by other tests do not count
+    code = """
+import sys
+from primrose.configuration.configuration import Configuration
+from primrose.dag_runner import DagRunner
+config = {
+    "implementation_config": {
+        "reader_config": {"read_data": {"class": "CsvReader", "filename": "test/tennis.csv", "destinations": ["write"]}},
+        "writer_config": {"write": {"class": "CsvWriter", "key": "data", "dir": "cache", "filename": "x.csv"}},
+    }
+}
+DagRunner(Configuration(None, is_dict_config=True, dict_config=config)).run(dry_run=True)
+heavy = ["boto3", "google.cloud.storage", "matplotlib", "slack", "sklearn", "mysql", "nltk"]
+print(",".join(m for m in heavy if m in sys.modules))
+"""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
@@ -0,0 +1,178 @@
+import os
+import json
+import tracemalloc
+import pytest
+import numpy as np
+import pandas as pd
+from primrose.configuration.configuration import Configuration, ConfigurationError
+from primrose.dag_runner import DagRunner
+from primrose.data_object import DataObject
+from primrose.instrumentation import (
+    AbstractCollector,
+    CollectorFactory,
+    MemoryCollector,
+    OutputSizeCollector,
+    RunReport,
+    TimingCollector,
+)
+
+
+def _config(metadata=None):
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "read_data": {"class": "SklearnDatasetReader", "dataset": "iris", "destinations": ["write_output"]}
+            },
+            "writer_config": {
+                "write_output": {
+                    "class": "CsvWriter",
+                    "key": "data",
+                    "dir": "cache",
+                    "filename": "test_instrumentation.csv",
+                }
+            },
+        }
+    }
+    if metadata:
+        config["metadata"] = metadata
+    return Configuration(None, is_dict_config=True, dict_config=config)
+
+
+def test_timing_collector():
+    collector = TimingCollector({})
+    state = collector.start("node", None)
+    metrics = collector.stop("node", None, state)
+    assert metrics["wall_time_s"] >= 0
+    assert metrics["cpu_time_s"] >= 0
+
+
+def test_memory_collector_tracemalloc():
+    collector = MemoryCollector({"tracemalloc": True})
+    state = collector.start("node", None)
+    data = np.ones(1000000)
+    metrics = collector.stop("node", None, state)
+    tracemalloc.stop()
+    assert metrics["peak_rss_delta_bytes"] >= 0
+    assert metrics["tracemalloc_peak_bytes"] >= data.nbytes
+
+
+def test_memory_collector_tracemalloc_unsupported(monkeypatch):
+    # Python 3.8 has no tracemalloc.reset_peak: the peak since tracing began is not the node's own peak
+    monkeypatch.delattr(tracemalloc, "reset_peak", raising=False)
+    collector = MemoryCollector({"tracemalloc": True})
+    metrics = collector.stop("node", None, collector.start("node", None))
+    assert not tracemalloc.is_tracing()
+    assert metrics["tracemalloc_peak_bytes"] is None
+
+
+def test_output_size_collector():
+    data_object = DataObject(None)
+    data_object.data_dict["node"]["array"] = np.zeros(100)
+    data_object.data_dict["node"]["df"] = pd.DataFrame({"a": [1, 2, 3]})
+
+    collector = OutputSizeCollector({})
+    metrics = collector.stop("node", data_object, collector.start("node", data_object))
+    assert metrics["output_keys"] == 2
+    assert metrics["output_bytes"] == 800 + pd.DataFrame({"a": [1, 2, 3]}).memory_usage(deep=True).sum()
+
+
+def test_run_report(tmpdir):
+    report = RunReport()
+    report.add({"node": "a", "status": "ran", "wall_time_s": 1.5})
+    report.add({"node": "b", "status": "pruned"})
+
+    assert report.row("b") == {"node": "b", "status": "pruned"}
+    assert report.row("c") is None
+
+    filename = os.path.join(str(tmpdir), "report.json")
+    report.to_json(filename)
+    with open(filename) as f:
+        assert json.load(f) == report.rows
+
+    csv = report.to_csv()
+    assert csv.splitlines()[0] == "node,status,wall_time_s"
+
+
+def test_dag_runner_report(tmpdir):
+    filename = os.path.join(str(tmpdir), "report.csv")
+    configuration = _config({"instrumentation": {"report_csv": filename}})
+    data_object = DagRunner(configuration).run()
+
+    report = data_object.run_report
+    assert [row["node"] for row in report.rows] == ["read_data", "write_output"]
+
+    row = report.row("read_data")
+    assert row["class"] == "SklearnDatasetReader"
+    assert row["section"] == "reader_config"
+    assert row["status"] == "ran"
+    for metric in ["wall_time_s", "cpu_time_s", "peak_rss_delta_bytes"]:
+        assert metric in row
+    # OutputSizeCollector is opt-in
+    assert "output_bytes" not in row
+
+    assert os.path.exists(filename)
+    assert len(pd.read_csv(filename)) == 2
+
+
+def test_dag_runner_report_process_pool():
+    configuration = _config(
+        {"executor": {"pool": "process"}, "instrumentation": {"collectors": ["TimingCollector", "OutputSizeCollector"]}}
+    )
+    data_object = DagRunner(configuration).run()
+    row = data_object.run_report.row("read_data")
+    assert row["output_keys"] == 1
+    assert row["output_bytes"] > 0
+
+
+@pytest.mark.parametrize("pool", ["sequential", "process"])
+def test_dag_runner_report_failed_run(tmpdir, monkeypatch, pool):
+    from primrose.writers.csv_writer import CsvWriter
+
+    def fail(self, data_object):
+        raise Exception("cannot write")
+
+    monkeypatch.setattr(CsvWriter, "run", fail)
+
+    filename = os.path.join(str(tmpdir), "report.json")
+    configuration = _config({"executor": {"pool": pool}, "instrumentation": {"report_json": filename}})
+    with pytest.raises(Exception) as e:
+        DagRunner(configuration).run()
+    assert "cannot write" in str(e)
+
+    with open(filename) as f:
+        rows = json.load(f)
+    assert [(row["node"], row["status"]) for row in rows] == [("read_data", "ran"), ("write_output", "failed")]
+    assert rows[1]["wall_time_s"] >= 0
+
+
+def test_dag_runner_custom_collector():
+    class NodeNameCollector(AbstractCollector):
+        def start(self, node, data_object):
+            return node.upper()
+
+        def stop(self, node, data_object, state):
+            return {"upper": state, "prefix": self.instrumentation_config["prefix"]}
+
+    CollectorFactory().register("NodeNameCollector", NodeNameCollector)
+
+    configuration = _config({"instrumentation": {"collectors": ["NodeNameCollector"], "prefix": "x"}})
+    data_object = DagRunner(configuration).run()
+    assert data_object.run_report.row("read_data") == {
+        "node": "read_data",
+        "class": "SklearnDatasetReader",
+        "section": "reader_config",
+        "status": "ran",
+        "upper": "READ_DATA",
+        "prefix": "x",
+    }
+
+
+def test_dag_runner_instrumentation_disabled():
+    data_object = DagRunner(_config({"instrumentation": {"enabled": False}})).run()
+    assert data_object.run_report.rows == []
+
+
+def test_instrumentation_config_bad():
+    with pytest.raises(ConfigurationError) as e:
+        _config({"instrumentation": {"collectors": ["NotACollector"]}})
+    assert "metadata.instrumentation: collector NotACollector is not registered" in str(e)
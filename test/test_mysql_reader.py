@@ -4,9 +4,11 @@ import pandas as pd
 
 from primrose.readers.mysql_reader import MySQLReader
 from primrose.configuration.configuration import Configuration
+from primrose.configuration.util import ConfigurationError
 import mysql.connector
 from primrose.data_object import DataObject, DataObjectResponseType
 from unittest.mock import patch
+from primrose.readers.connection_pool import close_all_pools
 
 
 def test_necessary_config():
@@ -54,3 +56,73 @@ def test_run(monkeypatch):
         assert "query_0" in dd
         df = dd["query_0"]
         assert list(df.T.to_dict().values())[0] == {"Name": "Tom", "Age": 20}
+
+
+def test_run_connection_pool(monkeypatch):
+    config = {
+        "metadata": {"connection_pool": {"max_size": 2}},
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {
+                    "class": "MySQLReader",
+                    "query_json": [{"query": "test/test_mysql.sql"}],
+                    "destinations": ["othernode"],
+                },
+                "othernode": {
+                    "class": "MySQLReader",
+                    "query_json": [{"query": "test/test_mysql.sql"}],
+                    "destinations": [],
+                },
+            }
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    data_object = DataObject(configuration)
+
+    keys = ["MYSQL_HOST", "MYSQL_PORT", "MYSQL_DB", "MYSQL_USER", "MYSQL_PASS"]
+    for i, k in enumerate(keys):
+        os.environ[k] = str(i)
+
+    close_all_pools()
+
+    connections = []
+
+    def fake_df(query, con):
+        connections.append(con)
+        return pd.DataFrame({"Name": ["Tom"], "Age": [20]})
+
+    monkeypatch.setattr(pd, "read_sql", fake_df)
+
+    with patch(target="mysql.connector.connect") as mock:
+        for node in ["mynode", "othernode"]:
+            data_object, terminate = MySQLReader(configuration, node).run(data_object)
+            assert not terminate
+
+        # both readers used the same authenticated connection
+        assert mock.call_count == 1
+        assert connections[0] is connections[1]
+
+        pool = MySQLReader(configuration, "mynode").connection_pool()
+        assert pool.max_size == 2
+        assert pool.in_use == 0
+
+    assert close_all_pools() == 1
+    connections[0].close.assert_called_once()
+
+    config["metadata"]["connection_pool"]["enabled"] = False
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    assert MySQLReader(configuration, "mynode").connection_pool() is None
+
+
+def test_connection_pool_config_bad():
+    config = {
+        "metadata": {"connection_pool": {"max_size": 0}},
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {"class": "MySQLReader", "query_json": [{"query": "test/test_mysql.sql"}], "destinations": []}
+            }
+        },
+    }
+    with pytest.raises(ConfigurationError) as e:
+        Configuration(None, is_dict_config=True, dict_config=config)
+    assert "metadata.connection_pool.max_size must be a positive integer" in str(e)
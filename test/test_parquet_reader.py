@@ -0,0 +1,69 @@
+import pytest
+import pandas as pd
+from primrose.configuration.configuration import Configuration
+from primrose.readers.parquet_reader import ParquetReader
+from primrose.data_object import DataObject, DataObjectResponseType
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture()
+def dataset(tmpdir):
+    df = pd.DataFrame(
+        {
+            "country": ["us", "us", "fr", "fr", "de"],
+            "city": ["nyc", "sf", "paris", "lyon", "berlin"],
+            "population": [8.4, 0.9, 2.1, 0.5, 3.6],
+        }
+    )
+    filename = str(tmpdir.join("cities"))
+    df.to_parquet(filename, partition_cols=["country"], index=False)
+    return filename
+
+
+def _read(filename, **kwargs):
+    node_config = {"class": "ParquetReader", "filename": filename, "destinations": []}
+    node_config.update(kwargs)
+    config = {"implementation_config": {"reader_config": {"parquet_reader": node_config}}}
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+    data_object, terminate = ParquetReader(configuration, "parquet_reader").run(DataObject(configuration))
+    return data_object.get("parquet_reader", rtype=DataObjectResponseType.VALUE.value), terminate
+
+
+def test_necessary_config():
+    assert ParquetReader.necessary_config({}) == set(["filename"])
+
+
+def test_read_partitioned(dataset):
+    df, terminate = _read(dataset)
+    assert not terminate
+    assert df.shape == (5, 3)
+    assert sorted(df["city"]) == ["berlin", "lyon", "nyc", "paris", "sf"]
+
+
+def test_read_columns_filters(dataset):
+    df, terminate = _read(dataset, columns=["city"], filters=[["country", "=", "fr"], ["population", ">", 1]])
+    assert not terminate
+    assert list(df.columns) == ["city"]
+    assert list(df["city"]) == ["paris"]
+
+    # any one of a list of lists of conditions
+    df, _ = _read(dataset, columns=["city"], filters=[[["country", "=", "de"]], [["city", "=", "sf"]]])
+    assert sorted(df["city"]) == ["berlin", "sf"]
+
+    df, terminate = _read(dataset, filters=[["country", "in", ["it"]]])
+    assert df.empty
+    assert terminate
+
+
+def test_read_categoricals(dataset):
+    df, _ = _read(dataset, columns=["city", "population"], categoricals=["city"])
+    assert str(df["city"].dtype) == "category"
+    assert str(df["population"].dtype) == "float64"
+
+
+def test_read_chunksize(dataset):
+    chunked, terminate = _read(dataset, columns=["city"], chunksize=2)
+    assert not terminate
+    assert all(len(chunk) <= 2 for chunk in chunked)
+    assert sorted(chunked.to_frame()["city"]) == ["berlin", "lyon", "nyc", "paris", "sf"]
@@ -0,0 +1,68 @@
+import os
+import pytest
+import pandas as pd
+from primrose.configuration.configuration import Configuration
+from primrose.writers.parquet_writer import ParquetWriter
+from primrose.readers.csv_reader import CsvReader
+from primrose.data_object import DataObject
+from primrose.chunked_data_frame import ChunkedDataFrame
+
+pytest.importorskip("pyarrow")
+
+
+def _write(tmpdir, data, **kwargs):
+    node_config = {"class": "ParquetWriter", "key": "data", "dir": str(tmpdir), "filename": "out.parquet"}
+    node_config.update(kwargs)
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "csv_reader": {"class": "CsvReader", "filename": "test/minimal.csv", "destinations": ["writer"]}
+            },
+            "writer_config": {"writer": node_config},
+        }
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    data_object = DataObject(configuration)
+    data_object.add(CsvReader(configuration, "csv_reader"), key="data", data=data)
+    data_object, terminate = ParquetWriter(configuration, "writer").run(data_object)
+    assert not terminate
+    return os.path.join(str(tmpdir), node_config["filename"])
+
+
+def test_necessary_config():
+    assert ParquetWriter.necessary_config({}) == set(["key", "dir", "filename"])
+
+
+def test_write(tmpdir):
+    df = pd.DataFrame({"a": [1, 2, 3], "b": pd.Categorical(["x", "y", "x"])}, index=[5, 6, 7])
+    filename = _write(tmpdir, df, compression="gzip")
+
+    import pyarrow.parquet as pq
+
+    assert pq.ParquetFile(filename).metadata.row_group(0).column(0).compression == "GZIP"
+    result = pd.read_parquet(filename)
+    assert list(result.index) == [0, 1, 2]
+    pd.testing.assert_frame_equal(result, df.reset_index(drop=True))
+
+
+def test_write_partitioned(tmpdir):
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "x"]})
+    filename = _write(tmpdir, df, partition_cols=["b"])
+    assert sorted(os.listdir(filename)) == ["b=x", "b=y"]
+
+    # the dataset is overwritten
+    filename = _write(tmpdir, df[df["b"] == "x"], partition_cols=["b"])
+    assert sorted(os.listdir(filename)) == ["b=x"]
+    assert sorted(pd.read_parquet(filename)["a"]) == [1, 3]
+
+
+def test_write_chunked(tmpdir):
+    df = pd.DataFrame({"a": range(5), "b": ["x", "y", "x", "y", "z"]})
+    chunked = ChunkedDataFrame(lambda: (df.iloc[i : i + 2] for i in range(0, 5, 2)))
+
+    filename = _write(tmpdir, chunked)
+    pd.testing.assert_frame_equal(pd.read_parquet(filename), df)
+
+    filename = _write(tmpdir, chunked, filename="partitioned", partition_cols=["b"])
+    result = pd.read_parquet(filename)
+    assert sorted(result["a"]) == list(range(5))
@@ -0,0 +1,24 @@
+import os
+import pytest
+from primrose.process_pool import map_blocks
+
+
+def _scaled(factor, start, stop):
+    return [factor * i for i in range(start, stop)], os.getpid()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_map_blocks(workers):
+    blocks = ((start, start + 3) for start in range(0, 30, 3))
+    results = map_blocks(_scaled, 10, blocks, workers)
+
+    assert [value for values, _ in results for value in values] == [10 * i for i in range(30)]
+    pids = set(pid for _, pid in results)
+    if workers == 1:
+        assert pids == {os.getpid()}
+    else:
+        assert os.getpid() not in pids
+
+
+def test_map_blocks_empty():
+    assert map_blocks(_scaled, 10, [], workers=2) == []
@@ -0,0 +1,80 @@
+import os
+import time
+import pytest
+import pandas as pd
+from primrose.readers.query_cache import QueryCache
+from primrose.configuration.configuration import Configuration
+from primrose.configuration.util import ConfigurationError
+
+
+def test_get_put(tmpdir):
+    cache = QueryCache(str(tmpdir), ttl=60)
+    assert cache.get("abc") is None
+
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    cache.put("abc", df)
+    pd.testing.assert_frame_equal(cache.get("abc"), df)
+
+
+def test_ttl(tmpdir):
+    cache = QueryCache(str(tmpdir), ttl=60)
+    cache.put("abc", pd.DataFrame({"a": [1]}))
+
+    filename = cache._filename("abc")
+    written = time.time() - 120
+    os.utime(filename, (written, written))
+
+    assert cache.get("abc") is None
+    assert cache.get("abc", ttl=600) is not None
+
+
+def test_evict_least_recently_used(tmpdir):
+    cache = QueryCache(str(tmpdir), ttl=600)
+    df = pd.DataFrame({"a": range(100)})
+    for i, key in enumerate(["k0", "k1", "k2"]):
+        cache.put(key, df)
+        # k0 was written first, but read last
+        used = time.time() - 100 + [50, 10, 20][i]
+        os.utime(cache._filename(key), (used, used))
+
+    size = os.path.getsize(cache._filename("k0"))
+    cache.max_bytes = 2 * size
+    assert cache.evict() == 1
+    assert cache.get("k1") is None
+    assert cache.get("k0") is not None
+    assert cache.get("k2") is not None
+
+
+def test_from_metadata():
+    assert QueryCache.from_metadata(None) is None
+    assert QueryCache.from_metadata({"other": {}}) is None
+
+    cache = QueryCache.from_metadata({"query_cache": {"dir": "cache/queries", "ttl": 10, "max_size_mb": 1}})
+    assert cache.dirname == "cache/queries"
+    assert cache.ttl == 10
+    assert cache.max_bytes == 1024 * 1024
+
+
+def test_query_cache_config_bad():
+    config = {
+        "metadata": {"query_cache": {"ttl": 10}},
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {"class": "SQLiteReader", "filename": "x.db", "query_json": [], "destinations": []}
+            }
+        },
+    }
+    with pytest.raises(ConfigurationError) as e:
+        Configuration(None, is_dict_config=True, dict_config=config)
+    assert "metadata.query_cache: you must set 'dir'" in str(e)
+
+
+def test_put_unwritable(tmpdir):
+    cache = QueryCache(str(tmpdir), ttl=60)
+    cache.ext = ".parquet"
+
+    # Parquet rejects object columns of mixed types
+    df = pd.DataFrame({"a": [1, "x", 2.5]})
+    assert not cache.put("abc", df)
+    assert cache.get("abc") is None
+    assert os.listdir(str(tmpdir)) == []
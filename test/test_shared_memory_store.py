@@ -0,0 +1,88 @@
+import pytest
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from primrose.configuration.configuration import Configuration, ConfigurationError
+from primrose.data_object import DataObject
+from primrose.shared_memory_store import SharedMemoryStore, SharedArray, SharedTable, attach_data_object
+import primrose.shared_memory_store as shared_memory_store
+
+
+class Node:
+    def __init__(self, instance_name):
+        self.instance_name = instance_name
+
+
+def test_export_array():
+    data_object = DataObject(None)
+    store = SharedMemoryStore()
+    array = np.arange(12, dtype=np.float64).reshape((3, 4))
+    data_object.add(Node("a"), array)
+    data_object.add(Node("a"), "not shared", key="other")
+
+    exported = store.export(data_object)
+    handle = exported.data_dict["a"]["data"]
+    assert isinstance(handle, SharedArray)
+    assert exported.data_dict["a"]["other"] == "not shared"
+
+    # the DataObject now holds a view of the segment
+    view = data_object.get("a")["data"]
+    assert np.array_equal(view, array)
+    assert view.base is not None
+
+    # exporting again reuses the segment
+    assert store.export(data_object).data_dict["a"]["data"] is handle
+
+    attached = attach_data_object(exported)
+    assert np.array_equal(attached.data_dict["a"]["data"], array)
+
+    store.close(data_object)
+    assert handle.name not in shared_memory_store._SEGMENTS
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=handle.name)
+    assert np.array_equal(data_object.get("a")["data"], array)
+
+
+def test_export_dataframe():
+    pytest.importorskip("pyarrow")
+    data_object = DataObject(None)
+    store = SharedMemoryStore()
+    df = pd.DataFrame({"x": [1.0, 2.0, 3.0], "y": ["a", "b", "c"], "z": [1, 2, 3]}, index=[10, 11, 12])
+    data_object.add(Node("a"), df)
+
+    exported = store.export(data_object)
+    assert isinstance(exported.data_dict["a"]["data"], SharedTable)
+    pd.testing.assert_frame_equal(attach_data_object(exported).data_dict["a"]["data"], df)
+
+    store.release("a")
+    assert store.handles == {}
+
+
+def test_adopt():
+    store = SharedMemoryStore()
+    entries = shared_memory_store.share_entries({"data": np.ones(5), "other": 1})
+    assert isinstance(entries["data"], SharedArray)
+
+    adopted = store.adopt("a", entries)
+    assert np.array_equal(adopted["data"], np.ones(5))
+    assert adopted["other"] == 1
+    assert ("a", "data") in store.handles
+
+    store.release("a")
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=entries["data"].name)
+
+
+def test_storage_config():
+    config = {
+        "metadata": {"data_object": {"storage": "shared_memory"}},
+        "implementation_config": {
+            "reader_config": {"read_data": {"class": "CsvReader", "filename": "data/tennis.csv", "destinations": []}}
+        },
+    }
+    configuration = Configuration(None, is_dict_config=True, dict_config=config)
+    assert isinstance(DataObject(configuration).shared_memory, SharedMemoryStore)
+
+    config["metadata"]["data_object"]["storage"] = "gpu"
+    with pytest.raises(ConfigurationError, match="Unsupported metadata.data_object.storage"):
+        Configuration(None, is_dict_config=True, dict_config=config)
@@ -81,3 +81,71 @@ def test_predict(model, data_obj):
         "yes",
         "yes",
     ]
+
+
+def test_random_search(model, data_obj):
+    model.node_config.update({"search": "random", "n_iter": 2, "random_state": 0, "n_jobs": 1})
+    model.train_model(data_obj)
+    assert type(model.model).__name__ == "RandomizedSearchCV"
+    assert len(model.model.cv_results_["params"]) == 2
+    assert model.model.n_jobs == 1
+
+
+def test_halving_search(model, data_obj):
+    model.node_config.update({"search": "halving", "n_jobs": 1, "cv_folds": 2})
+    model.train_model(data_obj)
+    assert type(model.model).__name__ == "HalvingGridSearchCV"
+    data = data_obj.get("decision_tree_model", rtype=DataObjectResponseType.KEY_VALUE.value)
+    assert type(data["model"]).__name__ == "DecisionTreeClassifier"
+
+
+def test_unsupported_search(model, data_obj):
+    model.node_config["search"] = "exhaustive"
+    with pytest.raises(Exception) as e:
+        model.train_model(data_obj)
+    assert "Unsupported search exhaustive" in str(e)
+
+
+def test_cached_search(model, data_obj, tmpdir, monkeypatch):
+    import primrose.models.cached_estimator as cached_estimator
+
+    fits = []
+
+    def fit_estimator(estimator, X, y, **fit_params):
+        fits.append(estimator.get_params()["min_samples_split"])
+        return estimator.fit(X, y, **fit_params)
+
+    monkeypatch.setattr(cached_estimator, "_fit_estimator", fit_estimator)
+
+    model.node_config.update({"cache_dir": str(tmpdir), "n_jobs": 1})
+    model.node_config["model_parameters"] = {"min_samples_split": [2, 5]}
+    model.train_model(data_obj)
+    # 2 combinations x 3 folds, and the refit
+    assert len(fits) == 7
+    data = data_obj.get("decision_tree_model", pop_data=True, rtype=DataObjectResponseType.KEY_VALUE.value)
+    assert type(data["model"]).__name__ == "DecisionTreeClassifier"
+
+    fits.clear()
+    model.node_config["model_parameters"] = {"min_samples_split": [2, 5, 3]}
+    model.train_model(data_obj)
+    # only the new combination is fit, and the refit if it is best
+    assert fits.count(3) == 3 + (model.model.best_params_["estimator__min_samples_split"] == 3)
+    assert fits.count(2) + fits.count(5) <= 1
+
+
+def test_run_predicts_once(model, data_obj, monkeypatch):
+    calls = []
+    predict_in_batches = SklearnClassifierModel.predict_in_batches
+
+    def counting_predict_in_batches(self, X, method="predict"):
+        calls.append(method)
+        return predict_in_batches(self, X, method)
+
+    monkeypatch.setattr(SklearnClassifierModel, "predict_in_batches", counting_predict_in_batches)
+
+    data_object, terminate = model.run(data_obj)
+    assert sorted(calls) == ["predict", "predict_proba"]
+    assert model._get_data(data_obj)[2] is model._get_data(data_obj)[2]
+
+    predicted = data_object.get("decision_tree_model", rtype=DataObjectResponseType.KEY_VALUE.value)
+    assert list(predicted["predictions"].predictions) == ["yes", "no", "no", "yes", "yes"]
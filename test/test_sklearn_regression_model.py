@@ -53,3 +53,86 @@ def test_run():
 
 
 # {'Explained variance': 0.531103247696713, 'Max error': 0.8037485197869163, 'Mean absolute error': 0.2050877131438389, 'MSE': 0.09214453355442812, 'Mean squared log error': 0.005413269099842543, 'R2': 0.5252494593646577, 'eval_time': datetime.datetime(2019, 7, 26, 13, 12, 13, 185343)}
+
+
+@pytest.mark.parametrize(
+    "batching, metadata",
+    [
+        ({"predict_batch_size": 7}, {}),
+        ({"predict_batch_size": 10, "predict_workers": 2}, {}),
+        # the model node itself runs in a worker process of the DagRunner
+        ({"predict_batch_size": 10, "predict_workers": 2}, {"executor": {"pool": "process", "max_workers": 2}}),
+    ],
+)
+def test_run_predict_in_batches(batching, metadata):
+    config = {
+        "metadata": metadata,
+        "implementation_config": {
+            "reader_config": {
+                "read_data": {
+                    "class": "SklearnDatasetReader",
+                    "dataset": "iris",
+                    "destinations": ["train_test_split"],
+                }
+            },
+            "pipeline_config": {
+                "train_test_split": {
+                    "class": "TrainTestSplit",
+                    "features": [
+                        "sepal length (cm)",
+                        "petal length (cm)",
+                        "petal width (cm)",
+                    ],
+                    "target_variable": "sepal width (cm)",
+                    "training_fraction": 0.65,
+                    "is_training": True,
+                    "seed": 42,
+                    "destinations": ["regression_model"],
+                }
+            },
+            "model_config": {
+                "regression_model": dict(
+                    {
+                        "class": "SklearnRegressionModel",
+                        "mode": "train",
+                        "model": {"class": "linear_model.LinearRegression"},
+                        "destinations": [],
+                    },
+                    **batching
+                )
+            },
+        }
+    }
+    configuration = Configuration(
+        config_location=None, is_dict_config=True, dict_config=config
+    )
+    data_object = DagRunner(configuration).run()
+    scores = data_object.data_dict["regression_model"]["scores"]
+
+    # the same scores as predicting all rows at once
+    assert math.isclose(
+        scores["Explained variance"], 0.531103247696713, abs_tol=0.00001
+    )
+
+
+def test_predict_in_batches_daemonic(monkeypatch):
+    import numpy as np
+    import primrose.process_pool as process_pool
+    from primrose.models.sklearn_regression_model import SklearnRegressionModel
+    from sklearn.linear_model import LinearRegression
+
+    class DaemonicProcess:
+        daemon = True
+
+    def no_children(*args, **kwargs):
+        raise AssertionError("daemonic processes are not allowed to have children")
+
+    monkeypatch.setattr(process_pool.multiprocessing, "current_process", lambda: DaemonicProcess())
+    monkeypatch.setattr(process_pool, "ProcessPoolExecutor", no_children)
+
+    model = SklearnRegressionModel.__new__(SklearnRegressionModel)
+    model.node_config = {"predict_batch_size": 3, "predict_workers": 2}
+    X = np.arange(20, dtype=float).reshape(10, 2)
+    model.model = LinearRegression().fit(X, X[:, 0])
+
+    np.testing.assert_allclose(model.predict_in_batches(X), X[:, 0], atol=1e-9)
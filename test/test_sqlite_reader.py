@@ -1,7 +1,10 @@
 import pytest
 import os
 import sys
+import time
 import sqlite3
+import threading
+from concurrent.futures import Future
 from primrose.configuration.configuration import Configuration
 from primrose.readers.sqlite_reader import SQLiteReader
 from primrose.data_object import DataObject, DataObjectResponseType
@@ -56,3 +59,290 @@ def test_read():
 
     if os.path.exists(filename):
         os.remove(filename)
+
+
+def test_read_parallel_queries(tmp_path, monkeypatch):
+    filename = str(tmp_path / "test.db")
+    conn = sqlite3.connect(filename)
+    conn.execute("create table test(firstname text, lastname text);")
+    conn.execute("insert into test(firstname, lastname) values('joe', 'doe'), ('mary','poppins');")
+    conn.commit()
+    conn.close()
+
+    queries = []
+    for i, where in enumerate(["1=1", "firstname='joe'", "firstname='nobody'", "1=1"]):
+        query = tmp_path / ("query_%s.sql" % i)
+        query.write_text("select * from test where %s" % where)
+        queries.append({"query": str(query), "key": "key_%s" % i})
+
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {
+                    "class": "SQLiteReader",
+                    "filename": filename,
+                    "query_json": queries[:2],
+                    "parallel_queries": 2,
+                    "destinations": [],
+                }
+            }
+        }
+    }
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+
+    threads = set()
+    original = SQLiteReader.query_db
+
+    def query_db(self, query, conn):
+        threads.add(threading.get_ident())
+        return original(self, query, conn)
+
+    monkeypatch.setattr(SQLiteReader, "query_db", query_db)
+
+    data_object, terminate = SQLiteReader(configuration, "mynode").run(DataObject(configuration))
+    assert not terminate
+    dd = data_object.get("mynode", rtype=DataObjectResponseType.KEY_VALUE.value)
+    assert list(dd.keys()) == ["key_0", "key_1"]
+    assert dd["key_0"].shape == (2, 2)
+    assert dd["key_1"].shape == (1, 2)
+    assert threading.get_ident() not in threads
+
+    # as when run one at a time, results after the first empty one are dropped and the DAG terminates
+    config["implementation_config"]["reader_config"]["mynode"]["query_json"] = queries
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+
+    data_object, terminate = SQLiteReader(configuration, "mynode").run(DataObject(configuration))
+    assert terminate
+    dd = data_object.get("mynode", rtype=DataObjectResponseType.KEY_VALUE.value)
+    assert list(dd.keys()) == ["key_0", "key_1", "key_2"]
+    assert dd["key_2"].empty
+
+
+def test_read_deferred(tmp_path):
+    filename = str(tmp_path / "test.db")
+    conn = sqlite3.connect(filename)
+    conn.execute("create table test(firstname text, lastname text);")
+    conn.execute("insert into test(firstname, lastname) values('joe', 'doe'), ('mary','poppins');")
+    conn.commit()
+    conn.close()
+
+    queries = []
+    for i, where in enumerate(["1=1", "firstname='nobody'"]):
+        query = tmp_path / ("query_%s.sql" % i)
+        query.write_text("select * from test where %s" % where)
+        queries.append({"query": str(query), "key": "key_%s" % i})
+
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {
+                    "class": "SQLiteReader",
+                    "filename": filename,
+                    "query_json": queries,
+                    "deferred": True,
+                    "destinations": [],
+                }
+            }
+        }
+    }
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+
+    data_object, terminate = SQLiteReader(configuration, "mynode").run(DataObject(configuration))
+    # results are not known yet, so the DAG is not terminated on the empty one
+    assert not terminate
+    assert all(isinstance(value, Future) for value in data_object.data_dict["mynode"].values())
+
+    dd = data_object.get("mynode", rtype=DataObjectResponseType.KEY_VALUE.value)
+    assert dd["key_0"].shape == (2, 2)
+    assert dd["key_1"].empty
+
+
+def test_read_deferred_pooled(tmp_path, monkeypatch):
+    from primrose.dag_runner import DagRunner
+    from primrose.readers.connection_pool import get_pool, close_all_pools
+
+    filename = str(tmp_path / "test.db")
+    conn = sqlite3.connect(filename)
+    conn.execute("create table test(firstname text, lastname text);")
+    conn.execute("insert into test(firstname, lastname) values('joe', 'doe'), ('mary','poppins');")
+    conn.commit()
+    conn.close()
+
+    query = tmp_path / "query.sql"
+    query.write_text("select * from test")
+
+    def connection_pool(self):
+        # the query only gets its connection once the rest of the DAG has run
+        time.sleep(0.2)
+        return get_pool(("sqlite", filename), lambda: sqlite3.connect(filename, check_same_thread=False))
+
+    monkeypatch.setattr(SQLiteReader, "connection_pool", connection_pool)
+
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {
+                    "class": "SQLiteReader",
+                    "filename": filename,
+                    "query_json": [{"query": str(query)}],
+                    "deferred": True,
+                    "destinations": [],
+                }
+            }
+        }
+    }
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+    close_all_pools()
+    data_object = DagRunner(configuration).run()
+
+    # the run waited for the query before closing the pools, rather than leave a pool created after that open
+    assert data_object.data_dict["mynode"]["query_0"].done()
+    assert close_all_pools() == 0
+    assert data_object.get("mynode", rtype=DataObjectResponseType.VALUE.value).shape == (2, 2)
+
+
+def test_read_own_connection_not_closed(tmp_path):
+    filename = str(tmp_path / "test.db")
+    conn = sqlite3.connect(filename)
+    conn.execute("create table test(firstname text, lastname text);")
+    conn.execute("insert into test(firstname, lastname) values('joe', 'doe');")
+    conn.commit()
+
+    query = tmp_path / "query.sql"
+    query.write_text("select * from test")
+
+    class KeptConnectionReader(SQLiteReader):
+        # reuses one connection, that it does not want closed
+        opens_connections = False
+
+        def get_connection(self):
+            return conn
+
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {"class": "SQLiteReader", "filename": filename, "query_json": [{"query": str(query)}]}
+            }
+        }
+    }
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+    data_object, _ = KeptConnectionReader(configuration, "mynode").run(DataObject(configuration))
+    assert data_object.get("mynode", rtype=DataObjectResponseType.VALUE.value).shape == (1, 2)
+
+    # still open
+    conn.execute("select 1")
+    conn.close()
+
+
+def test_read_fetch_size(tmp_path, monkeypatch):
+    filename = str(tmp_path / "test.db")
+    conn = sqlite3.connect(filename)
+    conn.execute("create table test(id integer, score real, name text);")
+    conn.executemany("insert into test values(?, ?, ?);", [(i, i / 2, "name%s" % i) for i in range(7)])
+    conn.commit()
+    conn.close()
+
+    query = tmp_path / "query.sql"
+    query.write_text("select * from test where id >= {min_id}")
+
+    config = {
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {
+                    "class": "SQLiteReader",
+                    "filename": filename,
+                    "query_json": [{"query": str(query), "parameters": {"min_id": 0}}],
+                    "fetch_size": 3,
+                    "dtypes": {"id": "int32", "score": "float32", "name": "category"},
+                    "destinations": [],
+                }
+            }
+        }
+    }
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+    reader = SQLiteReader(configuration, "mynode")
+
+    fetched = []
+    original = reader.fetch_batches
+
+    def fetch_batches(query, conn, fetch_size):
+        for df in original(query, conn, fetch_size):
+            fetched.append(len(df))
+            yield df
+
+    monkeypatch.setattr(reader, "fetch_batches", fetch_batches)
+
+    data_object, terminate = reader.run(DataObject(configuration))
+    assert not terminate
+    df = data_object.get("mynode", rtype=DataObjectResponseType.KEY_VALUE.value)["query_0"]
+    assert fetched == [3, 3, 1]
+    assert list(df["id"]) == list(range(7))
+    assert [str(dtype) for dtype in df.dtypes] == ["int32", "float32", "category"]
+
+    # an empty result keeps its columns and terminates the DAG
+    config["implementation_config"]["reader_config"]["mynode"]["query_json"][0]["parameters"]["min_id"] = 10
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+    data_object, terminate = SQLiteReader(configuration, "mynode").run(DataObject(configuration))
+    assert terminate
+    df = data_object.get("mynode", rtype=DataObjectResponseType.KEY_VALUE.value)["query_0"]
+    assert df.empty
+    assert list(df.columns) == ["id", "score", "name"]
+
+
+def test_read_query_cache(tmp_path, monkeypatch):
+    filename = str(tmp_path / "test.db")
+    conn = sqlite3.connect(filename)
+    conn.execute("create table test(firstname text, lastname text);")
+    conn.execute("insert into test(firstname, lastname) values('joe', 'doe'), ('mary','poppins');")
+    conn.commit()
+    conn.close()
+
+    query = tmp_path / "query.sql"
+    query.write_text("select * from test where firstname != '{name}'")
+
+    config = {
+        "metadata": {"query_cache": {"dir": str(tmp_path / "cache")}},
+        "implementation_config": {
+            "reader_config": {
+                "mynode": {
+                    "class": "SQLiteReader",
+                    "filename": filename,
+                    "query_json": [
+                        {"query": str(query), "parameters": {"name": "joe"}},
+                        {"query": str(query), "parameters": {"name": "mary"}, "cache": {"ttl": 3600}},
+                        {"query": str(query), "parameters": {"name": "joe"}, "cache": False},
+                    ],
+                    "destinations": [],
+                }
+            }
+        },
+    }
+    configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+
+    queried = []
+    original = SQLiteReader.query_db
+
+    def query_db(self, query, conn):
+        queried.append(query)
+        return original(self, query, conn)
+
+    monkeypatch.setattr(SQLiteReader, "query_db", query_db)
+
+    data_object, _ = SQLiteReader(configuration, "mynode").run(DataObject(configuration))
+    assert len(queried) == 3
+    assert len(os.listdir(str(tmp_path / "cache"))) == 2
+
+    # cached results are keyed on the rendered query: only the uncached query runs again
+    queried.clear()
+    data_object, _ = SQLiteReader(configuration, "mynode").run(DataObject(configuration))
+    assert queried == ["select * from test where firstname != 'joe'"]
+    dd = data_object.get("mynode", rtype=DataObjectResponseType.KEY_VALUE.value)
+    assert list(dd["query_0"]["firstname"]) == ["mary"]
+    assert list(dd["query_1"]["firstname"]) == ["joe"]
+
+    # and on the database
+    reader = SQLiteReader(configuration, "mynode")
+    config["implementation_config"]["reader_config"]["mynode"]["filename"] = str(tmp_path / "other.db")
+    other_configuration = Configuration(config_location=None, is_dict_config=True, dict_config=config)
+    other_reader = SQLiteReader(other_configuration, "mynode")
+    assert reader.query_cache_key("select 1") != other_reader.query_cache_key("select 1")
@@ -0,0 +1,38 @@
+import os
+import time
+from primrose.template_cache import sql_environment, config_environment, config_template
+from primrose.base.sql_reader import AbstractSqlReader
+
+
+def test_sql_environment(tmp_path):
+    assert sql_environment() is sql_environment()
+
+    filename = tmp_path / "query.sql"
+    filename.write_text("select * from t where x = {x}")
+
+    assert AbstractSqlReader._substitute_query({"query": str(filename), "parameters": {"x": 1}}) == (
+        "select * from t where x = 1"
+    )
+    template = sql_environment().get_template(str(filename))
+    assert sql_environment().get_template(str(filename)) is template
+
+    # a changed file is compiled again
+    filename.write_text("select * from t where y = {x}")
+    modified = time.time() + 10
+    os.utime(str(filename), (modified, modified))
+    assert AbstractSqlReader._substitute_query({"query": str(filename), "parameters": {"x": 2}}) == (
+        "select * from t where y = 2"
+    )
+
+
+def test_config_template(monkeypatch):
+    config_str = '{"a": "{{ "default" | env_override("TEST_TEMPLATE_CACHE") }}"}'
+
+    template = config_template(config_str)
+    assert config_template(config_str) is template
+    assert template.environment is config_environment()
+    assert template.render() == '{"a": "default"}'
+
+    # environment variables are read when the template is rendered, not when it is compiled
+    monkeypatch.setenv("TEST_TEMPLATE_CACHE", "overridden")
+    assert config_template(config_str).render() == '{"a": "overridden"}'
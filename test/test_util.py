@@ -1,5 +1,6 @@
+import os
 import pytest
-from primrose.util import RunModes
+from primrose.util import RunModes, write_atomically
 
 
 def test_values():
@@ -12,3 +13,29 @@ def test_names():
     names = RunModes.names()
     assert len(names) == 3
     assert set(names) == set(["TRAIN", "PREDICT", "EVAL"])
+
+
+def test_write_atomically(tmpdir):
+    filename = os.path.join(str(tmpdir), "file.txt")
+
+    def write(path):
+        with open(path, "w") as f:
+            f.write("content")
+
+    write_atomically(filename, write)
+    with open(filename) as f:
+        assert f.read() == "content"
+
+    def fail(path):
+        with open(path, "w") as f:
+            f.write("partial")
+        raise Exception("Deliberate error")
+
+    with pytest.raises(Exception) as e:
+        write_atomically(filename, fail)
+    assert "Deliberate error" in str(e)
+
+    # the earlier content is intact, and the temporary file is gone
+    with open(filename) as f:
+        assert f.read() == "content"
+    assert os.listdir(str(tmpdir)) == ["file.txt"]